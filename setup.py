@@ -9,6 +9,7 @@ from setuptools import setup, find_packages
 kwargs = {'author': 'Katherine Dykes',
  'author_email': 'systems.engineering@nrel.gov',
  'description': 'NREL WISDEM turbine cost models',
+ 'entry_points': {'console_scripts': ['turbine_costsse = turbine_costsse.turbine_costsse.turbine_costsse_cli:main']},
  'include_package_data': True,
  'install_requires': ['openmdao.main'],
  'keywords': ['openmdao'],
@@ -8,7 +8,21 @@ Created by Katherine Dykes on 2014-01-07.
 Copyright (c) NREL. All rights reserved.
 """
 
+import csv
+import multiprocessing
+from multiprocessing.connection import Client
+import os
+import Queue
+import shutil
+import socket
+import StringIO
 import unittest
+import tempfile
+import threading
+import time
+import zipfile
+import numpy as np
+from commonse.config import ppi
 from commonse.utilities import check_gradient_unit_test
 
 from turbine_costsse.turbine_costsse.tower_costsse import TowerCostAdder, TowerCost, Tower_CostsSE
@@ -17,13 +31,180 @@ from turbine_costsse.turbine_costsse.rotor_costsse import BladeCost, HubCost, Pi
 from turbine_costsse.turbine_costsse.nacelle_costsse import LowSpeedShaftCost, BearingsCost, GearboxCost, \
     HighSpeedSideCost, GeneratorCost, BedplateCost, \
     YawSystemCost, NacelleSystemCostAdder, Nacelle_CostsSE
-from turbine_costsse.turbine_costsse.turbine_costsse import TurbineCostAdder, Turbine_CostsSE
+from turbine_costsse.turbine_costsse.turbine_costsse import TurbineCostAdder, Turbine_CostsSE, Turbine_CostsSE_Flat
+from turbine_costsse.turbine_costsse.turbine_costsse_batch import turbine_costsse_batch, turbine_costsse_batch_jacobian, \
+    jacobian_inputs, jacobian_outputs, turbine_cost_gradient
+from turbine_costsse.turbine_costsse.turbine_costsse_linear import compile_turbine_costsse
 
 from turbine_costsse.nrel_csm_tcc.tower_csm_component import tower_csm_component
 from turbine_costsse.nrel_csm_tcc.blades_csm_component import blades_csm_component
 from turbine_costsse.nrel_csm_tcc.hub_csm_component import hub_csm_component
 from turbine_costsse.nrel_csm_tcc.nacelle_csm_component import nacelle_csm_component
 from turbine_costsse.nrel_csm_tcc.nrel_csm_tcc import rotor_mass_adder, tcc_csm_component, tcc_csm_assembly
+from turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_batch import tcc_csm_batch, nacelle_csm, tcc_csm_batch_jacobian
+from turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_sweep import tcc_csm_sweep
+from turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_cluster import SweepCoordinator, sweep_worker, tcc_csm_cluster_sweep, \
+     coordinate, environment_authkey
+from turbine_costsse.nrel_csm_tcc.csm_kernels import blades_csm_jacobian, hub_csm_jacobian, nacelle_csm_jacobian, \
+     tower_csm_jacobian, nacelle_csm_jacobian_values, nacelle_csm_pattern, tcc_csm_jacobian, tcc_csm_pattern, \
+     nacelle_csm_outputs, blades_csm_hessian, hub_csm_hessian, nacelle_csm_hessian, tower_csm_hessian
+from turbine_costsse.turbine_costsse.dual import Dual, forward_mode, second_order_mode, deferred_jacobian
+from turbine_costsse.turbine_costsse.costsse_kernels import hub_cost, hub_cost_jacobian, cost_coefficients
+from turbine_costsse.turbine_costsse.gradient_check import GradientCase, check_gradient, check_gradients, costsse_cases
+from turbine_costsse.nrel_csm_tcc.csm_gradient_check import csm_cases
+from turbine_costsse.turbine_costsse.benchmarks import reference_inputs, benchmark_kernel_import, import_time_target
+from turbine_costsse.turbine_costsse.pricing import PricingService, turbine_costsse_service, tcc_csm_service
+from turbine_costsse.turbine_costsse.turbine_costsse_cli import csv_chunks, npz_chunks, price_table, main
+from turbine_costsse.turbine_costsse.monte_carlo import design_inputs, turbine_cost_samples, turbine_cost_distribution
+from turbine_costsse.turbine_costsse.memo import EvaluationMemo, DiskMemo, set_memo, input_key, tracked_inputs, \
+     assembly_state
+from turbine_costsse.turbine_costsse.escalation import EscalatorCache, escalator_snapshot, escalator_codes, \
+     EscalationTable, escalation_table, EvaluationContext, default_context, set_context, escalators
+
+# PPI escalators
+# ----------------------------------------------------------
+class TestEscalatorSnapshot(unittest.TestCase):
+
+    def test_functionality(self):
+
+        esc = escalator_snapshot(2009, 12)
+
+        self.assertTrue(esc is escalator_snapshot(2009, 12))
+        self.assertEqual(esc.key[2:], (2009, 12))
+        self.assertEqual(sorted(esc.as_dict().keys()), sorted(escalator_codes))
+        self.assertEqual(esc['IPPI_TWR'], esc.compute('IPPI_TWR'))
+        self.assertRaises(AttributeError, setattr, esc, 'key', None)
+
+    def test_eviction(self):
+
+        cache = EscalatorCache(maxsize=2)
+
+        first = cache.get(2002, 9, 2009, 12)
+        cache.get(2002, 9, 2010, 12)
+        self.assertTrue(first is cache.get(2002, 9, 2009, 12))
+        cache.get(2002, 9, 2011, 12)
+
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(first is cache.get(2002, 9, 2009, 12))
+
+class TestEscalationTable(unittest.TestCase):
+
+    def test_functionality(self):
+
+        table = EscalationTable(2008, 2010, 2002, 9)
+
+        self.assertEqual(table.values.shape, (len(escalator_codes), 36))
+        self.assertEqual(table.lookup('IPPI_GRB', 2009, 12), escalator_snapshot(2009, 12)['IPPI_GRB'])
+        self.assertEqual(table.lookup('IPPI_BLA', 2010, 3), escalator_snapshot(2010, 3)['IPPI_BLA'])
+        self.assertRaises(ValueError, table.lookup, 'IPPI_GRB', 2011, 1)
+        self.assertRaises(ValueError, table.lookup, 'IPPI_GRB', 2009, 13)
+
+    def test_gather(self):
+
+        table = EscalationTable(2008, 2010, 2002, 9)
+        years = np.array([2008, 2009, 2010, 2009])
+        months = np.array([1, 6, 12, 6])
+
+        esc = table.gather(years, months)
+
+        for i in range(len(years)):
+            snapshot = escalator_snapshot(years[i], months[i])
+            for code in escalator_codes:
+                self.assertEqual(esc[code][i], snapshot[code])
+
+    def test_growth(self):
+
+        table = escalation_table(2005, 2011)
+
+        self.assertTrue(table.covers(2005, 2011))
+        self.assertTrue(escalation_table(2006, 2010) is table)
+
+class TestEvaluationContext(unittest.TestCase):
+
+    def make_turbine(self, context, year):
+
+        turbine = Turbine_CostsSE()
+        set_context(turbine, context)
+
+        turbine.blade_mass = 17650.67
+        turbine.hub_mass = 31644.5
+        turbine.pitch_system_mass = 17004.0
+        turbine.spinner_mass = 1810.5
+        turbine.low_speed_shaft_mass = 31257.3
+        turbine.main_bearing_mass = 9731.41 / 2
+        turbine.second_bearing_mass = 9731.41 / 2
+        turbine.gearbox_mass = 30237.60
+        turbine.high_speed_side_mass = 1492.45
+        turbine.generator_mass = 16699.85
+        turbine.bedplate_mass = 93090.6
+        turbine.yaw_system_mass = 11878.24
+        turbine.tower_mass = 434559.0
+        turbine.machine_rating = 5000.0
+        turbine.advanced_blade = True
+        turbine.blade_number = 3
+        turbine.drivetrain_design = 'geared'
+        turbine.crane = True
+        turbine.offshore = True
+        turbine.year = year
+        turbine.month = 12
+
+        return turbine
+
+    def test_functionality(self):
+
+        context = EvaluationContext(ref_yr=2005, ref_mon=1)
+
+        self.assertEqual(context.curr_yr, default_context.curr_yr)
+        self.assertEqual(context.at(2010, 6), EvaluationContext(2005, 1, 2010, 6))
+        self.assertRaises(AttributeError, setattr, context, 'ref_yr', 2002)
+
+        turbine = self.make_turbine(context, 2010)
+        self.assertTrue(turbine.nacelleCC.gearboxCC.context is context)
+
+    def test_threads(self):
+
+        dates = ppi.ref_yr, ppi.ref_mon, ppi.curr_yr, ppi.curr_mon
+        cases = [(EvaluationContext(ref_yr=2002, ref_mon=9), 2009), (EvaluationContext(ref_yr=2005, ref_mon=1), 2010), \
+                 (EvaluationContext(ref_yr=2002, ref_mon=9), 2011), (EvaluationContext(ref_yr=2004, ref_mon=6), 2008)]
+
+        expected = []
+        for context, year in cases:
+            turbine = self.make_turbine(context, year)
+            turbine.run()
+            expected.append(turbine.turbine_cost)
+
+        results = [None] * len(cases)
+        def evaluate(i):
+            for repeat in range(20):
+                turbine = self.make_turbine(*cases[i])
+                turbine.run()
+                if results[i] is None or results[i] == turbine.turbine_cost:
+                    results[i] = turbine.turbine_cost
+                else:
+                    results[i] = float('nan')
+
+        threads = [threading.Thread(target=evaluate, args=(i,)) for i in range(len(cases))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, expected)
+        self.assertEqual((ppi.ref_yr, ppi.ref_mon, ppi.curr_yr, ppi.curr_mon), dates)
+
+    def test_csm_component_dates(self):
+
+        blades = blades_csm_component()
+        blades.rotor_diameter = 126.0
+        blades.advanced_blade = False
+        blades.year = 2011
+        blades.month = 6
+        blades.run()
+
+        trb = tcc_csm_batch(126.0, 5000.0, 90.0, 505575.48, 4365250.94, year=2011, month=6, advanced_blade=False)
+        self.assertEqual(blades.blade_cost, trb['blade_cost'])
+        self.assertNotEqual(blades.blade_cost, tcc_csm_batch(126.0, 5000.0, 90.0, 505575.48, 4365250.94, \
+                                                            year=2009, month=12, advanced_blade=False)['blade_cost'])
 
 # turbine_costsse Model
 # ----------------------------------------------------------
@@ -505,6 +686,203 @@ class TestTurbineCostAdder(unittest.TestCase):
 
         check_gradient_unit_test(self, self.turbine)
 
+class TestTurbine_CostsSE_Flat(unittest.TestCase):
+
+    def setUp(self):
+
+        self.turbine = Turbine_CostsSE_Flat()
+        self.reference = Turbine_CostsSE()
+
+        for turbine in [self.turbine, self.reference]:
+            turbine.blade_mass = 17650.67  # inline with the windpact estimates
+            turbine.hub_mass = 31644.5
+            turbine.pitch_system_mass = 17004.0
+            turbine.spinner_mass = 1810.5
+            turbine.low_speed_shaft_mass = 31257.3
+            turbine.main_bearing_mass = 9731.41 / 2
+            turbine.second_bearing_mass = 9731.41 / 2
+            turbine.gearbox_mass = 30237.60
+            turbine.high_speed_side_mass = 1492.45
+            turbine.generator_mass = 16699.85
+            turbine.bedplate_mass = 93090.6
+            turbine.yaw_system_mass = 11878.24
+            turbine.tower_mass = 434559.0
+            turbine.machine_rating = 5000.0
+            turbine.blade_number = 3
+            turbine.drivetrain_design = 'geared'
+            turbine.crane = True
+            turbine.offshore = True
+            turbine.year = 2010
+            turbine.month =  12
+
+    def test_functionality(self):
+
+        for offshore in [True, False]:
+            self.turbine.offshore = offshore
+            self.reference.offshore = offshore
+            self.turbine.run()
+            self.reference.run()
+
+            self.assertAlmostEqual(self.turbine.turbine_cost, self.reference.turbine_cost, places=6)
+
+    def test_gradient(self):
+
+        check_gradient_unit_test(self, self.turbine)
+
+class TestTurbine_CostsSE_batch(unittest.TestCase):
+
+    def setUp(self):
+
+        self.scale = np.array([0.8, 1.0, 1.2])
+
+        self.masses = {'blade_mass' : 17650.67, 'hub_mass' : 31644.5, 'pitch_system_mass' : 17004.0, \
+                       'spinner_mass' : 1810.5, 'low_speed_shaft_mass' : 31257.3, \
+                       'main_bearing_mass' : 9731.41 / 2, 'second_bearing_mass' : 9731.41 / 2, \
+                       'gearbox_mass' : 30237.60, 'high_speed_side_mass' : 1492.45, \
+                       'generator_mass' : 16699.85, 'bedplate_mass' : 93090.6, \
+                       'yaw_system_mass' : 11878.24, 'tower_mass' : 434559.0, 'machine_rating' : 5000.0}
+        self.params = {'blade_number' : 3, 'drivetrain_design' : 'geared', 'crane' : True, \
+                       'offshore' : True, 'year' : 2010, 'month' : 12}
+
+    def run_batch(self):
+
+        inputs = dict((k, v * self.scale) for k, v in self.masses.items())
+        inputs.update(self.params)
+
+        return turbine_costsse_batch(**inputs)
+
+    def test_functionality(self):
+
+        costs = self.run_batch()
+
+        self.assertEqual(round(costs['turbine_cost'][1],2), 6153564.42)
+
+    def test_scalar_consistency(self):
+
+        costs = self.run_batch()
+
+        for i in range(len(self.scale)):
+            turbine = Turbine_CostsSE()
+            for k, v in self.masses.items():
+                setattr(turbine, k, v * self.scale[i])
+            for k, v in self.params.items():
+                setattr(turbine, k, v)
+            turbine.run()
+
+            self.assertAlmostEqual(costs['rotor_cost'][i] / turbine.rotorCC.cost, 1.0, places=12)
+            self.assertAlmostEqual(costs['nacelle_cost'][i] / turbine.nacelleCC.cost, 1.0, places=12)
+            self.assertAlmostEqual(costs['tower_cost'][i] / turbine.towerCC.cost, 1.0, places=12)
+            self.assertAlmostEqual(costs['turbine_cost'][i] / turbine.turbine_cost, 1.0, places=12)
+
+    def test_date_arrays(self):
+
+        years = np.array([2008, 2009, 2010])
+        months = np.array([3, 12, 6])
+        self.params['year'] = years
+        self.params['month'] = months
+        costs = self.run_batch()
+
+        for i in range(len(self.scale)):
+            self.params['year'] = years[i]
+            self.params['month'] = months[i]
+            single = self.run_batch()
+            self.assertEqual(costs['turbine_cost'][i], single['turbine_cost'][i])
+
+    def test_jacobian(self):
+
+        for drivetrain_design in ['geared', 'pm_direct_drive']:
+            self.params['drivetrain_design'] = drivetrain_design
+
+            inputs = dict((k, v * self.scale) for k, v in self.masses.items())
+            inputs.update(self.params)
+            J = turbine_costsse_batch_jacobian(**inputs)
+
+            self.assertEqual(J.shape, (len(self.scale), len(jacobian_outputs), len(jacobian_inputs)))
+
+            # central differences of the batch evaluation
+            for j, name in enumerate(jacobian_inputs):
+                step = 1e-6 * inputs[name]
+                inputs[name] = self.masses[name] * self.scale + step
+                plus = turbine_costsse_batch(**inputs)
+                inputs[name] = self.masses[name] * self.scale - step
+                minus = turbine_costsse_batch(**inputs)
+                inputs[name] = self.masses[name] * self.scale
+
+                for k, output in enumerate(jacobian_outputs):
+                    fd = (plus[output] - minus[output]) / (2 * step)
+                    np.testing.assert_allclose(J[:, k, j], fd, rtol=1e-5, atol=1e-6)
+
+    def test_adjoint_gradient(self):
+
+        self.params.update(assemblyCostMultiplier=0.3, overheadCostMultiplier=0.1, profitMultiplier=0.2, \
+                           transportMultiplier=0.05)
+
+        for drivetrain_design in ['geared', 'multi_drive', 'pm_direct_drive']:
+            self.params['drivetrain_design'] = drivetrain_design
+
+            inputs = dict((k, v * self.scale) for k, v in self.masses.items())
+            inputs.update(self.params)
+            cost, grad = turbine_cost_gradient(**inputs)
+            J = turbine_costsse_batch_jacobian(**inputs)
+
+            self.assertEqual(grad.shape, (len(self.scale), len(jacobian_inputs)))
+            np.testing.assert_array_equal(cost, turbine_costsse_batch(**inputs)['turbine_cost'])
+            np.testing.assert_allclose(grad, J[:, 0, :], rtol=1e-14, atol=1e-14)
+
+        # single design through the assembly
+        self.params['drivetrain_design'] = 'geared'
+        turbine = Turbine_CostsSE()
+        for k, v in self.masses.items():
+            setattr(turbine, k, v)
+        for k, v in self.params.items():
+            setattr(turbine, k, v)
+        turbine.run()
+        cost, grad = turbine.gradient()
+
+        self.assertAlmostEqual(cost / turbine.turbine_cost, 1.0, places=12)
+        self.assertEqual(grad.shape, (len(jacobian_inputs),))
+        np.testing.assert_allclose(grad, turbine_costsse_batch_jacobian(**dict(self.masses, **self.params))[0, :], \
+                                   rtol=1e-14, atol=1e-14)
+
+
+class TestLinearTurbineCost(unittest.TestCase):
+
+    def setUp(self):
+
+        reference = np.array([17650.67, 31644.5, 17004.0, 1810.5, 31257.3, 9731.41, 9731.41, 30237.60, 1492.45, \
+                              16699.85, 93090.6, 11878.24, 434559.0, 5000.0])
+        self.masses = reference * np.linspace(0.5, 1.5, 20)[:, np.newaxis]
+
+    def test_geared(self):
+
+        params = dict(advanced_blade=True, drivetrain_design='geared', crane=True, offshore=True, year=2010, month=12, \
+                      assemblyCostMultiplier=0.3, profitMultiplier=0.2)
+        model = compile_turbine_costsse(**params)
+        costs = turbine_costsse_batch(*self.masses.T, **params)
+
+        self.assertEqual([(name, exponent) for name, column, scale, exponent in model.nonlinear], [('pitch_system_mass', 1.4985)])
+        np.testing.assert_allclose(model.evaluate(self.masses), costs['turbine_cost'], rtol=1e-13)
+
+        # without the pitch system the cost is a single matrix product
+        self.masses[:, model.inputs.index('pitch_system_mass')] = 0.0
+        costs = turbine_costsse_batch(*self.masses.T, **params)
+        np.testing.assert_allclose(self.masses.dot(model.w) + model.c, costs['turbine_cost'], rtol=1e-13)
+
+    def test_drivetrains(self):
+
+        # rating-based gearbox costs overflow at full scale ratings; keep machine_rating small
+        self.masses[:, -1] = np.linspace(0.5, 1.5, 20)
+
+        for drivetrain_design, terms in [('single_stage', 2), ('multi_drive', 2), ('pm_direct_drive', 1)]:
+            params = dict(advanced_blade=False, drivetrain_design=drivetrain_design, crane=False, offshore=False)
+            model = compile_turbine_costsse(**params)
+            costs = turbine_costsse_batch(*self.masses.T, **params)
+
+            self.assertEqual(len(model.nonlinear), terms)
+            self.assertFalse(model.is_linear())
+            np.testing.assert_allclose(model.evaluate(self.masses), costs['turbine_cost'], rtol=1e-13)
+
+
 
 # NREL CSM TCC Components
 # ----------------------------------------------------------
@@ -660,6 +1038,1085 @@ class Test_tcc_csm_assembly(unittest.TestCase):
         
         self.assertEqual(round(self.trb.turbine_cost,2), 5950346.87)
 
+class Test_tcc_csm_batch(unittest.TestCase):
+
+    def setUp(self):
+
+        self.rotor_diameter = np.array([110.0, 126.0, 140.0])
+        self.rotor_thrust = 505575.481173 * (self.rotor_diameter / 126.0)**2
+        self.rotor_torque = 4365250.93957 * (self.rotor_diameter / 126.0)
+        self.params = {'advanced_blade' : True, 'blade_number' : 3, 'offshore' : True, 'year' : 2009, 'month' : 12}
+
+    def test_functionality(self):
+
+        trb = tcc_csm_batch(self.rotor_diameter, 5000.0, 90.0, self.rotor_thrust, self.rotor_torque, **self.params)
+
+        self.assertEqual(round(trb['turbine_cost'][1],2), 5950346.87)
+
+    def test_jacobian(self):
+
+        J = tcc_csm_batch_jacobian(self.rotor_diameter, 5000.0, 90.0, self.rotor_thrust, self.rotor_torque, **self.params)
+        self.assertEqual(J.shape, (3, 2, 5))
+
+    def test_scalar_consistency(self):
+
+        trb = tcc_csm_batch(self.rotor_diameter, 5000.0, 90.0, self.rotor_thrust, self.rotor_torque, **self.params)
+
+        for i in range(len(self.rotor_diameter)):
+            scalar = tcc_csm_assembly()
+            scalar.rotor_diameter = self.rotor_diameter[i]
+            scalar.hub_height = 90.0
+            scalar.machine_rating = 5000.0
+            scalar.rotor_thrust = self.rotor_thrust[i]
+            scalar.rotor_torque = self.rotor_torque[i]
+            for k, v in self.params.items():
+                setattr(scalar, k, v)
+            scalar.run()
+
+            for name in ['blade_mass', 'blade_cost']:
+                self.assertAlmostEqual(trb[name][i] / getattr(scalar.blades, name), 1.0, places=12)
+            for name in ['hub_system_mass', 'hub_system_cost']:
+                self.assertAlmostEqual(trb[name][i] / getattr(scalar.hub, name), 1.0, places=12)
+            for name in ['nacelle_mass', 'lowSpeedShaft_mass', 'mainframeTotal_mass', 'nacelle_cost', 'mainframeTotal_cost']:
+                self.assertAlmostEqual(trb[name][i] / getattr(scalar.nacelle, name), 1.0, places=12)
+            for name in ['tower_mass', 'tower_cost']:
+                self.assertAlmostEqual(trb[name][i] / getattr(scalar.tower, name), 1.0, places=12)
+            self.assertAlmostEqual(trb['turbine_mass'][i] / scalar.turbine_mass, 1.0, places=12)
+            self.assertAlmostEqual(trb['turbine_cost'][i] / scalar.turbine_cost, 1.0, places=12)
+
+    def test_date_arrays(self):
+
+        years = np.array([2008, 2009, 2010, 2011])
+        self.params['year'] = years
+        trb = tcc_csm_batch(126.0, 5000.0, 90.0, self.rotor_thrust[1], self.rotor_torque[1], **self.params)
+
+        self.assertEqual(trb['turbine_cost'].shape, years.shape)
+        for i in range(len(years)):
+            self.params['year'] = years[i]
+            single = tcc_csm_batch(126.0, 5000.0, 90.0, self.rotor_thrust[1], self.rotor_torque[1], **self.params)
+            self.assertEqual(trb['turbine_cost'][i], single['turbine_cost'])
+
+class Test_nacelle_csm_batch(unittest.TestCase):
+
+    def setUp(self):
+
+        self.drivetrain_design = np.array(['geared', 'single_stage', 'pm_direct_drive', 'geared', 'pm_direct_drive'])
+        self.rotor_diameter = np.array([126.0, 110.0, 126.0, 140.0, 90.0])
+        self.machine_rating = np.array([5000.0, 3500.0, 5000.0, 6000.0, 2500.0])
+        self.rotor_mass = 123193.30 * (self.rotor_diameter / 126.0)**2.5
+        self.rotor_thrust = 500930.1 * (self.rotor_diameter / 126.0)**2
+        self.rotor_torque = 4365249. * (self.machine_rating / 5000.0) * (self.rotor_diameter / 126.0)
+
+    def test_mixed_drivetrains(self):
+
+        nac = nacelle_csm(self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating, \
+                          escalator_snapshot(2009, 12), self.drivetrain_design, crane=True, advanced_bedplate=0, offshore=True)
+
+        for i in range(len(self.drivetrain_design)):
+            scalar = nacelle_csm_component()
+            scalar.rotor_diameter = self.rotor_diameter[i]
+            scalar.machine_rating = self.machine_rating[i]
+            scalar.rotor_mass = self.rotor_mass[i]
+            scalar.rotor_thrust = self.rotor_thrust[i]
+            scalar.rotor_torque = self.rotor_torque[i]
+            scalar.drivetrain_design = self.drivetrain_design[i]
+            scalar.offshore = True
+            scalar.crane = True
+            scalar.advanced_bedplate = 0
+            scalar.year = 2009
+            scalar.month = 12
+            scalar.run()
+
+            for name in ['nacelle_mass', 'gearbox_mass', 'generator_mass', 'mainframeTotal_mass', \
+                         'nacelle_cost', 'gearbox_cost', 'generator_cost', 'mainframeTotal_cost']:
+                self.assertAlmostEqual(nac[name][i], getattr(scalar, name), delta=1e-12 * abs(getattr(scalar, name)))
+
+class Test_csm_kernels(unittest.TestCase):
+
+    def setUp(self):
+
+        self.drivetrain_design = np.array(['geared', 'single_stage', 'multi_drive', 'pm_direct_drive'])
+        self.rotor_diameter = np.array([126.0, 110.0, 140.0, 126.0])
+        self.machine_rating = np.array([5000.0, 3000.0, 6000.0, 5000.0])
+        self.rotor_mass = 123193.3 * (self.rotor_diameter / 126.0)**3
+        self.rotor_thrust = 500930.1 * (self.rotor_diameter / 126.0)**2
+        self.rotor_torque = 4365249. * (self.machine_rating / 5000.0) * (self.rotor_diameter / 126.0)
+        self.hub_height = np.array([90.0, 80.0, 100.0, 90.0])
+        self.esc = escalator_snapshot(2009, 12)
+
+    def test_component_jacobians(self):
+
+        J_nacelle = nacelle_csm_jacobian(self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, \
+                                         self.machine_rating, self.esc, self.drivetrain_design, crane=True, \
+                                         advanced_bedplate=0, offshore=True)
+        J_blades = blades_csm_jacobian(self.rotor_diameter, self.esc, advanced_blade=True)
+        J_hub = hub_csm_jacobian(self.rotor_diameter, 17650.67, self.esc, blade_number=3)
+        J_tower = tower_csm_jacobian(self.rotor_diameter, self.hub_height, self.esc)
+
+        self.assertEqual(J_nacelle.shape, (4, 26, 5))
+        self.assertEqual(J_hub.shape, (4, 8, 2))
+
+        for i in range(len(self.drivetrain_design)):
+            nacelle = nacelle_csm_component()
+            nacelle.rotor_diameter = self.rotor_diameter[i]
+            nacelle.machine_rating = self.machine_rating[i]
+            nacelle.rotor_mass = self.rotor_mass[i]
+            nacelle.rotor_thrust = self.rotor_thrust[i]
+            nacelle.rotor_torque = self.rotor_torque[i]
+            nacelle.drivetrain_design = self.drivetrain_design[i]
+            nacelle.run()
+
+            blades = blades_csm_component()
+            blades.rotor_diameter = self.rotor_diameter[i]
+            blades.advanced_blade = True
+            blades.run()
+
+            hub = hub_csm_component()
+            hub.rotor_diameter = self.rotor_diameter[i]
+            hub.blade_mass = 17650.67
+            hub.run()
+
+            tower = tower_csm_component()
+            tower.rotor_diameter = self.rotor_diameter[i]
+            tower.hub_height = self.hub_height[i]
+            tower.run()
+
+            for J, component in [(J_nacelle, nacelle), (J_blades, blades), (J_hub, hub), (J_tower, tower)]:
+                np.testing.assert_allclose(J[i], component.provideJ(), rtol=1e-12, atol=1e-12)
+
+    def test_sparse_jacobians(self):
+
+        values = nacelle_csm_jacobian_values(self.rotor_diameter, self.rotor_mass, self.rotor_thrust, \
+                                             self.rotor_torque, self.machine_rating, self.esc, self.drivetrain_design)
+        J = nacelle_csm_jacobian(self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, \
+                                 self.machine_rating, self.esc, self.drivetrain_design)
+
+        self.assertEqual(values.shape, (4, nacelle_csm_pattern.nnz))
+
+        # no nonzero derivative falls outside the pattern
+        mask = nacelle_csm_pattern.dense(np.ones(nacelle_csm_pattern.nnz))
+        self.assertFalse(np.any(J[:, mask == 0]))
+
+        # the block diagonal sparse Jacobian of all designs holds each dense Jacobian
+        J_sparse = nacelle_csm_pattern.csr(values).toarray()
+        data, rows, cols = nacelle_csm_pattern.coo(values)
+        J_coo = np.zeros(J_sparse.shape)
+        J_coo[rows, cols] = data
+        for i in range(len(self.drivetrain_design)):
+            block = J_sparse[26*i:26*(i+1), 5*i:5*(i+1)]
+            np.testing.assert_array_equal(block, J[i])
+            np.testing.assert_array_equal(J_coo[26*i:26*(i+1), 5*i:5*(i+1)], J[i])
+        self.assertEqual(np.count_nonzero(J_sparse), np.count_nonzero(J))
+
+    def test_sparse_components(self):
+
+        nacelle = nacelle_csm_component()
+        nacelle.drivetrain_design = 'pm_direct_drive'
+        nacelle.run()
+
+        tcc = tcc_csm_component()
+        tcc.offshore = True
+        tcc.run()
+
+        for component, pattern in [(nacelle, nacelle_csm_pattern), (tcc, tcc_csm_pattern)]:
+            J_sparse = component.provideJ_sparse()
+            self.assertEqual(J_sparse.nnz, pattern.nnz)
+            np.testing.assert_array_equal(J_sparse.toarray(), component.provideJ())
+
+        J = tcc_csm_jacobian(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, offshore=True)
+        np.testing.assert_array_equal(tcc.provideJ(), J)
+
+class TestDualNumbers(unittest.TestCase):
+
+    def setUp(self):
+
+        self.drivetrain_design = np.array(['geared', 'single_stage', 'multi_drive', 'pm_direct_drive'])
+        self.rotor_diameter = np.array([126.0, 110.0, 140.0, 126.0])
+        self.machine_rating = np.array([5000.0, 3000.0, 6000.0, 5000.0])
+        self.rotor_mass = 123193.3 * (self.rotor_diameter / 126.0)**3
+        self.rotor_thrust = 500930.1 * (self.rotor_diameter / 126.0)**2
+        self.rotor_torque = 4365249. * (self.machine_rating / 5000.0) * (self.rotor_diameter / 126.0)
+        self.esc = escalator_snapshot(2009, 12)
+
+    def components(self, assembly):
+
+        for name in assembly.list_components():
+            component = getattr(assembly, name)
+            if hasattr(component, 'list_components'):
+                for sub in self.components(component):
+                    yield sub
+            else:
+                yield component
+
+    def test_components(self):
+
+        turbines = []
+        for derivatives in ['analytic', 'dual']:
+            turbine = Turbine_CostsSE()
+            for name, value in [('blade_mass', 17650.67), ('hub_mass', 31644.5), ('pitch_system_mass', 17004.0), \
+                                ('spinner_mass', 1810.5), ('low_speed_shaft_mass', 31257.3), \
+                                ('main_bearing_mass', 9731.41 / 2), ('second_bearing_mass', 9731.41 / 2), \
+                                ('gearbox_mass', 30237.60), ('high_speed_side_mass', 1492.45), \
+                                ('generator_mass', 16699.85), ('bedplate_mass', 93090.6), ('yaw_system_mass', 11878.24), \
+                                ('tower_mass', 434559.0), ('machine_rating', 5000.0), ('crane', True), ('offshore', True), \
+                                ('year', 2010), ('month', 12)]:
+                setattr(turbine, name, value)
+            set_context(turbine, EvaluationContext(derivatives=derivatives))
+            turbine.run()
+
+            trb = tcc_csm_assembly()
+            for name, value in [('rotor_diameter', 126.0), ('hub_height', 90.0), ('machine_rating', 5000.0), \
+                                ('rotor_thrust', 500930.1), ('rotor_torque', 4365249.), ('year', 2009), ('month', 12)]:
+                setattr(trb, name, value)
+            set_context(trb, EvaluationContext(derivatives=derivatives))
+            trb.run()
+
+            turbines.append(list(self.components(turbine)) + list(self.components(trb)))
+
+        for analytic, dual in zip(*turbines):
+            np.testing.assert_allclose(dual.provideJ(), analytic.provideJ(), rtol=1e-12, atol=1e-12)
+
+        self.assertRaises(ValueError, EvaluationContext, derivatives='complex')
+
+    def test_batch(self):
+
+        args = (self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating, \
+                self.esc, self.drivetrain_design)
+
+        out, J = forward_mode(nacelle_csm, range(5), nacelle_csm_outputs)(*args)
+        values = nacelle_csm(*args)
+
+        self.assertEqual(J.shape, (4, 26, 5))
+        for name in nacelle_csm_outputs:
+            np.testing.assert_array_equal(out[name], values[name])
+        np.testing.assert_allclose(J, nacelle_csm_jacobian(*args), rtol=1e-12, atol=1e-12)
+
+    def test_array_escalators(self):
+
+        # escalators gathered for an array of dates multiply Duals from the left
+        esc = escalators(np.array([2008, 2009, 2010, 2011]), 12)
+        args = (self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating, \
+                esc, self.drivetrain_design)
+
+        self.assertTrue(isinstance(esc['IPPI_LSS'] * Dual(self.rotor_mass, np.ones((4, 1))), Dual))
+        J = forward_mode(nacelle_csm, range(5), nacelle_csm_outputs)(*args)[1]
+        self.assertTrue(np.all(J[:, nacelle_csm_outputs.index('nacelle_cost'), 0] != 0.0))
+        np.testing.assert_allclose(J, nacelle_csm_jacobian(*args), rtol=1e-12, atol=1e-12)
+
+    def test_directional(self):
+
+        # derivative along a single direction of rotor_diameter and machine_rating
+        direction = np.array([1.0, 0.0, 0.0, 0.0, 100.0])
+        inputs = [self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating]
+        duals = [Dual(x, np.zeros(x.shape + (1,)) + d) for x, d in zip(inputs, direction)]
+
+        out = nacelle_csm(*(duals + [self.esc, self.drivetrain_design]))
+        J = nacelle_csm_jacobian(*(inputs + [self.esc, self.drivetrain_design]))
+
+        np.testing.assert_allclose(out['nacelle_cost'].deriv[:, 0], J[:, 13, :].dot(direction), rtol=1e-12)
+
+    def hessian_difference(self, jacobian, args, inputs, relative_step=1e-5):
+
+        # central differences of a hand-written Jacobian kernel
+        H = []
+        for i in inputs:
+            x = np.asarray(args[i], dtype=np.float64)
+            step = relative_step * np.maximum(np.abs(x), 1.0)
+            plus, minus = list(args), list(args)
+            plus[i], minus[i] = x + step, x - step
+            H.append((jacobian(*plus) - jacobian(*minus)) / (2 * step)[..., np.newaxis, np.newaxis])
+
+        return np.stack(H, axis=-1)
+
+    def test_hessians(self):
+
+        hub_height = np.array([90.0, 80.0, 100.0, 120.0])
+        blade_mass = np.array([17650.67, 12000.0, 25000.0, 17650.67])
+        for advanced in [True, False]:
+            args = [self.rotor_diameter, self.esc, advanced]
+            np.testing.assert_allclose(blades_csm_hessian(*args), self.hessian_difference(blades_csm_jacobian, args, [0]), \
+                                       rtol=1e-7, atol=1e-9)
+            args = [self.rotor_diameter, hub_height, self.esc, advanced]
+            np.testing.assert_allclose(tower_csm_hessian(*args), self.hessian_difference(tower_csm_jacobian, args, [0, 1]), \
+                                       rtol=1e-7, atol=1e-9)
+        args = [self.rotor_diameter, blade_mass, self.esc, 3]
+        np.testing.assert_allclose(hub_csm_hessian(*args), self.hessian_difference(hub_csm_jacobian, args, [0, 1]), \
+                                   rtol=1e-7, atol=1e-9)
+
+        args = [self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating, \
+                self.esc, self.drivetrain_design]
+        H = nacelle_csm_hessian(*args)
+        self.assertEqual(H.shape, (4, 26, 5, 5))
+        np.testing.assert_array_equal(H, np.swapaxes(H, -1, -2))
+        np.testing.assert_allclose(H, self.hessian_difference(nacelle_csm_jacobian, args, range(5)), rtol=1e-7, atol=1e-9)
+
+        out, J, H = second_order_mode(nacelle_csm, range(5), nacelle_csm_outputs)(*args)
+        np.testing.assert_allclose(J, nacelle_csm_jacobian(*args), rtol=1e-12, atol=1e-12)
+        np.testing.assert_array_equal(out['nacelle_cost'], nacelle_csm(*args)['nacelle_cost'])
+
+        # components at a single design
+        for component, hessian, args in [(blades_csm_component(), blades_csm_hessian, [126.0, escalator_snapshot(2009, 12), False]),
+                                         (tower_csm_component(), tower_csm_hessian, [126.0, 90.0, escalator_snapshot(2009, 12), False])]:
+            component.run()
+            np.testing.assert_array_equal(component.provideH(), hessian(*args))
+
+        nac = nacelle_csm_component()
+        for name, value in [('rotor_diameter', 126.0), ('rotor_mass', 123193.3), ('rotor_thrust', 500930.1), \
+                            ('rotor_torque', 4365249.), ('machine_rating', 5000.0), ('year', 2009), ('month', 12)]:
+            setattr(nac, name, value)
+        nac.run()
+        H = nac.provideH()
+        self.assertEqual(H.shape, (26, 5, 5))
+        np.testing.assert_array_equal(H, nacelle_csm_hessian(126.0, 123193.3, 500930.1, 4365249., 5000.0, \
+                                      escalator_snapshot(2009, 12), nac.drivetrain_design, nac.crane, \
+                                      nac.advanced_bedplate, nac.offshore))
+
+class TestGradientCheck(unittest.TestCase):
+
+    # worst-case relative error allowed for each reference derivative method
+    tolerance = {'complex' : 1e-12, 'central' : 1e-5}
+
+    def check(self, cases):
+
+        for report in check_gradients(cases):
+            self.assertLess(report['max_error'].max(), self.tolerance[report['method']], report['name'])
+            self.assertEqual(report['points'], 1000)
+
+    def test_costsse(self):
+
+        self.check(costsse_cases(n=1000))
+
+    def test_csm(self):
+
+        self.check(csm_cases(n=1000))
+
+    def test_detects_error(self):
+
+        mass = np.linspace(1e4, 5e4, 1000)
+        esc = escalator_snapshot(2009, 12)
+        wrong = lambda hub_mass, esc: 1.01 * hub_cost_jacobian(hub_mass, esc)
+        report = check_gradient(GradientCase('HubCost', hub_cost, wrong, [mass, esc], [0]))
+
+        self.assertAlmostEqual(report['max_error'][0, 0], 0.01 / 1.01, places=12)
+
+class TestLazyDerivatives(unittest.TestCase):
+
+    def test_nacelle(self):
+
+        nac = nacelle_csm_component()
+        for name, value in [('rotor_diameter', 126.0), ('rotor_mass', 123193.3), ('rotor_thrust', 500930.1), \
+                            ('rotor_torque', 4365249.), ('machine_rating', 5000.0), ('year', 2009), ('month', 12)]:
+            setattr(nac, name, value)
+
+        for rotor_diameter in [126.0, 110.0]:
+            nac.rotor_diameter = rotor_diameter
+            nac.run()
+
+            # execute only records the Jacobian arguments
+            self.assertTrue(nac._jacobian is None)
+
+            J = nac.provideJ()
+            np.testing.assert_array_equal(J, nacelle_csm_jacobian(rotor_diameter, 123193.3, 500930.1, 4365249., 5000.0, \
+                                          escalator_snapshot(2009, 12), nac.drivetrain_design, nac.crane, \
+                                          nac.advanced_bedplate, nac.offshore))
+            self.assertTrue(deferred_jacobian(nac) is deferred_jacobian(nac))
+
+    def test_flat(self):
+
+        flat = Turbine_CostsSE_Flat()
+        for name, value in [('blade_mass', 17650.67), ('tower_mass', 434559.0), ('machine_rating', 5000.0), \
+                            ('year', 2010), ('month', 12)]:
+            setattr(flat, name, value)
+        flat.run()
+
+        self.assertTrue(flat._jacobian is None)
+        self.assertEqual(flat.provideJ().shape, (1, len(jacobian_inputs)))
+
+def assert_same_state(test, assembly, reference):
+    '''
+    Check that every component of assembly has the outputs and provideJ derivatives
+    of its counterpart in reference.
+    '''
+
+    state, expected = assembly_state(assembly), assembly_state(reference)
+    test.assertEqual(sorted(state), sorted(expected))
+    for path in expected:
+        test.assertEqual(state[path]['outputs'], expected[path]['outputs'])
+
+        component, counterpart = assembly, reference
+        for name in path.split('.') if path else []:
+            component, counterpart = getattr(component, name), getattr(counterpart, name)
+        if hasattr(counterpart, '_jacobian_call'):
+            np.testing.assert_array_equal(component.provideJ(), counterpart.provideJ())
+
+class TestEvaluationMemo(unittest.TestCase):
+
+    def test_lru(self):
+
+        memo = EvaluationMemo(maxsize=2)
+        memo.put('a', 1)
+        memo.put('b', 2)
+        self.assertEqual(memo.get('a'), 1)
+        memo.put('c', 3)
+
+        self.assertEqual(memo.get('b'), None)
+        self.assertEqual(memo.get('c'), 3)
+        self.assertEqual(memo.stats(), {'hits' : 2, 'misses' : 1, 'evictions' : 1, 'size' : 2, 'maxsize' : 2})
+
+        memo.clear()
+        self.assertEqual(memo.stats()['size'], 0)
+        self.assertEqual(memo.stats()['hits'], 0)
+
+    def test_turbine_costsse(self):
+
+        inputs = [('blade_mass', 17650.67), ('hub_mass', 31644.5), ('pitch_system_mass', 17004.0), \
+                  ('spinner_mass', 1810.5), ('low_speed_shaft_mass', 31257.3), \
+                  ('main_bearing_mass', 9731.41 / 2), ('second_bearing_mass', 9731.41 / 2), \
+                  ('gearbox_mass', 30237.60), ('high_speed_side_mass', 1492.45), \
+                  ('generator_mass', 16699.85), ('bedplate_mass', 93090.6), ('yaw_system_mass', 11878.24), \
+                  ('tower_mass', 434559.0), ('machine_rating', 5000.0), ('crane', True), ('offshore', True), \
+                  ('year', 2010), ('month', 12)]
+        turbine, reference = Turbine_CostsSE(), Turbine_CostsSE()
+        for name, value in inputs:
+            setattr(turbine, name, value)
+            setattr(reference, name, value)
+        reference.run()
+        cost = reference.turbine_cost
+
+        memo = EvaluationMemo()
+        set_memo(turbine, memo)
+        turbine.run()
+        turbine.tower_mass = 400000.0
+        turbine.run()
+        self.assertEqual(memo.stats()['misses'], 2)
+
+        # a hit restores the outputs and derivatives of every component without running them
+        turbine.tower_mass = 434559.0
+        turbine.run()
+        self.assertEqual(memo.stats()['hits'], 1)
+        self.assertEqual(turbine.turbine_cost, cost)
+        assert_same_state(self, turbine, reference)
+
+        # and the sub-assemblies compare their next inputs with the restored run
+        for assembly in [turbine, reference]:
+            assembly.tower_mass = 400000.0
+            assembly.blade_mass = 18000.0
+            assembly.run()
+        assert_same_state(self, turbine, reference)
+        self.assertEqual(memo.stats()['misses'], 3)
+        turbine.tower_mass = 434559.0
+        turbine.blade_mass = 17650.67
+
+        # every input and flag is part of the key
+        turbine.year = 2011
+        turbine.run()
+        self.assertNotEqual(turbine.turbine_cost, cost)
+        turbine.year = 2010
+        turbine.offshore = False
+        turbine.run()
+        self.assertNotEqual(turbine.turbine_cost, cost)
+        self.assertEqual(memo.stats()['misses'], 5)
+
+        masses = [getattr(turbine, name) for name in jacobian_inputs]
+        J = turbine_costsse_batch_jacobian(*masses, **dict(advanced_blade=True, crane=True, offshore=False, \
+                                                           year=2010, month=12, blade_number=turbine.blade_number))
+        np.testing.assert_array_equal(turbine.jacobian(), J)
+        np.testing.assert_array_equal(turbine.jacobian(), J)
+        self.assertEqual(memo.stats()['hits'], 2)
+
+    def test_tcc_csm_assembly(self):
+
+        memo = EvaluationMemo(maxsize=1)
+        trb = tcc_csm_assembly()
+        for name, value in [('rotor_diameter', 126.0), ('hub_height', 90.0), ('machine_rating', 5000.0), \
+                            ('rotor_thrust', 500930.1), ('rotor_torque', 4365249.), ('year', 2009), ('month', 12)]:
+            setattr(trb, name, value)
+        set_memo(trb, memo)
+
+        trb.run()
+        trb.run()
+        self.assertEqual((memo.hits, memo.misses), (1, 1))
+
+        J = trb.jacobian()
+        np.testing.assert_array_equal(J, tcc_csm_batch_jacobian(126.0, 5000.0, 90.0, 500930.1, 4365249.))
+        self.assertEqual(memo.evictions, 1)
+
+        # integer and float inputs of equal value share a key, contexts do not
+        key = input_key(trb, trb.memo_inputs)
+        trb.rotor_diameter = 126
+        self.assertEqual(input_key(trb, trb.memo_inputs), key)
+        set_context(trb, EvaluationContext(derivatives='dual'))
+        self.assertNotEqual(input_key(trb, trb.memo_inputs), key)
+
+class TestDiskMemo(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'memo.sqlite')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def assembly(self, memo):
+
+        trb = tcc_csm_assembly()
+        for name, value in [('rotor_diameter', 126.0), ('hub_height', 90.0), ('machine_rating', 5000.0), \
+                            ('rotor_thrust', 500930.1), ('rotor_torque', 4365249.), ('year', 2009), ('month', 12)]:
+            setattr(trb, name, value)
+        set_memo(trb, memo)
+
+        return trb
+
+    def test_persistence(self):
+
+        memo = DiskMemo(self.path)
+        trb = self.assembly(memo)
+        trb.run()
+        J = trb.jacobian()
+        memo.close()
+
+        # a later run finds the state of every component and the Jacobian on disk
+        memo = DiskMemo(self.path)
+        trb = self.assembly(memo)
+        trb.run()
+        reference = self.assembly(None)
+        reference.run()
+        assert_same_state(self, trb, reference)
+        self.assertEqual(trb.turbine_cost, tcc_csm_batch(126.0, 5000.0, 90.0, 500930.1, 4365249.)['turbine_cost'])
+        np.testing.assert_array_equal(trb.jacobian(), J)
+        self.assertEqual(memo.stats()['hits'], 2)
+        self.assertEqual(len(memo), 2)
+
+        # other model coefficients never hit, and prune drops their entries
+        memo.fingerprint = 'other'
+        trb.run()
+        self.assertEqual(memo.stats()['misses'], 1)
+        self.assertEqual(memo.prune(), 2)
+        self.assertEqual(len(memo), 1)
+
+    def test_unpicklable(self):
+
+        # the forward-mode Jacobian kernels of derivatives='dual' are not stored, the dataflow runs each time
+        memo = DiskMemo(self.path)
+        trb = self.assembly(memo)
+        set_context(trb, EvaluationContext(derivatives='dual'))
+        trb.run()
+        trb.run()
+        self.assertEqual((memo.stats()['hits'], memo.stats()['misses'], len(memo)), (0, 2, 0))
+        self.assertEqual(trb.turbine_cost, tcc_csm_batch(126.0, 5000.0, 90.0, 500930.1, 4365249.)['turbine_cost'])
+
+    def test_processes(self):
+
+        memo = DiskMemo(self.path)
+
+        def write(offset):
+            for i in range(50):
+                memo.put(('design{0}'.format(offset + i), 'outputs'), {'turbine_cost' : float(offset + i)})
+
+        workers = [multiprocessing.Process(target=write, args=(50 * k,)) for k in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+        self.assertEqual(len(memo), 200)
+        self.assertEqual(memo.get(('design123', 'outputs')), {'turbine_cost' : 123.0})
+
+class TestChangedInputs(unittest.TestCase):
+
+    def turbine(self, **inputs):
+
+        turbine = Turbine_CostsSE()
+        for name, value in [('blade_mass', 17650.67), ('hub_mass', 31644.5), ('pitch_system_mass', 17004.0), \
+                            ('spinner_mass', 1810.5), ('low_speed_shaft_mass', 31257.3), \
+                            ('main_bearing_mass', 9731.41 / 2), ('second_bearing_mass', 9731.41 / 2), \
+                            ('gearbox_mass', 30237.60), ('high_speed_side_mass', 1492.45), \
+                            ('generator_mass', 16699.85), ('bedplate_mass', 93090.6), ('yaw_system_mass', 11878.24), \
+                            ('tower_mass', 434559.0), ('machine_rating', 5000.0), ('crane', True), ('offshore', True), \
+                            ('year', 2010), ('month', 12)] + inputs.items():
+            setattr(turbine, name, value)
+
+        return turbine
+
+    def test_subsystems(self):
+
+        turbine = self.turbine()
+        turbine.run()
+        self.assertEqual(turbine.skipped_executions()['total'], 0)
+        self.assertEqual(sorted(tracked_inputs(turbine.towerCC)), ['month', 'tower_mass', 'year'])
+        self.assertTrue(all(name in tracked_inputs(turbine.nacelleCC) for name in ['drivetrain_design', 'crane']))
+
+        # only the tower sub-assembly re-runs
+        turbine.tower_mass = 400000.0
+        turbine.run()
+        self.assertEqual((turbine.rotorCC.skipped_runs, turbine.nacelleCC.skipped_runs, turbine.towerCC.skipped_runs), \
+                         (1, 1, 0))
+        reference = self.turbine(tower_mass=400000.0)
+        reference.run()
+        self.assertEqual(turbine.turbine_cost, reference.turbine_cost)
+
+        # only TurbineCostAdder re-runs
+        turbine.profitMultiplier = 0.1
+        turbine.run()
+        self.assertEqual((turbine.rotorCC.skipped_runs, turbine.nacelleCC.skipped_runs, turbine.towerCC.skipped_runs), \
+                         (2, 2, 1))
+        reference = self.turbine(tower_mass=400000.0, profitMultiplier=0.1)
+        reference.run()
+        self.assertEqual(turbine.turbine_cost, reference.turbine_cost)
+
+        counts = turbine.skipped_executions()
+        self.assertEqual(counts['towerCC'], len(turbine.towerCC.list_components()))
+        self.assertEqual(counts['total'], counts['rotorCC'] + counts['nacelleCC'] + counts['towerCC'])
+
+        # the target date and context reach every sub-assembly
+        turbine.year = 2011
+        turbine.run()
+        set_context(turbine, EvaluationContext(derivatives='dual'))
+        turbine.run()
+        self.assertEqual(turbine.skipped_executions(), counts)
+
+def sweep_designs():
+
+    rotor_diameter = np.linspace(100.0, 160.0, 23)
+    designs = {'rotor_diameter' : rotor_diameter, 'machine_rating' : np.linspace(3000.0, 8000.0, 23), \
+               'hub_height' : 90.0 * np.ones(23), 'rotor_thrust' : 505575.481173 * (rotor_diameter / 126.0)**2, \
+               'rotor_torque' : 4365250.93957 * (rotor_diameter / 126.0), \
+               'drivetrain_design' : ['geared', 'single_stage', 'multi_drive', 'pm_direct_drive'] * 5 + ['geared'] * 3, \
+               'year' : [2009, 2010, 2011] * 7 + [2012, 2012]}
+    params = {'advanced_blade' : True, 'offshore' : True, 'month' : 12, 'context' : EvaluationContext(ref_yr=2002)}
+
+    return designs, params
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+
+        self.designs, self.params = sweep_designs()
+
+    def test_processes(self):
+
+        reports = []
+        trb = tcc_csm_sweep(self.designs, chunk_size=5, processes=2, progress=reports.append, **self.params)
+        reference = tcc_csm_batch(**dict(self.params, **self.designs))
+
+        self.assertEqual(sorted(trb.keys()), sorted(reference.keys()))
+        for name in reference:
+            np.testing.assert_array_equal(trb[name], reference[name])
+
+        # one report per chunk, in the order the chunks finish
+        done = [report['done'] for report in reports]
+        self.assertEqual((len(done), done[-1]), (5, 23))
+        self.assertEqual(done, sorted(done))
+        self.assertTrue(all(report['total'] == 23 and report['throughput'] > 0 for report in reports))
+
+    def test_columns(self):
+
+        self.assertRaises(ValueError, tcc_csm_sweep, dict(self.designs, hub_height=[90.0]), processes=1)
+        self.assertRaises(ValueError, tcc_csm_sweep, self.designs, processes=1, year=2009)
+
+class TestClusterSweep(unittest.TestCase):
+
+    def setUp(self):
+
+        self.designs, self.params = sweep_designs()
+
+    def run_with_lost_chunk(self, coordinator):
+
+        result = {}
+
+        def run():
+            try:
+                result['out'] = coordinator.run(timeout=60.0)
+            except RuntimeError as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=run)
+        thread.start()
+
+        # a worker that takes a chunk and disconnects
+        lost = Client(coordinator.address, authkey=coordinator.authkey)
+        self.assertEqual(lost.recv()[0], 'chunk')
+        lost.close()
+
+        return thread, result
+
+    def test_processes(self):
+
+        reports = []
+        busy = threading.Lock()
+
+        def progress(report):
+            # overlapping is set when another worker thread is reporting at the same time
+            overlapping = not busy.acquire(False)
+            time.sleep(0.01)
+            reports.append(dict(report, overlapping=overlapping))
+            if not overlapping:
+                busy.release()
+
+        trb = tcc_csm_cluster_sweep(self.designs, workers=2, chunk_size=5, progress=progress, timeout=60.0, \
+                                    **self.params)
+        reference = tcc_csm_batch(**dict(self.params, **self.designs))
+
+        for name in reference:
+            np.testing.assert_array_equal(trb[name], reference[name])
+        done = [report['done'] for report in reports]
+        self.assertEqual((len(done), done[-1], sorted(done)), (5, 23, done))
+        self.assertFalse(any(report['overlapping'] for report in reports))
+        self.assertTrue(all(report['throughput'] > 0 and report['retries'] == 0 for report in reports))
+
+    def test_retries(self):
+
+        coordinator = SweepCoordinator(self.designs, chunk_size=5, **self.params)
+        thread, result = self.run_with_lost_chunk(coordinator)
+        worker = multiprocessing.Process(target=sweep_worker, args=(coordinator.address, coordinator.authkey))
+        worker.start()
+        thread.join(60.0)
+        worker.join(60.0)
+
+        reference = tcc_csm_batch(**dict(self.params, **self.designs))
+        np.testing.assert_array_equal(result['out']['turbine_cost'], reference['turbine_cost'])
+        self.assertEqual((coordinator.retries, coordinator.done, worker.exitcode), (1, 23, 0))
+
+    def test_coordinate(self):
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        designs = dict(self.designs, drivetrain_design=np.array(self.designs['drivetrain_design']))
+        table, output = os.path.join(directory, 'designs.npz'), os.path.join(directory, 'costs.npz')
+        np.savez(table, **designs)
+
+        lines = Queue.Queue()
+        stream = type('Stream', (object,), {'write' : lambda self, text: lines.put(text), 'flush' : lambda self: None})()
+        thread = threading.Thread(target=coordinate, args=(('localhost', 0), table, output, stream), \
+                                  kwargs=dict(chunk_size=5, **self.params))
+        thread.start()
+
+        host, port = lines.get(timeout=60.0).split()[-1].split(':')
+        name, key = lines.get(timeout=60.0).strip().split('=')
+        os.environ[name] = key
+        try:
+            authkey = environment_authkey()
+        finally:
+            del os.environ[name]
+        self.assertEqual(sweep_worker((host, int(port)), authkey), 5)
+        thread.join(60.0)
+
+        reference = tcc_csm_batch(**dict(self.params, **self.designs))
+        with np.load(output) as out:
+            np.testing.assert_array_equal(out['turbine_cost'], reference['turbine_cost'])
+
+    def test_dead_workers(self):
+
+        # a worker process that exits without taking any chunk
+        coordinator = SweepCoordinator(self.designs, chunk_size=5, **self.params)
+        process = multiprocessing.Process(target=len, args=('',))
+        process.start()
+        process.join(60.0)
+
+        self.assertRaises(RuntimeError, coordinator.run, timeout=60.0, alive=process.is_alive)
+
+    def test_silent_peer(self):
+
+        # a peer that connects and never answers the key challenge holds up neither the workers nor close
+        coordinator = SweepCoordinator(self.designs, chunk_size=5, **self.params)
+        peer = socket.create_connection(coordinator.address)
+        self.addCleanup(peer.close)
+        worker = multiprocessing.Process(target=sweep_worker, args=(coordinator.address, coordinator.authkey))
+        worker.start()
+
+        out = coordinator.run(timeout=60.0, alive=worker.is_alive)
+        worker.join(60.0)
+        reference = tcc_csm_batch(**dict(self.params, **self.designs))
+        np.testing.assert_array_equal(out['turbine_cost'], reference['turbine_cost'])
+
+    def test_failure(self):
+
+        coordinator = SweepCoordinator(self.designs, chunk_size=5, max_attempts=1, **self.params)
+        thread, result = self.run_with_lost_chunk(coordinator)
+        thread.join(60.0)
+
+        self.assertEqual(result.keys(), ['error'])
+        self.assertTrue(result['error'] is coordinator.error)
+
+class TestPricingService(unittest.TestCase):
+
+    def test_turbine_costsse(self):
+
+        inputs = dict(reference_inputs)
+        tower_mass = np.linspace(400000.0, 450000.0, 50)
+        reference = turbine_costsse_batch(**dict(inputs, tower_mass=tower_mass))
+
+        with turbine_costsse_service(max_wait=0.05) as service:
+            futures = [service.submit(**dict(inputs, tower_mass=mass)) for mass in tower_mass]
+            results = [future.result(timeout=10.0) for future in futures]
+
+        self.assertEqual([result['turbine_cost'] for result in results], list(reference['turbine_cost']))
+        self.assertEqual(service.requests, 50)
+        self.assertLess(service.batches, 50)
+
+    def test_tcc_csm_assembly(self):
+
+        done = []
+        with tcc_csm_service() as service:
+            design = {'rotor_diameter' : 126.0, 'machine_rating' : 5000.0, 'hub_height' : 90.0, \
+                      'rotor_thrust' : 505575.481173, 'rotor_torque' : 4365250.93957}
+            future = service.submit(advanced_blade=True, **design)
+            future.add_done_callback(done.append)
+            failed = service.submit(blade_numbr=3, **design)
+            self.assertRaises(ValueError, service.submit, machine_rating=5000.0)
+            self.assertEqual(round(service.price(advanced_blade=False, **design)['blade_mass'], 2), 25614.38)
+
+        reference = tcc_csm_batch(advanced_blade=True, **design)
+        self.assertEqual(future.result()['turbine_cost'], reference['turbine_cost'])
+        self.assertEqual(done, [future])
+        self.assertTrue(isinstance(failed.exception(), TypeError))
+        self.assertRaises(RuntimeError, service.submit, **design)
+
+    def test_backpressure(self):
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def batch(x):
+            started.set()
+            release.wait()
+            return {'y' : 2.0 * x}
+
+        service = PricingService(batch, ['x'], max_pending=2, max_wait=0.0)
+        futures = [service.submit(x=0.0)]
+        started.wait()
+        futures += [service.submit(x=1.0), service.submit(x=2.0)]
+        self.assertRaises(Queue.Full, service.submit, x=3.0, block=False)
+        self.assertRaises(RuntimeError, futures[0].result, timeout=0.01)
+
+        # a submit blocked on the full queue holds up neither non-blocking nor timed submits
+        blocked = []
+        thread = threading.Thread(target=lambda: blocked.append(service.submit(x=3.0)))
+        thread.start()
+        time.sleep(0.01)
+        t0 = time.time()
+        self.assertRaises(Queue.Full, service.submit, x=4.0, block=False)
+        self.assertRaises(Queue.Full, service.submit, x=4.0, timeout=0.05)
+        self.assertLess(time.time() - t0, 1.0)
+
+        release.set()
+        thread.join(10.0)
+        service.close()
+        self.assertEqual([future.result()['y'] for future in futures + blocked], [0.0, 2.0, 4.0, 6.0])
+
+    def test_failed_group(self):
+
+        def batch(x, scale=1.0, shape=None):
+            if shape is not None:
+                return {'y' : np.zeros(shape)}
+            return {'y' : scale * x, 'z' : 1.0}
+
+        with PricingService(batch, ['x'], max_wait=0.05) as service:
+            futures = [service.submit(x=1.0, scale=np.array([1.0, 2.0])), service.submit(x=1.0, shape=(3, 2)), \
+                       service.submit(x=2.0), service.submit(x=3.0)]
+            futures[2].add_done_callback(lambda future: 1 / 0)
+            self.assertTrue(isinstance(futures[0].exception(timeout=10.0), ValueError))
+            self.assertTrue(isinstance(futures[1].exception(timeout=10.0), ValueError))
+            self.assertEqual([future.result(timeout=10.0) for future in futures[2:]], \
+                             [{'y' : 2.0, 'z' : 1.0}, {'y' : 3.0, 'z' : 1.0}])
+            self.assertEqual(service.price(x=4.0)['y'], 4.0)
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def setUp(self):
+
+        self.params = dict(reference_inputs, drivetrain_design='geared')
+        self.designs = dict((name, self.params.pop(name)) for name in design_inputs)
+        self.designs['tower_mass'] = np.array([400000.0, 434559.0])
+        self.year, self.month = self.params.pop('year'), self.params.pop('month')
+
+    def test_nominal(self):
+
+        for drivetrain_design in ['geared', 'multi_drive']:
+            for advanced_blade in [True, False]:
+                params = dict(self.params, drivetrain_design=drivetrain_design, advanced_blade=advanced_blade)
+                reference = turbine_costsse_batch(year=self.year, month=self.month, **dict(self.designs, **params))
+                out = turbine_cost_samples(cost_coefficients, esc=escalators(self.year, self.month), \
+                                           **dict(self.designs, **params))
+                self.assertEqual(sorted(out.keys()), sorted(reference.keys()))
+                for name in reference:
+                    np.testing.assert_allclose(out[name], reference[name], rtol=1e-14)
+
+    def test_distribution(self):
+
+        distributions = {'tower_coeff' : ('normal', 1.5, 0.15), 'bearings_coeff' : ('uniform', 17.6, 17.6), \
+                         'gearbox_slope' : lambda rng, size: 16.9 * np.ones(size)}
+        mc = turbine_cost_distribution(self.designs, distributions, n_samples=20000, seed=1, year=self.year, \
+                                       month=self.month, **self.params)
+        reference = turbine_costsse_batch(year=self.year, month=self.month, **dict(self.designs, **self.params))
+
+        self.assertEqual(mc['turbine_cost'].shape, (2, 20000))
+        self.assertEqual(mc['percentiles']['tower_cost'].shape, (2, 3))
+        np.testing.assert_allclose(mc['mean']['tower_cost'], reference['tower_cost'], rtol=0.01)
+        np.testing.assert_allclose(mc['percentiles']['bearings_cost'][:, 1], reference['bearings_cost'], rtol=1e-14)
+        np.testing.assert_allclose(mc['percentiles']['turbine_cost'][:, 1], reference['turbine_cost'], rtol=0.01)
+        self.assertTrue(np.all(mc['percentiles']['turbine_cost'][:, 0] < mc['percentiles']['turbine_cost'][:, 2]))
+
+        # the draws are shared by every design and repeat with the seed
+        again = turbine_cost_distribution(self.designs, distributions, n_samples=20000, seed=1, year=self.year, \
+                                          month=self.month, **self.params)
+        np.testing.assert_array_equal(again['turbine_cost'], mc['turbine_cost'])
+        difference = mc['turbine_cost'][1] - mc['turbine_cost'][0]
+        self.assertGreater(difference.std(), 0.0)
+        self.assertTrue(np.all(difference > 0.0))
+
+        self.assertRaises(ValueError, turbine_cost_distribution, self.designs, {'tower_cost' : ('normal', 1.5, 0.1)})
+
+    def test_escalators(self):
+
+        mc = turbine_cost_distribution(self.designs, {}, n_samples=1000, seed=2, \
+                                       escalator_distributions={'IPPI_TWR' : ('uniform', 2.0, 2.0)}, \
+                                       year=self.year, month=self.month, **self.params)
+        reference = turbine_costsse_batch(year=self.year, month=self.month, **dict(self.designs, **self.params))
+
+        np.testing.assert_allclose(mc['mean']['tower_cost'], 2.0 * reference['tower_cost'], rtol=1e-14)
+        np.testing.assert_allclose(mc['mean']['rotor_cost'], reference['rotor_cost'], rtol=1e-14)
+
+        self.assertRaises(ValueError, turbine_cost_distribution, self.designs, {}, n_samples=10, \
+                          year=np.array([2008, 2009]), month=self.month, **self.params)
+
+    def test_drivetrain_coefficients(self):
+
+        params = dict(self.params, drivetrain_design='multi_drive')
+        mc = turbine_cost_distribution(self.designs, {'multi_drive_generator_coeff' : ('uniform', 96.06, 96.06)}, \
+                                       n_samples=100, seed=3, year=self.year, month=self.month, **params)
+        reference = turbine_costsse_batch(year=self.year, month=self.month, **dict(self.designs, **params))
+
+        np.testing.assert_allclose(mc['mean']['generator_cost'], 2.0 * reference['generator_cost'], rtol=1e-14)
+        np.testing.assert_allclose(mc['mean']['gearbox_cost'], reference['gearbox_cost'], rtol=1e-14)
+
+class TestCommandLine(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def read_costs(self, text):
+
+        rows = list(csv.reader(StringIO.StringIO(text)))
+        return rows[0], zip(*rows[1:])
+
+    def test_turbine_costsse_csv(self):
+
+        names = ['id'] + design_inputs + ['year']
+        masses = [reference_inputs[name] for name in design_inputs]
+        table = '\n'.join([','.join(names)] + [','.join(['t{0}'.format(i)] + [repr(m) for m in masses[:-2]] + \
+                           [repr(400000.0 + 1000.0 * i), '5000.0', str(2009 + i % 3)]) for i in range(7)])
+
+        output = StringIO.StringIO()
+        self.assertEqual(price_table('turbine_costsse', csv_chunks(StringIO.StringIO(table), 3), output, \
+                                     offshore=True, crane=True), 7)
+        header, columns = self.read_costs(output.getvalue())
+
+        designs = dict(zip(design_inputs, masses))
+        designs['tower_mass'] = 400000.0 + 1000.0 * np.arange(7)
+        reference = turbine_costsse_batch(year=2009 + np.arange(7) % 3, offshore=True, crane=True, **designs)
+        self.assertEqual(header, names + sorted(reference.keys()))
+        self.assertEqual(columns[0], tuple('t{0}'.format(i) for i in range(7)))
+        for name in reference:
+            np.testing.assert_array_equal(np.array(columns[header.index(name)], dtype=float), reference[name])
+
+    def test_tcc_csm_npz(self):
+
+        designs, params = sweep_designs()
+        designs['drivetrain_design'] = np.array(designs['drivetrain_design'])
+        path = os.path.join(self.directory, 'designs.npz')
+        np.savez_compressed(path, **designs)
+        output = os.path.join(self.directory, 'costs.csv')
+
+        self.assertEqual(main(['tcc_csm', path, output, '--chunk-size', '5', '--set', 'advanced_blade=True', \
+                               '--set', 'offshore=true', '--set', 'month=12']), 0)
+        with open(output, 'rb') as f:
+            header, columns = self.read_costs(f.read())
+
+        reference = tcc_csm_batch(advanced_blade=True, offshore=True, month=12, **designs)
+        self.assertEqual(len(columns[0]), 23)
+        for name in reference:
+            np.testing.assert_array_equal(np.array(columns[header.index(name)], dtype=float), reference[name])
+
+        chunks = list(npz_chunks(path, 10))
+        self.assertEqual([len(columns[0]) for names, columns in chunks], [10, 10, 3])
+        self.assertRaises(ValueError, price_table, 'tcc_csm', chunks, StringIO.StringIO(), hub_height=90.0)
+
+    def test_empty_tables(self):
+
+        output = StringIO.StringIO()
+        self.assertEqual(price_table('turbine_costsse', csv_chunks(StringIO.StringIO(','.join(design_inputs)), 3), \
+                                     output), 0)
+        reference = turbine_costsse_batch(**reference_inputs)
+        self.assertEqual(output.getvalue(), ','.join(design_inputs + sorted(reference.keys())) + '\n')
+
+        designs, params = sweep_designs()
+        path = os.path.join(self.directory, 'designs.npz')
+        np.savez(path, **dict((name, np.zeros(0)) for name in designs if name != 'drivetrain_design'))
+        output = StringIO.StringIO()
+        self.assertEqual(price_table('tcc_csm', npz_chunks(path, 10), output), 0)
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+
+    def test_npz_versions(self):
+
+        designs, params = sweep_designs()
+        reference = list(npz_chunks(self.npz(designs, (2, 0)), 10))
+        chunks = list(npz_chunks(self.npz(designs, (3, 0)), 10))
+        self.assertEqual([names for names, columns in chunks], [names for names, columns in reference])
+        for chunk, expected in zip(chunks, reference):
+            for column, values in zip(chunk[1], expected[1]):
+                np.testing.assert_array_equal(column, values)
+
+        self.assertRaises(ValueError, list, npz_chunks(self.npz(designs, (4, 0)), 10))
+
+    def npz(self, designs, version):
+
+        # NPY arrays in format 2.0 relabelled as version, whose headers are the same for ASCII names
+        path = os.path.join(self.directory, 'designs{0}{1}.npz'.format(*version))
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name in sorted(designs):
+                stream = StringIO.StringIO()
+                np.lib.format.write_array(stream, np.asarray(designs[name]), version=(2, 0))
+                data = stream.getvalue()
+                archive.writestr(name + '.npy', data[:6] + chr(version[0]) + chr(version[1]) + data[8:])
+
+        return path
+
+    def test_parameter_columns(self):
+
+        names = design_inputs + ['drivetrain_design', 'offshore']
+        table = '\n'.join([','.join(names), ','.join([repr(reference_inputs[name]) for name in design_inputs] + \
+                                                      ['multi_drive', 'True'])])
+        self.assertRaises(ValueError, price_table, 'turbine_costsse', csv_chunks(StringIO.StringIO(table), 3), \
+                          StringIO.StringIO())
+
+class TestKernelImport(unittest.TestCase):
+
+    def test_import_time(self):
+
+        # the target itself is reported by benchmarks.example; the bound only catches gross regressions
+        import_time, frameworks = benchmark_kernel_import(repeat=1)
+
+        self.assertEqual(frameworks, [])
+        self.assertLess(import_time, 20 * import_time_target)
+
+    def test_lazy_components(self):
+
+        import turbine_costsse.turbine_costsse
+        import turbine_costsse.nrel_csm_tcc
+
+        self.assertTrue(turbine_costsse.turbine_costsse.Turbine_CostsSE is Turbine_CostsSE)
+        self.assertTrue(turbine_costsse.nrel_csm_tcc.tcc_csm_assembly is tcc_csm_assembly)
+        self.assertRaises(AttributeError, getattr, turbine_costsse.turbine_costsse, 'Turbine_CostSE')
+
 #----------------------------------------------------
 
 if __name__ == "__main__":
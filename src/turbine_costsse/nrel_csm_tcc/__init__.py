@@ -0,0 +1,12 @@
+"""
+NREL Cost and Scaling Model turbine capital cost.
+
+csm_kernels and nrel_csm_tcc_batch only need NumPy.  The OpenMDAO components below
+are imported from their modules, together with OpenMDAO and fusedwind, on first access.
+"""
+
+from turbine_costsse.turbine_costsse.lazy_import import lazy_module
+
+lazy_module(__name__, {'tcc_csm_assembly' : 'nrel_csm_tcc', 'tcc_csm_component' : 'nrel_csm_tcc', \
+                       'blades_csm_component' : 'blades_csm_component', 'hub_csm_component' : 'hub_csm_component', \
+                       'nacelle_csm_component' : 'nacelle_csm_component', 'tower_csm_component' : 'tower_csm_component'})
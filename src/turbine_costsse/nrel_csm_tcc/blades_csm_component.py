@@ -8,7 +8,9 @@ Copyright (c) NREL. All rights reserved.
 from openmdao.main.api import Component, Assembly, set_as_top, VariableTree
 from openmdao.main.datatypes.api import Int, Bool, Float, Array, VarTree
 
-from commonse.config import *
+from turbine_costsse.turbine_costsse.escalation import component_escalators
+from csm_kernels import blades_csm, blades_csm_jacobian, blades_csm_hessian
+from turbine_costsse.turbine_costsse.dual import component_jacobian, defer_jacobian, deferred_jacobian
 import numpy as np
 
 class blades_csm_component(Component):
@@ -43,45 +45,14 @@ class blades_csm_component(Component):
         Executes Blade model of the NREL _cost and Scaling Model to estimate wind turbine blade cost and mass.
         """
 
+        esc = component_escalators(self)
+
+        out = blades_csm(self.rotor_diameter, esc, self.advanced_blade)
+        self.blade_mass = out['blade_mass']
+        self.blade_cost = out['blade_cost']
+
+        defer_jacobian(self, component_jacobian(self, blades_csm_jacobian), self.rotor_diameter, esc, self.advanced_blade)
 
-        if (self.advanced_blade == True):
-            massCoeff = 0.4948
-            massExp   = 2.5300
-        else:
-            massCoeff = 0.1452 
-            massExp   = 2.9158
-        
-        self.blade_mass = (massCoeff*(self.rotor_diameter/2.0)**massExp)
-
-        ppi.curr_yr = curr_yr
-        ppi.curr_mon = curr_mon
-
-        ppi_labor  = ppi.compute('IPPI_BLL')
-
-        if (self.advanced_blade == True):
-            ref_yr = ppi.ref_yr
-            ppi.ref_yr = 2003
-            ppi_mat   = ppi.compute('IPPI_BLA')
-            ppi.ref_yr = ref_yr
-            slopeR3   = 0.4019376
-            intR3     = -21051.045983
-        else:
-            ppi_mat   = ppi.compute('IPPI_BLD')
-            slopeR3   = 0.4019376
-            intR3     = -955.24267
-            
-        laborCoeff    = 2.7445
-        laborExp      = 2.5025
-        
-        bladeCostCurrent = ( (slopeR3*(self.rotor_diameter/2.0)**3.0 + (intR3))*ppi_mat + \
-                                  (laborCoeff*(self.rotor_diameter/2.0)**laborExp)*ppi_labor    ) / (1.0-0.28)
-        self.blade_cost = bladeCostCurrent
-    
-        # derivatives
-        self.d_mass_d_diameter = massExp * (massCoeff*(self.rotor_diameter/2.0)**(massExp-1))* (1/2.)
-        self.d_cost_d_diameter = (3.0*(slopeR3*(self.rotor_diameter/2.0)**2.0 )*ppi_mat * (1/2.) + \
-                                 (laborExp * laborCoeff*(self.rotor_diameter/2.0)**(laborExp-1))*ppi_labor * (1/2.)) / (1.0-0.28)
- 
     def list_deriv_vars(self):
 
     	  inputs = ['rotor_diameter']
@@ -90,11 +61,17 @@ class blades_csm_component(Component):
     	  return inputs, outputs
     
     def provideJ(self):
-    	  
-    	  self.J = np.array([[self.d_mass_d_diameter],[self.d_cost_d_diameter]])    	
-    	  
-    	  return self.J
-         
+
+        return deferred_jacobian(self)
+
+    def provideH(self):
+        """
+        Second derivatives of the outputs with respect to the inputs of list_deriv_vars at the
+        current inputs, shaped (n_outputs, n_inputs, n_inputs).
+        """
+
+        return blades_csm_hessian(self.rotor_diameter, component_escalators(self), self.advanced_blade)
+
 #-----------------------------------------------------------------
 
 def example():
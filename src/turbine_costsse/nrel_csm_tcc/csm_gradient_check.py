@@ -0,0 +1,109 @@
+"""
+csm_gradient_check.py
+
+Vectorized verification of the analytic Jacobians of the NREL Cost and Scaling Model
+components (see turbine_costsse.turbine_costsse.gradient_check).
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from turbine_costsse.turbine_costsse.escalation import escalators
+from turbine_costsse.turbine_costsse.gradient_check import GradientCase, check_gradients, format_report
+from csm_kernels import blades_csm, blades_csm_jacobian, hub_csm, hub_csm_jacobian, rotor_mass, rotor_mass_jacobian, \
+     nacelle_csm, nacelle_csm_jacobian, nacelle_csm_outputs, tower_csm, tower_csm_jacobian, tcc_csm, tcc_csm_jacobian
+from nrel_csm_tcc_batch import tcc_csm_chain, tcc_csm_chain_jacobian, tcc_csm_component_jacobian, jacobian_inputs, \
+     jacobian_outputs
+
+# -------------------------------------------------------
+def random_csm_designs(n=2000, seed=0):
+    """
+    n random designs around the NREL 5 MW Reference Turbine: rotor_diameter between
+    80 and 160 m, machine_rating between 1.5 and 8 MW, hub_height between 60 and
+    140 m, rotor mass, thrust and torque scaled from the reference turbine and
+    target dates between 2003 and 2012.
+    """
+
+    random = np.random.RandomState(seed)
+
+    d = {}
+    d['rotor_diameter'] = random.uniform(80.0, 160.0, n)
+    d['machine_rating'] = random.uniform(1500.0, 8000.0, n)
+    d['hub_height'] = random.uniform(60.0, 140.0, n)
+    d['rotor_mass'] = 123193.3 * (d['rotor_diameter'] / 126.0)**3 * random.uniform(0.8, 1.2, n)
+    d['rotor_thrust'] = 500930.1 * (d['rotor_diameter'] / 126.0)**2 * random.uniform(0.8, 1.2, n)
+    d['rotor_torque'] = 4365249. * (d['machine_rating'] / 5000.0) * (d['rotor_diameter'] / 126.0) * \
+                        random.uniform(0.8, 1.2, n)
+    d['year'] = random.randint(2003, 2013, n)
+    d['month'] = random.randint(1, 13, n)
+
+    return d
+
+def csm_cases(n=2000, seed=0):
+    """
+    GradientCases of every tcc_csm_assembly component and of the tcc_csm_assembly
+    component chain, both as the component Jacobians composed by the chain rule
+    (tcc_csm_component_jacobian) and as its dual Jacobian (tcc_csm_chain_jacobian),
+    at n random designs.
+    """
+
+    d = random_csm_designs(n, seed)
+    esc = escalators(d['year'], d['month'])
+    random = np.random.RandomState(seed + 1)
+    drivetrain_design = random.randint(1, 5, n)
+    masses = [random.uniform(1e4, 5e5, n) for i in range(4)]
+    costs = [random.uniform(1e5, 5e6, n) for i in range(4)]
+
+    hub_outputs = ['hub_mass', 'pitch_system_mass', 'spinner_mass', 'hub_system_mass', \
+                   'hub_cost', 'pitch_system_cost', 'spinner_cost', 'hub_system_cost']
+
+    cases = []
+    for advanced in [True, False]:
+        cases += [GradientCase('blades_csm(advanced={0})'.format(advanced), blades_csm, blades_csm_jacobian, \
+                               [d['rotor_diameter'], esc, advanced], [0], outputs=['blade_mass', 'blade_cost'], \
+                               input_names=['rotor_diameter']),
+                  GradientCase('tower_csm(advanced={0})'.format(advanced), tower_csm, tower_csm_jacobian, \
+                               [d['rotor_diameter'], d['hub_height'], esc, advanced], [0, 1], \
+                               outputs=['tower_mass', 'tower_cost'], input_names=['rotor_diameter', 'hub_height'])]
+    cases += [GradientCase('hub_csm', hub_csm, hub_csm_jacobian, [d['rotor_diameter'], masses[0] / 10, esc, 3], [0, 1], \
+                           outputs=hub_outputs, input_names=['rotor_diameter', 'blade_mass']),
+              GradientCase('rotor_mass_adder', rotor_mass, rotor_mass_jacobian, [masses[0], masses[1], 3], [0, 1], \
+                           input_names=['blade_mass', 'hub_system_mass'])]
+
+    # mixed drivetrains in one pass, for each bedplate design
+    for advanced_bedplate in [0, 1, 2]:
+        cases.append(GradientCase('nacelle_csm(advanced_bedplate={0})'.format(advanced_bedplate), nacelle_csm, \
+                                  nacelle_csm_jacobian, [d['rotor_diameter'], d['rotor_mass'], d['rotor_thrust'], \
+                                  d['rotor_torque'], d['machine_rating'], esc, drivetrain_design, True, \
+                                  advanced_bedplate, True], [0, 1, 2, 3, 4], outputs=nacelle_csm_outputs, \
+                                  input_names=['rotor_diameter', 'rotor_mass', 'rotor_thrust', 'rotor_torque', \
+                                               'machine_rating']))
+
+    for offshore in [True, False]:
+        cases.append(GradientCase('tcc_csm(offshore={0})'.format(offshore), tcc_csm, tcc_csm_jacobian, \
+                                  masses + costs + [3, offshore], range(8), outputs=['turbine_mass', 'turbine_cost'], \
+                                  input_names=['blade_mass', 'hub_system_mass', 'nacelle_mass', 'tower_mass', \
+                                               'blade_cost', 'hub_system_cost', 'nacelle_cost', 'tower_cost']))
+
+    # the assembly with mixed drivetrains, by the chain rule and by dual numbers
+    for advanced in [True, False]:
+        options = dict(offshore=advanced, advanced_blade=advanced, drivetrain_design=drivetrain_design, \
+                       advanced_bedplate=2 if advanced else 0, advanced_tower=advanced)
+        for case, jacobian in [('tcc_csm_components', tcc_csm_component_jacobian), \
+                               ('tcc_csm_assembly', tcc_csm_chain_jacobian)]:
+            cases.append(GradientCase('{0}(advanced={1})'.format(case, advanced), tcc_csm_chain, jacobian, \
+                                      [d[name] for name in jacobian_inputs] + [esc], range(len(jacobian_inputs)), \
+                                      outputs=jacobian_outputs, kwargs=options, input_names=jacobian_inputs))
+
+    return cases
+
+#-----------------------------------------------------------------
+
+def example():
+
+    print format_report(check_gradients(csm_cases()))
+
+if __name__ == "__main__":
+
+    example()
@@ -0,0 +1,607 @@
+"""
+csm_kernels.py
+
+Framework-free mass and cost kernels of the NREL Cost and Scaling Model components.
+
+Each component has a value kernel returning a dictionary of its outputs and a
+Jacobian kernel returning the derivatives the component provides, with rows and
+columns in the order of its list_deriv_vars.  Inputs may be floats or NumPy
+arrays; esc is any mapping from PPI index to escalator (an EscalatorSnapshot or
+a dictionary of escalator arrays).
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from turbine_costsse.turbine_costsse.costsse_kernels import drivetrain_codes, zero_jacobian, JacobianPattern
+from turbine_costsse.turbine_costsse.dual import where, zeros_like, forward_jacobian, forward_jacobians, \
+     forward_hessian
+
+# gearbox, generator and mainframe coefficients indexed by drivetrain code (1-4)
+gearboxCostCoeff = np.array([np.nan, 16.45  , 74.101     ,   15.25697015,  0 ])
+gearboxCostExp   = np.array([np.nan,  1.2491,  1.002     ,    1.2491    ,  0 ])
+gearboxMassCoeff = np.array([np.nan, 65.601 , 81.63967335,  129.1702924 ,  0 ])
+gearboxMassExp   = np.array([np.nan,  0.759 ,  0.7738    ,    0.7738    ,  0 ])
+
+generatorCostCoeff = np.array([np.nan, 65.000, 54.72533,  48.02963 , 219.3333 ]) # $/kW - from 'Generators' worksheet
+generatorMassCoeff = np.array([np.nan, 6.4737, 10.50972,  5.343902 , 37.68400 ])
+generatorMassExp   = np.array([np.nan, 0.9223, 0.922300,  0.922300 , 1.000000 ])
+
+mainframeMassCoeff = np.array([np.nan,22448,1.29490,1.72080,22448 ])
+mainframeMassExp   = np.array([np.nan,    0,1.9525, 1.9525 ,    0 ])
+mainframeCostCoeff = np.array([np.nan,9.4885,303.96,17.923,627.28 ])
+mainframeCostExp   = np.array([np.nan,1.9525,1.0669,1.6716,0.8500 ])
+
+# -------------------------------------------------------
+def blades_csm(rotor_diameter, esc, advanced_blade=False):
+    """
+    Blade mass and cost of the NREL Cost and Scaling Model (see blades_csm_component).
+    """
+
+    if advanced_blade:
+        massCoeff = 0.4948
+        massExp   = 2.5300
+        ppi_mat   = esc['IPPI_BLA']
+        slopeR3   = 0.4019376
+        intR3     = -21051.045983
+    else:
+        massCoeff = 0.1452
+        massExp   = 2.9158
+        ppi_mat   = esc['IPPI_BLD']
+        slopeR3   = 0.4019376
+        intR3     = -955.24267
+    ppi_labor  = esc['IPPI_BLL']
+
+    laborCoeff    = 2.7445
+    laborExp      = 2.5025
+
+    out = {}
+    out['blade_mass'] = (massCoeff*(rotor_diameter/2.0)**massExp)
+    out['blade_cost'] = ( (slopeR3*(rotor_diameter/2.0)**3.0 + (intR3))*ppi_mat + \
+                          (laborCoeff*(rotor_diameter/2.0)**laborExp)*ppi_labor    ) / (1.0-0.28)
+
+    return out
+
+def blades_csm_jacobian(rotor_diameter, esc, advanced_blade=False):
+    """
+    Derivatives of blade_mass and blade_cost with respect to rotor_diameter.
+    """
+
+    if advanced_blade:
+        massCoeff = 0.4948
+        massExp   = 2.5300
+        ppi_mat   = esc['IPPI_BLA']
+    else:
+        massCoeff = 0.1452
+        massExp   = 2.9158
+        ppi_mat   = esc['IPPI_BLD']
+    ppi_labor  = esc['IPPI_BLL']
+    slopeR3    = 0.4019376
+
+    laborCoeff    = 2.7445
+    laborExp      = 2.5025
+
+    J = zero_jacobian(2, 1, rotor_diameter, ppi_mat, ppi_labor)
+    J[..., 0, 0] = massExp * (massCoeff*(rotor_diameter/2.0)**(massExp-1))* (1/2.)
+    J[..., 1, 0] = (3.0*(slopeR3*(rotor_diameter/2.0)**2.0 )*ppi_mat * (1/2.) + \
+                    (laborExp * laborCoeff*(rotor_diameter/2.0)**(laborExp-1))*ppi_labor * (1/2.)) / (1.0-0.28)
+
+    return J
+
+# -------------------------------------------------------
+def hub_csm(rotor_diameter, blade_mass, esc, blade_number=3):
+    """
+    Hub, pitch system and spinner masses and costs of the NREL Cost and Scaling Model (see hub_csm_component).
+    """
+
+    out = {}
+
+    #*** Pitch bearing and mechanism
+    pitchBearingMass = 0.1295 * blade_mass*blade_number + 491.31  # slope*BldMass3 + int
+    bearingHousingPct = 32.80 / 100.0
+    massSysOffset = 555.0
+    out['pitch_system_mass'] = pitchBearingMass * (1+bearingHousingPct) + massSysOffset
+
+    #*** Hub
+    out['hub_mass'] = 0.95402537 * blade_mass + 5680.272238
+
+    #*** NoseCone/Spinner
+    out['spinner_mass'] = 18.5*rotor_diameter +(-520.5)   # GNS
+
+    out['hub_system_mass'] = out['hub_mass'] + out['pitch_system_mass'] + out['spinner_mass']
+
+    #*** Pitch bearing and mechanism
+    bearingCost = (0.2106*rotor_diameter**2.6576)
+    out['pitch_system_cost'] = esc['IPPI_PMB'] * ( bearingCost + bearingCost * 1.28 )
+
+    #*** Hub
+    hubCost2002 = out['hub_mass'] * 4.25 # $/kg
+    out['hub_cost'] = hubCost2002 * esc['IPPI_HUB']
+
+    #*** NoseCone/Spinner
+    out['spinner_cost'] = esc['IPPI_NAC'] * (5.57*out['spinner_mass'])
+
+    out['hub_system_cost'] = out['hub_cost'] + out['pitch_system_cost'] + out['spinner_cost']
+
+    return out
+
+def hub_csm_jacobian(rotor_diameter, blade_mass, esc, blade_number=3):
+    """
+    Derivatives of the hub, pitch system, spinner and hub system masses and costs
+    with respect to rotor_diameter and blade_mass.
+    """
+
+    bearingHousingPct = 32.80 / 100.0
+
+    J = zero_jacobian(8, 2, rotor_diameter, blade_mass, esc['IPPI_PMB'])
+
+    # masses
+    J[..., 2, 0] = 18.5
+    J[..., 3, 0] = 18.5
+    J[..., 0, 1] = 0.95402537
+    J[..., 1, 1] = 0.1295 * blade_number * (1+bearingHousingPct)
+    J[..., 3, 1] = J[..., 0, 1] + J[..., 1, 1]
+
+    # costs
+    J[..., 5, 0] = esc['IPPI_PMB'] * 2.28 * 2.6576 * (0.2106 * rotor_diameter**1.6576)
+    J[..., 6, 0] = esc['IPPI_NAC'] * (5.57*18.5)
+    J[..., 7, 0] = J[..., 5, 0] + J[..., 6, 0]
+    J[..., 4, 1] = 0.95402537 * 4.25 * esc['IPPI_HUB']
+    J[..., 7, 1] = J[..., 4, 1]
+
+    return J
+
+# -------------------------------------------------------
+def rotor_mass(blade_mass, hub_system_mass, blade_number=3):
+    """
+    Overall rotor mass (see rotor_mass_adder).
+    """
+
+    return blade_mass * blade_number + hub_system_mass
+
+def rotor_mass_jacobian(blade_mass, hub_system_mass, blade_number=3):
+    """
+    Derivatives of rotor_mass with respect to blade_mass and hub_system_mass.
+    """
+
+    J = zero_jacobian(1, 2, blade_mass, hub_system_mass)
+    J[..., 0, 0] = blade_number
+    J[..., 0, 1] = 1.0
+
+    return J
+
+# -------------------------------------------------------
+def nacelle_csm(rotor_diameter, rotor_mass, rotor_thrust, rotor_torque, machine_rating, esc, \
+                drivetrain_design='geared', crane=True, advanced_bedplate=0, offshore=True):
+    """
+    Nacelle component masses and costs of the NREL Cost and Scaling Model (see nacelle_csm_component).
+
+    drivetrain_design may be a single design name or an array holding one name
+    (or integer code 1-4) per row, so fleets of mixed drivetrains are evaluated
+    together: the gearbox, generator and mainframe coefficients are gathered per
+    row and the configuration-dependent branches are selected with masks.
+    """
+
+    out = {}
+
+    dt = drivetrain_codes(drivetrain_design)
+
+    # Low Speed Shaft
+    lenShaft  = 0.03 * rotor_diameter
+    mmtArm    = lenShaft / 5
+    bendLoad  = 1.25*9.81*rotor_mass
+    bendMom   = bendLoad * mmtArm
+    hFact     = 0.1
+    hollow    = 1/(1-(hFact)**4)
+    outDiam   = ((32./np.pi)*hollow*3.25*((rotor_torque*3./371000000.)**2+(bendMom/71070000)**2)**(0.5))**(1./3.)
+    inDiam    = outDiam * hFact
+
+    out['lowSpeedShaft_mass'] = 1.25*(np.pi/4)*(outDiam**2-inDiam**2)*lenShaft*7860
+
+    LowSpeedShaftCost2002 = 0.0998 * rotor_diameter ** 2.8873
+    out['lowSpeedShaft_cost'] = LowSpeedShaftCost2002 * esc['IPPI_LSS']
+
+    # Gearbox
+    out['gearbox_mass'] = gearboxMassCoeff[dt] * (rotor_torque/1000) ** gearboxMassExp[dt]
+
+    Gearbox2002 = gearboxCostCoeff[dt] * machine_rating ** gearboxCostExp[dt]
+    out['gearbox_cost'] = Gearbox2002 * esc['IPPI_GRB']
+
+    # Generator
+    # direct drive generator mass scales with torque rather than rating
+    out['generator_mass'] = where(dt < 4, generatorMassCoeff[dt] * machine_rating ** generatorMassExp[dt], \
+                                             generatorMassCoeff[dt] * rotor_torque ** generatorMassExp[dt])
+
+    GeneratorCost2002 = generatorCostCoeff[dt] * machine_rating
+    out['generator_cost'] = GeneratorCost2002 * esc['IPPI_GEN']
+
+    # --- electrical connections
+    out['electronicCabling_mass'] = zeros_like(rotor_diameter)
+
+    # --- bearings
+    bearingMass = 0.00012266667 * (rotor_diameter ** 3.5) - 0.00030360 * (rotor_diameter ** 2.5)
+    out['bearings_mass'] = bearingMass + bearingMass
+
+    # --- mechanical brake
+    mechBrakeCost2002 = 1.9894 * machine_rating + (-0.1141)
+    out['mechanicalBrakes_mass'] = mechBrakeCost2002 * 0.10
+
+    # --- variable-speed electronics
+    out['VSElectronics_mass'] = zeros_like(rotor_diameter)
+
+    # --- yaw drive bearings
+    out['yawSystem_mass'] = 1.6 * (0.0009 * rotor_diameter ** 3.314)
+
+    # --- hydraulics, cooling
+    out['HVAC_mass'] = 0.08 * machine_rating
+
+    # --- bedplate ---
+    BedplateWeightFac = bedplate_weight_factor(advanced_bedplate)
+
+    TowerTopDiam = (12.29*rotor_diameter+2648)/1000
+
+    MassFromTorque = BedplateWeightFac * 0.00368 * rotor_torque
+    MassFromThrust      = 0.00158 * BedplateWeightFac * rotor_thrust * TowerTopDiam
+    MassFromRotorWeight = 0.015   * BedplateWeightFac * rotor_mass     * TowerTopDiam
+
+    BedplateLength = 1.5874 * 0.052 * rotor_diameter
+    BedplateArea = 0.5 * BedplateLength * BedplateLength
+    MassFromArea = 100 * BedplateWeightFac * BedplateArea
+
+    TotalMass = MassFromTorque + MassFromThrust + MassFromRotorWeight + MassFromArea
+
+    bedplate_mass = where((dt == 1) | (dt == 4), TotalMass, mainframeMassCoeff[dt] * (rotor_diameter ** mainframeMassExp[dt] ))
+
+    NacellePlatformsMass = .125 * bedplate_mass
+
+    # --- crane ---
+    if (crane):
+        crane_mass =  3000.
+        crane_cost = 12000.
+    else:
+        crane_mass = 0.
+        crane_cost = 0.0
+
+    # --- main frame ---
+    out['mainframeTotal_mass'] = bedplate_mass + NacellePlatformsMass + crane_mass
+
+    # --- nacelle cover ---
+    nacelleCovCost2002 = 11.537 * machine_rating + (3849.7)
+    out['nacelleCover_mass'] = nacelleCovCost2002 * 0.111111
+
+    # --- control system ---
+    out['controls_mass'] = zeros_like(rotor_diameter)
+
+    # overall mass
+    out['nacelle_mass'] = out['lowSpeedShaft_mass'] + \
+                          out['bearings_mass'] + \
+                          out['gearbox_mass'] + \
+                          out['mechanicalBrakes_mass'] + \
+                          out['generator_mass'] + \
+                          out['VSElectronics_mass'] + \
+                          out['yawSystem_mass'] + \
+                          out['mainframeTotal_mass'] + \
+                          out['electronicCabling_mass'] + \
+                          out['HVAC_mass'] + \
+                          out['nacelleCover_mass'] + \
+                          out['controls_mass']
+
+    # --- electrical connections
+    out['electronicCabling_cost'] = 40.0 * machine_rating * esc['IPPI_ELC']
+
+    # --- bearings
+    brngSysCostFactor = 17.6 # $/kg
+    Bearings2002 = bearingMass * brngSysCostFactor
+    out['bearings_cost'] = ( Bearings2002 + Bearings2002 ) * esc['IPPI_BRN']
+
+    # --- mechanical brake
+    out['mechanicalBrakes_cost'] = esc['IPPI_BRK'] * mechBrakeCost2002
+
+    # --- variable-speed electronics
+    VspdEtronics2002 = 79.32 * machine_rating
+    out['VSElectronics_cost'] = VspdEtronics2002 * esc['IPPI_VSE']
+
+    # --- yaw drive bearings
+    YawDrvBearing2002 = 2 * ( 0.0339 * rotor_diameter ** 2.9637 )
+    out['yawSystem_cost'] = YawDrvBearing2002 * esc['IPPI_YAW']
+
+    # --- hydraulics, cooling
+    out['HVAC_cost'] = 12.0 * machine_rating * esc['IPPI_HYD']
+
+    # --- control system ---
+    initControlCost = [ 35000, 55900 ]  # land, off-shore
+    out['controls_cost'] = zeros_like(rotor_diameter) + initControlCost[int(bool(offshore))] * esc['IPPI_CTL']
+
+    # --- nacelle totals
+    NacellePlatforms2002 = 8.7 * NacellePlatformsMass
+
+    # --- nacelle cover ---
+    out['nacelleCover_cost'] = esc['IPPI_NAC'] * nacelleCovCost2002
+
+    # --- main frame ---
+    MainFrameCost2002 = mainframeCostCoeff[dt] * rotor_diameter ** mainframeCostExp[dt]
+    BaseHardware2002  = MainFrameCost2002 * 0.7
+    MainFrame2002 = ( MainFrameCost2002    +
+                      NacellePlatforms2002 +
+                      crane_cost           + # service crane
+                      BaseHardware2002 )
+    out['mainframeTotal_cost'] = MainFrame2002 * esc['IPPI_MFM']
+
+    # overall system cost
+    out['nacelle_cost'] = out['lowSpeedShaft_cost'] + \
+                          out['bearings_cost'] + \
+                          out['gearbox_cost'] + \
+                          out['mechanicalBrakes_cost'] + \
+                          out['generator_cost'] + \
+                          out['VSElectronics_cost'] + \
+                          out['yawSystem_cost'] + \
+                          out['mainframeTotal_cost'] + \
+                          out['electronicCabling_cost'] + \
+                          out['HVAC_cost'] + \
+                          out['nacelleCover_cost'] + \
+                          out['controls_cost']
+
+    return out
+
+def bedplate_weight_factor(advanced_bedplate=0):
+    """
+    Bedplate weight factor of the nacelle_csm bedplate design indicator.
+    """
+
+    if (advanced_bedplate == 0):
+        return 2.86  # modular
+    elif (advanced_bedplate == 1):
+        return 2.40  # modular-advanced
+    else:
+        return 0.71  # advanced
+
+# rows of nacelle_csm_jacobian
+nacelle_csm_outputs = ['nacelle_mass', 'lowSpeedShaft_mass', 'bearings_mass', 'gearbox_mass', 'generator_mass', \
+                       'mechanicalBrakes_mass', 'yawSystem_mass', 'electronicCabling_mass', 'HVAC_mass', \
+                       'VSElectronics_mass', 'mainframeTotal_mass', 'nacelleCover_mass', 'controls_mass', \
+                       'nacelle_cost', 'lowSpeedShaft_cost', 'bearings_cost', 'gearbox_cost', 'generator_cost', \
+                       'mechanicalBrakes_cost', 'yawSystem_cost', 'electronicCabling_cost', 'HVAC_cost', \
+                       'VSElectronics_cost', 'mainframeTotal_cost', 'nacelleCover_cost', 'controls_cost']
+
+# structurally nonzero columns of each row (rotor_diameter, rotor_mass, rotor_thrust, rotor_torque, machine_rating)
+nacelle_csm_nonzeros = {'nacelle_mass' : [0, 1, 2, 3, 4], 'lowSpeedShaft_mass' : [0, 1, 3], 'bearings_mass' : [0], \
+                        'gearbox_mass' : [3], 'generator_mass' : [3, 4], 'mechanicalBrakes_mass' : [4], \
+                        'yawSystem_mass' : [0], 'HVAC_mass' : [4], 'mainframeTotal_mass' : [0, 1, 2, 3], \
+                        'nacelleCover_mass' : [4], 'nacelle_cost' : [0, 1, 2, 3, 4], 'lowSpeedShaft_cost' : [0], \
+                        'bearings_cost' : [0], 'gearbox_cost' : [4], 'generator_cost' : [4], \
+                        'mechanicalBrakes_cost' : [4], 'yawSystem_cost' : [0], 'electronicCabling_cost' : [4], \
+                        'HVAC_cost' : [4], 'VSElectronics_cost' : [4], 'mainframeTotal_cost' : [0, 1, 2, 3], \
+                        'nacelleCover_cost' : [4]}
+
+nacelle_csm_pattern = JacobianPattern(26, 5, [(nacelle_csm_outputs.index(name), col) \
+                                              for name, cols in nacelle_csm_nonzeros.items() for col in cols])
+
+# position of each (output, column) entry in the nacelle_csm_jacobian_values
+nacelle_csm_entry = dict(((name, col), nacelle_csm_pattern.index[nacelle_csm_outputs.index(name), col]) \
+                         for name, cols in nacelle_csm_nonzeros.items() for col in cols)
+
+def nacelle_csm_jacobian(rotor_diameter, rotor_mass, rotor_thrust, rotor_torque, machine_rating, esc, \
+                         drivetrain_design='geared', crane=True, advanced_bedplate=0, offshore=True):
+    """
+    Derivatives of the nacelle_csm outputs (rows in nacelle_csm_outputs order) with respect
+    to rotor_diameter, rotor_mass, rotor_thrust, rotor_torque and machine_rating.
+    """
+
+    return nacelle_csm_pattern.dense(nacelle_csm_jacobian_values(rotor_diameter, rotor_mass, rotor_thrust, \
+                                     rotor_torque, machine_rating, esc, drivetrain_design, crane, advanced_bedplate, offshore))
+
+def nacelle_csm_jacobian_values(rotor_diameter, rotor_mass, rotor_thrust, rotor_torque, machine_rating, esc, \
+                                drivetrain_design='geared', crane=True, advanced_bedplate=0, offshore=True):
+    """
+    The entries of nacelle_csm_jacobian in nacelle_csm_pattern, shaped (..., nacelle_csm_pattern.nnz).
+    """
+
+    dt = drivetrain_codes(drivetrain_design)
+    V = np.zeros(np.broadcast(rotor_diameter, rotor_mass, rotor_thrust, rotor_torque, machine_rating, dt, \
+                              esc['IPPI_LSS']).shape + (nacelle_csm_pattern.nnz,))
+    entry = nacelle_csm_entry
+
+    # Low Speed Shaft
+    lenShaft  = 0.03 * rotor_diameter
+    mmtArm    = lenShaft / 5
+    bendLoad  = 1.25*9.81*rotor_mass
+    bendMom   = bendLoad * mmtArm
+    hFact     = 0.1
+    hollow    = 1/(1-(hFact)**4)
+    outDiam   = ((32./np.pi)*hollow*3.25*((rotor_torque*3./371000000.)**2+(bendMom/71070000)**2)**(0.5))**(1./3.)
+    inDiam    = outDiam * hFact
+
+    d_mass_d_outD = 1.25*(np.pi/4) * (1 - 0.1**2) * 2 * outDiam * lenShaft*7860
+    d_outD_mult = ((32./np.pi)*hollow*3.25)**(1./3.) * (1./6.) * ((rotor_torque*3./371000000.)**2+(bendMom/71070000.)**2)**(-5./6.)
+    d_outD_d_diameter = d_outD_mult * 2. * (bendMom/71070000) * (1./71070000.) * (bendLoad * 0.03 / 5)
+    d_outD_d_mass = d_outD_mult * 2. * (bendMom/71070000) * (1./71070000.) * (mmtArm * 1.25 * 9.81)
+    d_outD_d_torque = d_outD_mult * 2. * (rotor_torque*3./371000000.) * (3./371000000.)
+    V[..., entry['lowSpeedShaft_mass', 0]] = d_mass_d_outD * d_outD_d_diameter + \
+                                           1.25*(np.pi/4)*(outDiam**2-inDiam**2)*7860 * 0.03
+    V[..., entry['lowSpeedShaft_mass', 1]] = d_mass_d_outD * d_outD_d_mass
+    V[..., entry['lowSpeedShaft_mass', 3]] = d_mass_d_outD * d_outD_d_torque
+
+    V[..., entry['lowSpeedShaft_cost', 0]] = esc['IPPI_LSS'] * 2.8873 * 0.0998 * rotor_diameter ** 1.8873
+
+    # Gearbox
+    V[..., entry['gearbox_mass', 3]] = np.where(dt == 4, 0.0, gearboxMassExp[dt] * gearboxMassCoeff[dt] * \
+                                              ((rotor_torque/1000.) ** (gearboxMassExp[dt] - 1)) * (1/1000.))
+    V[..., entry['gearbox_cost', 4]] = np.where(dt == 4, 0.0, esc['IPPI_GRB'] * gearboxCostExp[dt] * gearboxCostCoeff[dt] * \
+                                              machine_rating ** (gearboxCostExp[dt] - 1))
+
+    # Generator
+    V[..., entry['generator_mass', 3]] = np.where(dt < 4, 0.0, generatorMassExp[dt] * generatorMassCoeff[dt] * \
+                                                rotor_torque ** (generatorMassExp[dt]-1))
+    V[..., entry['generator_mass', 4]] = np.where(dt < 4, generatorMassExp[dt] * generatorMassCoeff[dt] * \
+                                                machine_rating ** (generatorMassExp[dt]-1), 0.0)
+    V[..., entry['generator_cost', 4]] = esc['IPPI_GEN'] * generatorCostCoeff[dt]
+
+    # Rest of the system
+    V[..., entry['bearings_mass', 0]] = 2 * ( 3.5 * 0.00012266667 * (rotor_diameter ** 2.5) - 0.00030360 * 2.5 * (rotor_diameter ** 1.5))
+    V[..., entry['mechanicalBrakes_mass', 4]] = 0.10 * 1.9894
+    V[..., entry['yawSystem_mass', 0]] = 3.314 * 1.6 * (0.0009 * rotor_diameter ** 2.314)
+    V[..., entry['HVAC_mass', 4]] = 0.08
+
+    # --- bedplate and main frame ---
+    BedplateWeightFac = bedplate_weight_factor(advanced_bedplate)
+    TowerTopDiam = (12.29*rotor_diameter+2648)/1000
+    modular = (dt == 1) | (dt == 4)
+
+    V[..., entry['mainframeTotal_mass', 0]] = np.where(modular, \
+                            1.125 * (((0.00158 * BedplateWeightFac * rotor_thrust * (12.29/1000.)) + \
+                                      (0.015   * BedplateWeightFac * rotor_mass * (12.29/1000.)) + \
+                                      (100 * BedplateWeightFac * 0.5 * (1.5874 * 0.052)**2. * (2 * rotor_diameter)))), \
+                            1.125 * mainframeMassCoeff[dt] * (mainframeMassExp[dt] * rotor_diameter ** (mainframeMassExp[dt]-1)))
+    V[..., entry['mainframeTotal_mass', 1]] = np.where(modular, 1.125 * (0.015   * BedplateWeightFac * TowerTopDiam), 0.0)
+    V[..., entry['mainframeTotal_mass', 2]] = np.where(modular, 1.125 * (0.00158 * BedplateWeightFac * TowerTopDiam), 0.0)
+    V[..., entry['mainframeTotal_mass', 3]] = np.where(modular, 1.125 * BedplateWeightFac * 0.00368, 0.0)
+
+    V[..., entry['nacelleCover_mass', 4]] = 0.111111 * 11.537
+
+    V[..., entry['nacelle_mass', 0]] = V[..., entry['lowSpeedShaft_mass', 0]] + V[..., entry['bearings_mass', 0]] + \
+                                     V[..., entry['yawSystem_mass', 0]] + V[..., entry['mainframeTotal_mass', 0]]
+    V[..., entry['nacelle_mass', 1]] = V[..., entry['lowSpeedShaft_mass', 1]] + V[..., entry['mainframeTotal_mass', 1]]
+    V[..., entry['nacelle_mass', 2]] = V[..., entry['mainframeTotal_mass', 2]]
+    V[..., entry['nacelle_mass', 3]] = V[..., entry['lowSpeedShaft_mass', 3]] + V[..., entry['gearbox_mass', 3]] + \
+                                     V[..., entry['generator_mass', 3]] + V[..., entry['mainframeTotal_mass', 3]]
+    V[..., entry['nacelle_mass', 4]] = V[..., entry['generator_mass', 4]] + V[..., entry['mechanicalBrakes_mass', 4]] + \
+                                     V[..., entry['HVAC_mass', 4]] + V[..., entry['nacelleCover_mass', 4]]
+
+    # Rest of System Costs
+    V[..., entry['electronicCabling_cost', 4]] = 40.0 * esc['IPPI_ELC']
+    V[..., entry['bearings_cost', 0]] = esc['IPPI_BRN'] * 17.6 * V[..., entry['bearings_mass', 0]]
+    V[..., entry['mechanicalBrakes_cost', 4]] = esc['IPPI_BRK'] * 1.9894
+    V[..., entry['VSElectronics_cost', 4]] = esc['IPPI_VSE'] * 79.32
+    V[..., entry['yawSystem_cost', 0]] = esc['IPPI_YAW'] * 2 * 2.9637 * ( 0.0339 * rotor_diameter ** 1.9637 )
+    V[..., entry['HVAC_cost', 4]] = esc['IPPI_HYD'] * 12.0
+    V[..., entry['nacelleCover_cost', 4]] = esc['IPPI_NAC'] * 11.537
+
+    mainFrameCostEsc = esc['IPPI_MFM']
+    V[..., entry['mainframeTotal_cost', 0]] = mainFrameCostEsc * (1.7 * mainframeCostCoeff[dt] * mainframeCostExp[dt] * \
+                                                                rotor_diameter ** (mainframeCostExp[dt]-1) + \
+                                                                8.7 * V[..., entry['mainframeTotal_mass', 0]] * (0.125/1.125))
+    for col in [1, 2, 3]:
+        V[..., entry['mainframeTotal_cost', col]] = mainFrameCostEsc * 8.7 * V[..., entry['mainframeTotal_mass', col]] * (0.125/1.125)
+
+    V[..., entry['nacelle_cost', 0]] = V[..., entry['lowSpeedShaft_cost', 0]] + V[..., entry['bearings_cost', 0]] + \
+                                     V[..., entry['yawSystem_cost', 0]] + V[..., entry['mainframeTotal_cost', 0]]
+    V[..., entry['nacelle_cost', 1]] = V[..., entry['mainframeTotal_cost', 1]]
+    V[..., entry['nacelle_cost', 2]] = V[..., entry['mainframeTotal_cost', 2]]
+    V[..., entry['nacelle_cost', 3]] = V[..., entry['mainframeTotal_cost', 3]]
+    V[..., entry['nacelle_cost', 4]] = V[..., entry['gearbox_cost', 4]] + V[..., entry['generator_cost', 4]] + \
+                                     V[..., entry['mechanicalBrakes_cost', 4]] + V[..., entry['HVAC_cost', 4]] + \
+                                     V[..., entry['nacelleCover_cost', 4]] + V[..., entry['electronicCabling_cost', 4]] + \
+                                     V[..., entry['VSElectronics_cost', 4]]
+
+    return V
+
+
+# -------------------------------------------------------
+def tower_csm(rotor_diameter, hub_height, esc, advanced_tower=False):
+    """
+    Tower mass and cost of the NREL Cost and Scaling Model (see tower_csm_component).
+    """
+
+    windpactMassSlope = 0.397251147546925
+    windpactMassInt   = -1414.381881
+
+    if advanced_tower:
+       windpactMassSlope = 0.269380169
+       windpactMassInt = 1779.328183
+
+    out = {}
+    out['tower_mass'] = windpactMassSlope * np.pi * (rotor_diameter/2.)**2 * hub_height + windpactMassInt
+
+    twrCostCoeff      = 1.5 # $/kg
+    out['tower_cost'] = out['tower_mass'] * twrCostCoeff * esc['IPPI_TWR']
+
+    return out
+
+def tower_csm_jacobian(rotor_diameter, hub_height, esc, advanced_tower=False):
+    """
+    Derivatives of tower_mass and tower_cost with respect to rotor_diameter and hub_height.
+    """
+
+    windpactMassSlope = 0.397251147546925
+    if advanced_tower:
+       windpactMassSlope = 0.269380169
+
+    twrCostCoeff      = 1.5 # $/kg
+
+    J = zero_jacobian(2, 2, rotor_diameter, hub_height, esc['IPPI_TWR'])
+    J[..., 0, 0] = 2 * windpactMassSlope * np.pi * (rotor_diameter/2.) * (1/2.) * hub_height
+    J[..., 0, 1] = windpactMassSlope * np.pi * (rotor_diameter/2.)**2
+    J[..., 1, 0] = twrCostCoeff * esc['IPPI_TWR'] * J[..., 0, 0]
+    J[..., 1, 1] = twrCostCoeff * esc['IPPI_TWR'] * J[..., 0, 1]
+
+    return J
+
+# -------------------------------------------------------
+def tcc_csm(blade_mass, hub_system_mass, nacelle_mass, tower_mass, \
+            blade_cost, hub_system_cost, nacelle_cost, tower_cost, blade_number=3, offshore=False):
+    """
+    Overall turbine mass and capital cost (see tcc_csm_component).
+    """
+
+    out = {}
+    out['turbine_mass'] = blade_mass * blade_number + hub_system_mass + nacelle_mass + tower_mass
+    out['turbine_cost'] = blade_cost * blade_number + hub_system_cost + nacelle_cost + tower_cost
+    if offshore:
+        out['turbine_cost'] *= 1.1
+
+    return out
+
+# turbine_mass depends on the masses and turbine_cost on the costs only
+tcc_csm_pattern = JacobianPattern(2, 8, [(0, col) for col in range(4)] + [(1, col) for col in range(4, 8)])
+
+def tcc_csm_jacobian(blade_mass, hub_system_mass, nacelle_mass, tower_mass, \
+                     blade_cost, hub_system_cost, nacelle_cost, tower_cost, blade_number=3, offshore=False):
+    """
+    Derivatives of turbine_mass and turbine_cost with respect to the blade, hub system,
+    nacelle and tower masses and costs.
+    """
+
+    return tcc_csm_pattern.dense(tcc_csm_jacobian_values(blade_mass, hub_system_mass, nacelle_mass, tower_mass, \
+                                 blade_cost, hub_system_cost, nacelle_cost, tower_cost, blade_number, offshore))
+
+def tcc_csm_jacobian_values(blade_mass, hub_system_mass, nacelle_mass, tower_mass, \
+                            blade_cost, hub_system_cost, nacelle_cost, tower_cost, blade_number=3, offshore=False):
+    """
+    The entries of tcc_csm_jacobian in tcc_csm_pattern, shaped (..., tcc_csm_pattern.nnz).
+    """
+
+    V = zero_jacobian(1, 8, blade_mass, hub_system_mass, nacelle_mass, tower_mass, \
+                      blade_cost, hub_system_cost, nacelle_cost, tower_cost)[..., 0, :]
+    V[..., :4] = [blade_number, 1.0, 1.0, 1.0]
+    if offshore:
+        V[..., 4:] = [1.1 * blade_number, 1.1, 1.1, 1.1]
+    else:
+        V[..., 4:] = [blade_number, 1.0, 1.0, 1.0]
+
+    return V
+
+# -------------------------------------------------------
+# Forward-mode counterparts of the Jacobian kernels (see dual.component_jacobian)
+
+forward_jacobians.update({
+    blades_csm_jacobian : forward_jacobian(blades_csm, [0], ['blade_mass', 'blade_cost']),
+    hub_csm_jacobian : forward_jacobian(hub_csm, [0, 1], ['hub_mass', 'pitch_system_mass', 'spinner_mass', \
+                                         'hub_system_mass', 'hub_cost', 'pitch_system_cost', 'spinner_cost', 'hub_system_cost']),
+    rotor_mass_jacobian : forward_jacobian(rotor_mass, [0, 1]),
+    nacelle_csm_jacobian : forward_jacobian(nacelle_csm, [0, 1, 2, 3, 4], nacelle_csm_outputs),
+    nacelle_csm_jacobian_values : forward_jacobian(nacelle_csm, [0, 1, 2, 3, 4], nacelle_csm_outputs, nacelle_csm_pattern),
+    tower_csm_jacobian : forward_jacobian(tower_csm, [0, 1], ['tower_mass', 'tower_cost']),
+    tcc_csm_jacobian : forward_jacobian(tcc_csm, range(8), ['turbine_mass', 'turbine_cost']),
+    tcc_csm_jacobian_values : forward_jacobian(tcc_csm, range(8), ['turbine_mass', 'turbine_cost'], tcc_csm_pattern),
+})
+
+# -------------------------------------------------------
+# Second derivatives of the mass and cost models, shaped (..., n_outputs, n_inputs, n_inputs)
+# with rows and inputs ordered as in the corresponding Jacobian kernels (see dual.forward_hessian)
+
+blades_csm_hessian = forward_hessian(blades_csm, [0], ['blade_mass', 'blade_cost'])
+hub_csm_hessian = forward_hessian(hub_csm, [0, 1], ['hub_mass', 'pitch_system_mass', 'spinner_mass', \
+                                  'hub_system_mass', 'hub_cost', 'pitch_system_cost', 'spinner_cost', 'hub_system_cost'])
+nacelle_csm_hessian = forward_hessian(nacelle_csm, [0, 1, 2, 3, 4], nacelle_csm_outputs)
+tower_csm_hessian = forward_hessian(tower_csm, [0, 1], ['tower_mass', 'tower_cost'])
@@ -8,7 +8,9 @@ Copyright (c) NREL. All rights reserved.
 from openmdao.main.api import Component, Assembly, set_as_top, VariableTree
 from openmdao.main.datatypes.api import Int, Bool, Float, Array, VarTree
 
-from commonse.config import *
+from turbine_costsse.turbine_costsse.escalation import component_escalators
+from csm_kernels import hub_csm, hub_csm_jacobian, hub_csm_hessian
+from turbine_costsse.turbine_costsse.dual import component_jacobian, defer_jacobian, deferred_jacobian
 import numpy as np
 
 class hub_csm_component(Component):
@@ -50,61 +52,14 @@ class hub_csm_component(Component):
         Executes hub model of the NREL _cost and Scaling model to compute hub system component masses and costs.
         """
 
+        esc = component_escalators(self)
 
-        #*** Pitch bearing and mechanism
-        pitchBearingMass = 0.1295 * self.blade_mass*self.blade_number + 491.31  # slope*BldMass3 + int
-        bearingHousingPct = 32.80 / 100.0
-        massSysOffset = 555.0
-        self.pitch_system_mass = pitchBearingMass * (1+bearingHousingPct) + massSysOffset
-    
-        #*** Hub
-        self.hub_mass = 0.95402537 * self.blade_mass + 5680.272238
-    
-        #*** NoseCone/Spinner
-        self.spinner_mass = 18.5*self.rotor_diameter +(-520.5)   # GNS
-
-        self.hub_system_mass = self.hub_mass + self.pitch_system_mass + self.spinner_mass
+        out = hub_csm(self.rotor_diameter, self.blade_mass, esc, self.blade_number)
+        for name, value in out.items():
+            setattr(self, name, value)
 
-        ppi.curr_yr = curr_yr
-        ppi.curr_mon = curr_mon
-
-        #*** Pitch bearing and mechanism    
-        bearingCost = (0.2106*self.rotor_diameter**2.6576)
-        bearingCostEscalator = ppi.compute('IPPI_PMB')
-        self.pitch_system_cost = bearingCostEscalator * ( bearingCost + bearingCost * 1.28 )
-    
-        #*** Hub
-        hubCost2002 = self.hub_mass * 4.25 # $/kg       
-        hubCostEscalator = ppi.compute('IPPI_HUB')
-        self.hub_cost = hubCost2002 * hubCostEscalator
-    
-        #*** NoseCone/Spinner
-        spinnerCostEscalator = ppi.compute('IPPI_NAC')
-        self.spinner_cost = spinnerCostEscalator * (5.57*self.spinner_mass)         
+        defer_jacobian(self, component_jacobian(self, hub_csm_jacobian), self.rotor_diameter, self.blade_mass, esc, self.blade_number)
 
-        self.hub_system_cost = self.hub_cost + self.pitch_system_cost + self.spinner_cost
-        
-        # derivatives
-        self.d_hub_mass_d_diameter = 0.0
-        self.d_pitch_mass_d_diameter = 0.0
-        self.d_spinner_mass_d_diameter = 18.5
-        self.d_system_mass_d_diameter = self.d_hub_mass_d_diameter + self.d_pitch_mass_d_diameter + self.d_spinner_mass_d_diameter
-        
-        self.d_hub_cost_d_diameter = 0.0
-        self.d_pitch_cost_d_diameter = bearingCostEscalator * 2.28 * 2.6576 * (0.2106 * self.rotor_diameter**1.6576)
-        self.d_spinner_cost_d_diameter = spinnerCostEscalator * (5.57*self.d_spinner_mass_d_diameter)
-        self.d_system_cost_d_diameter = self.d_hub_cost_d_diameter + self.d_pitch_cost_d_diameter + self.d_spinner_cost_d_diameter
-
-        self.d_hub_mass_d_blade_mass = 0.95402537 
-        self.d_pitch_mass_d_blade_mass = 0.1295 *self.blade_number * (1+bearingHousingPct)
-        self.d_spinner_mass_d_blade_mass = 0.0
-        self.d_system_mass_d_blade_mass = self.d_hub_mass_d_blade_mass + self.d_pitch_mass_d_blade_mass + self.d_spinner_mass_d_blade_mass
-        
-        self.d_hub_cost_d_blade_mass = self.d_hub_mass_d_blade_mass * 4.25 * hubCostEscalator
-        self.d_pitch_cost_d_blade_mass = 0.0
-        self.d_spinner_cost_d_blade_mass = 0.0
-        self.d_system_cost_d_blade_mass = self.d_hub_cost_d_blade_mass + self.d_pitch_cost_d_blade_mass + self.d_spinner_cost_d_blade_mass
-        
     def list_deriv_vars(self):
 
         inputs = ['rotor_diameter', 'blade_mass']
@@ -114,18 +69,17 @@ class hub_csm_component(Component):
         return inputs, outputs
     
     def provideJ(self):
-        
-        self.J = np.array([[self.d_hub_mass_d_diameter, self.d_hub_mass_d_blade_mass],\
-                           [self.d_pitch_mass_d_diameter, self.d_pitch_mass_d_blade_mass],\
-                           [self.d_spinner_mass_d_diameter, self.d_spinner_mass_d_blade_mass],\
-                           [self.d_system_mass_d_diameter, self.d_system_mass_d_blade_mass],\
-                           [self.d_hub_cost_d_diameter, self.d_hub_cost_d_blade_mass],\
-                           [self.d_pitch_cost_d_diameter, self.d_pitch_cost_d_blade_mass],\
-                           [self.d_spinner_cost_d_diameter, self.d_spinner_cost_d_blade_mass],\
-                           [self.d_system_cost_d_diameter, self.d_system_cost_d_blade_mass]])
-        
-        return self.J
-        
+
+        return deferred_jacobian(self)
+
+    def provideH(self):
+        """
+        Second derivatives of the outputs with respect to the inputs of list_deriv_vars at the
+        current inputs, shaped (n_outputs, n_inputs, n_inputs).
+        """
+
+        return hub_csm_hessian(self.rotor_diameter, self.blade_mass, component_escalators(self), self.blade_number)
+
 #-----------------------------------------------------------------
 
 def example():
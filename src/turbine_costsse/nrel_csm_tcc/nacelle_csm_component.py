@@ -8,7 +8,9 @@ Copyright (c) NREL. All rights reserved.
 from openmdao.main.api import Component, Assembly, set_as_top, VariableTree
 from openmdao.main.datatypes.api import Int, Bool, Float, Array, VarTree, Enum
 
-from commonse.config import *
+from turbine_costsse.turbine_costsse.escalation import component_escalators
+from csm_kernels import nacelle_csm, nacelle_csm_jacobian_values, nacelle_csm_pattern, nacelle_csm_hessian
+from turbine_costsse.turbine_costsse.dual import component_jacobian, defer_jacobian, deferred_jacobian
 import numpy as np
 
 class nacelle_csm_component(Component):
@@ -70,335 +72,24 @@ class nacelle_csm_component(Component):
         #controls what happens if derivatives are missing
         self.missing_deriv_policy = 'assume_zero'
 
+        # dense Jacobian buffer, filled from the nonzero entries by provideJ
+        self.J = np.zeros(nacelle_csm_pattern.shape)
+
     def execute(self):
         """
         Execute nacelle model of the NREL _cost and Scaling Model.
         """
 
+        esc = component_escalators(self)
 
+        args = (self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, self.machine_rating, esc, \
+                self.drivetrain_design, self.crane, self.advanced_bedplate, self.offshore)
 
-        # basic variable initialization        
-        if self.offshore == False:
-           offshore = 0
-        else:
-           offshore = 1
-
-        ppi.curr_yr = self.year
-        ppi.curr_mon = self.month
-
-        # Low Speed Shaft
-        lenShaft  = 0.03 * self.rotor_diameter                                                                   
-        mmtArm    = lenShaft / 5                                                                 
-        bendLoad  = 1.25*9.81*self.rotor_mass                                                           
-        bendMom   = bendLoad * mmtArm                                                                 
-        hFact     = 0.1                                                                                    
-        hollow    = 1/(1-(hFact)**4)                                                                   
-        outDiam   = ((32./np.pi)*hollow*3.25*((self.rotor_torque*3./371000000.)**2+(bendMom/71070000)**2)**(0.5))**(1./3.) 
-        inDiam    = outDiam * hFact 
-                                                                              
-        self.lowSpeedShaft_mass      = 1.25*(np.pi/4)*(outDiam**2-inDiam**2)*lenShaft*7860
-
-        LowSpeedShaftCost2002 = 0.0998 * self.rotor_diameter ** 2.8873
-        lssCostEsc     = ppi.compute('IPPI_LSS')
-        
-        self.lowSpeedShaft_cost = LowSpeedShaftCost2002 * lssCostEsc
-
-        d_mass_d_outD = 1.25*(np.pi/4) * (1 - 0.1**2) * 2 * outDiam * lenShaft*7860
-        d_outD_mult = ((32./np.pi)*hollow*3.25)**(1./3.) * (1./6.) * ((self.rotor_torque*3./371000000.)**2+(bendMom/71070000.)**2)**(-5./6.)
-        d_outD_d_diameter = d_outD_mult * 2. * (bendMom/71070000) * (1./71070000.) * (bendLoad * 0.03 / 5)
-        d_outD_d_mass = d_outD_mult * 2. * (bendMom/71070000) * (1./71070000.) * (mmtArm * 1.25 * 9.81)
-        d_outD_d_torque = d_outD_mult * 2. * (self.rotor_torque*3./371000000.) * (3./371000000.)
-        self.d_lss_mass_d_r_diameter = d_mass_d_outD * d_outD_d_diameter + \
-                                       1.25*(np.pi/4)*(outDiam**2-inDiam**2)*7860 * 0.03
-        self.d_lss_mass_d_r_mass = d_mass_d_outD * d_outD_d_mass
-        self.d_lss_mass_d_r_torque = d_mass_d_outD * d_outD_d_torque
-
-        self.d_lss_cost_d_r_diameter = lssCostEsc * 2.8873 * 0.0998 * self.rotor_diameter ** 1.8873
-        
-        # Gearbox
-        costCoeff = [None, 16.45  , 74.101     ,   15.25697015,  0 ]
-        costExp   = [None,  1.2491,  1.002     ,    1.2491    ,  0 ]
-        massCoeff = [None, 65.601 , 81.63967335,  129.1702924 ,  0 ]
-        massExp   = [None,  0.759 ,  0.7738    ,    0.7738    ,  0 ]
-        
-        if self.drivetrain_design == 'geared':
-            drivetrain_design = 1
-        elif self.drivetrain_design == 'single_stage':
-            drivetrain_design = 2
-        elif self.drivetrain_design == 'multi-drive':
-            drivetrain_design = 3
-        elif self.drivetrain_design == 'pm_direct_drive':
-            drivetrain_design = 4
-
-        self.gearbox_mass = massCoeff[drivetrain_design] * (self.rotor_torque/1000) ** massExp[drivetrain_design] 
-
-        gearboxCostEsc     = ppi.compute('IPPI_GRB')        
-        Gearbox2002 = costCoeff[drivetrain_design] * self.machine_rating ** costExp[drivetrain_design]  
-        self.gearbox_cost = Gearbox2002 * gearboxCostEsc   
-        
-        if drivetrain_design == 4:
-            self.d_gearbox_mass_d_r_torque = 0.0
-            self.d_gearbox_cost_d_rating = 0.0
-        else:
-            self.d_gearbox_mass_d_r_torque = massExp[drivetrain_design]  * massCoeff[drivetrain_design] * ((self.rotor_torque/1000.) ** (massExp[drivetrain_design] - 1)) * (1/1000.)
-            self.d_gearbox_cost_d_rating = gearboxCostEsc * costExp[drivetrain_design] * costCoeff[drivetrain_design] * self.machine_rating ** (costExp[drivetrain_design] - 1)
-
-        # Generator
-        costCoeff = [None, 65.000, 54.72533,  48.02963 , 219.3333 ] # $/kW - from 'Generators' worksheet
-        massCoeff = [None, 6.4737, 10.50972,  5.343902 , 37.68400 ]
-        massExp   = [None, 0.9223, 0.922300,  0.922300 , 1.000000 ]
-
-        if (drivetrain_design < 4):
-            self.generator_mass = massCoeff[drivetrain_design] * self.machine_rating ** massExp[drivetrain_design]   
-        else:  # direct drive
-            self.generator_mass = massCoeff[drivetrain_design] * self.rotor_torque ** massExp[drivetrain_design] 
-
-        generatorCostEsc     = ppi.compute('IPPI_GEN')                                                  
-        GeneratorCost2002 = costCoeff[drivetrain_design] * self.machine_rating 
-        self.generator_cost = GeneratorCost2002 * generatorCostEsc
-
-        if drivetrain_design < 4:
-            self.d_generator_mass_d_r_torque = 0.0
-            self.d_generator_mass_d_rating = massExp[drivetrain_design] * massCoeff[drivetrain_design] * self.machine_rating ** (massExp[drivetrain_design]-1)
-        else:
-            self.d_generator_mass_d_r_torque = massExp[drivetrain_design] * massCoeff[drivetrain_design] * self.rotor_torque ** (massExp[drivetrain_design]-1)
-            self.d_generator_mass_d_rating = 0.0
-        self.d_generator_cost_d_rating = generatorCostEsc * costCoeff[drivetrain_design]
-        
-        # Rest of the system
-        
-        # --- electrical connections           
-        self.electronicCabling_mass = 0.0
-        
-        # --- bearings           
-        self.bearings_mass = 0.00012266667 * (self.rotor_diameter ** 3.5) - 0.00030360 * (self.rotor_diameter ** 2.5)
-        HousingMass  = self.bearings_mass 
-        self.bearings_mass  += HousingMass
-        
-        self.d_bearings_mass_d_r_diameter = 2 * ( 3.5 * 0.00012266667 * (self.rotor_diameter ** 2.5) - 0.00030360 * 2.5 * (self.rotor_diameter ** 1.5))
-        
-        # --- mechanical brake           
-        mechBrakeCost2002 = 1.9894 * self.machine_rating + (-0.1141)
-        self.mechanicalBrakes_mass = mechBrakeCost2002 * 0.10
-        
-        self.d_brakes_mass_d_rating = 0.10 * 1.9894
-        
-        # --- variable-speed electronics
-        self.VSElectronics_mass = 0.0
-
-        # --- yaw drive bearings
-        self.yawSystem_mass = 1.6 * (0.0009 * self.rotor_diameter ** 3.314)
-        
-        self.d_yaw_mass_d_r_diameter = 3.314 * 1.6 * (0.0009 * self.rotor_diameter ** 2.314)
-        
-        # --- hydraulics, cooling
-        self.HVAC_mass = 0.08 * self.machine_rating
-        
-        self.d_hvac_mass_d_rating = 0.08
-
-        # --- bedplate ---        
-        if (self.advanced_bedplate == 0):   # not an actual option in cost and scaling model                                           
-            BedplateWeightFac = 2.86  # modular
-        elif (self.advanced_bedplate == 1): # test for mod-adv
-            BedplateWeightFac = 2.40  # modular-advanced
-        else:
-            BedplateWeightFac = 0.71  # advanced
-
-        # These RD functions from spreadsheet don't quite form a continuous composite function        
-        '''if (self.rotor_diameter <= 15.0): # Removing for gradients - assuming large turbines only
-            TowerTopDiam = 0.3
-        elif (self.rotor_diameter <= 60.0):
-            TowerTopDiam = (0.07042*self.rotor_diameter-0.715)
-        else:'''
-        TowerTopDiam = (12.29*self.rotor_diameter+2648)/1000
-
-        MassFromTorque = BedplateWeightFac * 0.00368 * self.rotor_torque
-        MassFromThrust      = 0.00158 * BedplateWeightFac * self.rotor_thrust * TowerTopDiam
-        MassFromRotorWeight = 0.015   * BedplateWeightFac * self.rotor_mass     * TowerTopDiam
-        
-        # Bedplate(Length|Area) added by GNS
-        BedplateLength = 1.5874 * 0.052 * self.rotor_diameter
-        BedplateArea = 0.5 * BedplateLength * BedplateLength
-        MassFromArea = 100 * BedplateWeightFac * BedplateArea
-
-        # mfmCoeff[1,4] for different drivetrain configurations
-        mfmCoeff = [None,22448,1.29490,1.72080,22448 ]
-        mfmExp   = [None,    0,1.9525, 1.9525 ,    0 ]
-
-        # --- nacelle totals        
-        TotalMass = MassFromTorque + MassFromThrust + MassFromRotorWeight + MassFromArea
-        
-        if (drivetrain_design == 1) or (drivetrain_design == 4):
-            self.bedplate_mass = TotalMass
-        else:
-            self.bedplate_mass = mfmCoeff[drivetrain_design] * (self.rotor_diameter ** mfmExp[drivetrain_design] )
-
-        NacellePlatformsMass = .125 * self.bedplate_mass            
-     
-        # --- crane ---        
-        if (self.crane):
-            self.crane_mass =  3000.
-        else:
-            self.crane_mass = 0.  
-            
-        # --- main frame ---       
-        self.mainframeTotal_mass = self.bedplate_mass + NacellePlatformsMass + self.crane_mass
-
-        if (drivetrain_design == 1) or (drivetrain_design == 4):
-            self.d_mainframe_mass_d_r_diameter = 1.125 * (((0.00158 * BedplateWeightFac * self.rotor_thrust * (12.29/1000.)) + \
-                                                  (0.015   * BedplateWeightFac * self.rotor_mass * (12.29/1000.)) + \
-                                                  (100 * BedplateWeightFac * 0.5 * (1.5874 * 0.052)**2. * (2 * self.rotor_diameter))))
-            self.d_mainframe_mass_d_r_mass = 1.125 * (0.015   * BedplateWeightFac * TowerTopDiam)
-            self.d_mainframe_mass_d_r_thrust = 1.125 * (0.00158 * BedplateWeightFac * TowerTopDiam)
-            self.d_mainframe_mass_d_r_torque = 1.125 * BedplateWeightFac * 0.00368
-        else:
-            self.d_mainframe_mass_d_r_diameter = 1.125 * mfmCoeff[drivetrain_design] * \
-                                                  (mfmExp[drivetrain_design] * self.rotor_diameter ** (mfmExp[drivetrain_design]-1))
-            self.d_mainframe_mass_d_r_mass = 0.0
-            self.d_mainframe_mass_d_r_thrust = 0.0
-            self.d_mainframe_mass_d_r_torque = 0.0      
-
-        # --- nacelle cover ---        
-        nacelleCovCost2002 = 11.537 * self.machine_rating + (3849.7)
-        self.nacelleCover_mass = nacelleCovCost2002 * 0.111111
-        
-        self.d_cover_mass_d_rating = 0.111111 * 11.537
+        out = nacelle_csm(*args)
+        for name, value in out.items():
+            setattr(self, name, float(value))
 
-        # --- control system ---
-        self.controls_mass = 0.0
-
-        # overall mass   
-        self.nacelle_mass = self.lowSpeedShaft_mass + \
-                    self.bearings_mass + \
-                    self.gearbox_mass + \
-                    self.mechanicalBrakes_mass + \
-                    self.generator_mass + \
-                    self.VSElectronics_mass + \
-                    self.yawSystem_mass + \
-                    self.mainframeTotal_mass + \
-                    self.electronicCabling_mass + \
-                    self.HVAC_mass + \
-                    self.nacelleCover_mass + \
-                    self.controls_mass
-        
-        self.d_nacelle_mass_d_r_diameter = self.d_lss_mass_d_r_diameter + self.d_bearings_mass_d_r_diameter + self.d_yaw_mass_d_r_diameter + self.d_mainframe_mass_d_r_diameter
-        self.d_nacelle_mass_d_r_mass = self.d_lss_mass_d_r_mass + self.d_mainframe_mass_d_r_mass
-        self.d_nacelle_mass_d_r_thrust = self.d_mainframe_mass_d_r_thrust
-        self.d_nacelle_mass_d_r_torque = self.d_lss_mass_d_r_torque + self.d_gearbox_mass_d_r_torque + self.d_generator_mass_d_r_torque + self.d_mainframe_mass_d_r_torque
-        self.d_nacelle_mass_d_rating = self.d_generator_mass_d_rating + self.d_brakes_mass_d_rating + self.d_hvac_mass_d_rating + self.d_cover_mass_d_rating
-        
-        # Rest of System Costs
-        # Cost Escalators - obtained from ppi tables
-        bearingCostEsc       = ppi.compute('IPPI_BRN')
-        mechBrakeCostEsc     = ppi.compute('IPPI_BRK')
-        VspdEtronicsCostEsc  = ppi.compute('IPPI_VSE')
-        yawDrvBearingCostEsc = ppi.compute('IPPI_YAW')
-        nacelleCovCostEsc    = ppi.compute('IPPI_NAC')
-        hydrCoolingCostEsc   = ppi.compute('IPPI_HYD')
-        mainFrameCostEsc     = ppi.compute('IPPI_MFM')
-        econnectionsCostEsc  = ppi.compute('IPPI_ELC')
-
-        # These RD functions from spreadsheet don't quite form a continuous composite function
-        
-        # --- electrical connections
-        self.electronicCabling_cost = 40.0 * self.machine_rating # 2002
-        self.electronicCabling_cost *= econnectionsCostEsc
-        
-        self.d_electronics_cost_d_rating = 40.0 * econnectionsCostEsc
-        
-        # --- bearings
-        bearingMass = 0.00012266667 * (self.rotor_diameter ** 3.5) - 0.00030360 * (self.rotor_diameter ** 2.5)
-        HousingMass  = bearingMass 
-        brngSysCostFactor = 17.6 # $/kg
-        Bearings2002 = bearingMass * brngSysCostFactor
-        Housing2002  = HousingMass      * brngSysCostFactor
-        self.bearings_cost = ( Bearings2002 + Housing2002 ) * bearingCostEsc
-        
-        self.d_bearings_cost_d_r_diameter = bearingCostEsc * brngSysCostFactor * self.d_bearings_mass_d_r_diameter
-        
-        # --- mechanical brake           
-        mechBrakeCost2002 = 1.9894 * self.machine_rating + (-0.1141)
-        self.mechanicalBrakes_cost = mechBrakeCostEsc * mechBrakeCost2002
-        
-        self.d_brakes_cost_d_rating = mechBrakeCostEsc * 1.9894
-        
-        # --- variable-speed electronics           
-        VspdEtronics2002 = 79.32 * self.machine_rating
-        self.VSElectronics_cost = VspdEtronics2002 * VspdEtronicsCostEsc
-        
-        self.d_vselectronics_cost_d_rating = VspdEtronicsCostEsc * 79.32
-
-        # --- yaw drive bearings
-        YawDrvBearing2002 = 2 * ( 0.0339 * self.rotor_diameter ** 2.9637 )
-        self.yawSystem_cost = YawDrvBearing2002 * yawDrvBearingCostEsc
-        
-        self.d_yaw_cost_d_r_diameter = yawDrvBearingCostEsc * 2 * 2.9637 * ( 0.0339 * self.rotor_diameter ** 1.9637 )
-        
-        # --- hydraulics, cooling
-        self.HVAC_cost = 12.0 * self.machine_rating # 2002
-        self.HVAC_cost *= hydrCoolingCostEsc 
-        
-        self.d_hvac_cost_d_rating = hydrCoolingCostEsc * 12.0
- 
-        # --- control system ---   
-        initControlCost = [ 35000, 55900 ]  # land, off-shore
-        self.controls_cost = initControlCost[offshore] * ppi.compute('IPPI_CTL')
-
-        # --- nacelle totals
-        NacellePlatforms2002 = 8.7 * NacellePlatformsMass
-        
-        # --- nacelle cover ---        
-        nacelleCovCost2002 = 11.537 * self.machine_rating + (3849.7)
-        self.nacelleCover_cost = nacelleCovCostEsc * nacelleCovCost2002
-        
-        self.d_cover_cost_d_rating = nacelleCovCostEsc * 11.537
-        
-        # --- crane ---
-        
-        if (self.crane):
-            self.crane_cost = 12000.
-        else:
-            self.crane_cost = 0.0
-            
-        # --- main frame ---
-        # mfmCoeff[1,4] for different drivetrain configurations
-        mfmCoeff = [None,9.4885,303.96,17.923,627.28 ]
-        mfmExp   = [None,1.9525,1.0669,1.6716,0.8500 ]
-        
-        MainFrameCost2002 = mfmCoeff[drivetrain_design] * self.rotor_diameter ** mfmExp[drivetrain_design]
-        BaseHardware2002  = MainFrameCost2002 * 0.7
-        MainFrame2002 = ( MainFrameCost2002    + 
-                          NacellePlatforms2002 + 
-                          self.crane_cost       + # service crane 
-                          BaseHardware2002 )
-        self.mainframeTotal_cost = MainFrame2002 * mainFrameCostEsc
-        
-        self.d_mainframe_cost_d_r_diameter = mainFrameCostEsc * (1.7 * mfmCoeff[drivetrain_design] * mfmExp[drivetrain_design] * self.rotor_diameter ** (mfmExp[drivetrain_design]-1) + \
-                                                                8.7 * self.d_mainframe_mass_d_r_diameter * (0.125/1.125))
-        self.d_mainframe_cost_d_r_mass = mainFrameCostEsc * 8.7 * self.d_mainframe_mass_d_r_mass * (0.125/1.125)
-        self.d_mainframe_cost_d_r_thrust = mainFrameCostEsc * 8.7 * self.d_mainframe_mass_d_r_thrust * (0.125/1.125)
-        self.d_mainframe_cost_d_r_torque = mainFrameCostEsc * 8.7 * self.d_mainframe_mass_d_r_torque * (0.125/1.125)
-
-        # overall system cost  
-        self.nacelle_cost = self.lowSpeedShaft_cost + \
-                    self.bearings_cost + \
-                    self.gearbox_cost + \
-                    self.mechanicalBrakes_cost + \
-                    self.generator_cost + \
-                    self.VSElectronics_cost + \
-                    self.yawSystem_cost + \
-                    self.mainframeTotal_cost + \
-                    self.electronicCabling_cost + \
-                    self.HVAC_cost + \
-                    self.nacelleCover_cost + \
-                    self.controls_cost
-
-        self.d_nacelle_cost_d_r_diameter = self.d_lss_cost_d_r_diameter + self.d_bearings_cost_d_r_diameter + self.d_yaw_cost_d_r_diameter + self.d_mainframe_cost_d_r_diameter
-        self.d_nacelle_cost_d_r_mass = self.d_mainframe_cost_d_r_mass
-        self.d_nacelle_cost_d_r_thrust = self.d_mainframe_cost_d_r_thrust
-        self.d_nacelle_cost_d_r_torque = self.d_mainframe_cost_d_r_torque
-        self.d_nacelle_cost_d_rating = self.d_gearbox_cost_d_rating + self.d_generator_cost_d_rating + self.d_brakes_cost_d_rating + self.d_hvac_cost_d_rating + \
-                                       self.d_cover_cost_d_rating + self.d_electronics_cost_d_rating + self.d_vselectronics_cost_d_rating
+        defer_jacobian(self, component_jacobian(self, nacelle_csm_jacobian_values), *args)
 
     def list_deriv_vars(self):
 
@@ -411,36 +102,26 @@ class nacelle_csm_component(Component):
         return inputs, outputs
     
     def provideJ(self):
-      
-        self.J = np.array([[self.d_nacelle_mass_d_r_diameter, self.d_nacelle_mass_d_r_mass, self.d_nacelle_mass_d_r_thrust, self.d_nacelle_mass_d_r_torque, self.d_nacelle_mass_d_rating],\
-                           [self.d_lss_mass_d_r_diameter, self.d_lss_mass_d_r_mass, 0.0, self.d_lss_mass_d_r_torque, 0.0],\
-                           [self.d_bearings_mass_d_r_diameter, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, self.d_gearbox_mass_d_r_torque, 0.0],\
-                           [0.0, 0.0, 0.0, self.d_generator_mass_d_r_torque, self.d_generator_mass_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_brakes_mass_d_rating],\
-                           [self.d_yaw_mass_d_r_diameter, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_hvac_mass_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, 0.0],\
-                           [self.d_mainframe_mass_d_r_diameter, self.d_mainframe_mass_d_r_mass, self.d_mainframe_mass_d_r_thrust, self.d_mainframe_mass_d_r_torque, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_cover_mass_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, 0.0],\
-                           [self.d_nacelle_cost_d_r_diameter, self.d_nacelle_cost_d_r_mass, self.d_nacelle_cost_d_r_thrust, self.d_nacelle_cost_d_r_torque, self.d_nacelle_cost_d_rating],\
-                           [self.d_lss_cost_d_r_diameter, 0.0, 0.0, 0.0, 0.0],\
-                           [self.d_bearings_cost_d_r_diameter, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_gearbox_cost_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_generator_cost_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_brakes_cost_d_rating],\
-                           [self.d_yaw_cost_d_r_diameter, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_electronics_cost_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_hvac_cost_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_vselectronics_cost_d_rating],\
-                           [self.d_mainframe_cost_d_r_diameter, self.d_mainframe_cost_d_r_mass, self.d_mainframe_cost_d_r_thrust, self.d_mainframe_cost_d_r_torque, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_cover_cost_d_rating],\
-                           [0.0, 0.0, 0.0, 0.0, 0.0]])
-    
-        return self.J
-       
+
+        return nacelle_csm_pattern.dense(deferred_jacobian(self), out=self.J)
+
+    def provideJ_sparse(self):
+        """
+        Jacobian as a scipy.sparse CSR matrix with the structure of nacelle_csm_pattern.
+        """
+
+        return nacelle_csm_pattern.csr(deferred_jacobian(self))
+
+    def provideH(self):
+        """
+        Second derivatives of the outputs with respect to the inputs of list_deriv_vars at the
+        current inputs, shaped (n_outputs, n_inputs, n_inputs).
+        """
+
+        return nacelle_csm_hessian(self.rotor_diameter, self.rotor_mass, self.rotor_thrust, self.rotor_torque, \
+                                   self.machine_rating, component_escalators(self), self.drivetrain_design, self.crane, \
+                                   self.advanced_bedplate, self.offshore)
+
 #-----------------------------------------------------------------
 
 def example():
@@ -17,6 +17,10 @@ from blades_csm_component import blades_csm_component
 from hub_csm_component import hub_csm_component
 from nacelle_csm_component import nacelle_csm_component
 from tower_csm_component import tower_csm_component
+from csm_kernels import rotor_mass, rotor_mass_jacobian, tcc_csm, tcc_csm_jacobian_values, tcc_csm_pattern
+from turbine_costsse.turbine_costsse.dual import component_jacobian, defer_jacobian, deferred_jacobian
+from turbine_costsse.turbine_costsse.memo import memoized, memoized_execute
+from nrel_csm_tcc_batch import tcc_csm_batch_jacobian
 
 # -------------------------------------------------------
 # Rotor mass adder
@@ -40,12 +44,11 @@ class rotor_mass_adder(Component):
         self.missing_deriv_policy = 'assume_zero'
 
     def execute(self):
-       
-        self.rotor_mass = self.blade_mass * self.blade_number + self.hub_system_mass
-         
-        self.d_mass_d_blade_mass = self.blade_number
-        self.d_mass_d_hub_mass = 1.0
-         
+
+        self.rotor_mass = rotor_mass(self.blade_mass, self.hub_system_mass, self.blade_number)
+
+        defer_jacobian(self, component_jacobian(self, rotor_mass_jacobian), self.blade_mass, self.hub_system_mass, self.blade_number)
+
     def list_deriv_vars(self):
 
         inputs = ['blade_mass', 'hub_system_mass']
@@ -54,10 +57,8 @@ class rotor_mass_adder(Component):
         return inputs, outputs
     
     def provideJ(self):
-      
-        self.J = np.array([[self.d_mass_d_blade_mass, self.d_mass_d_hub_mass]])        
-        
-        return self.J
+
+        return deferred_jacobian(self)
 
 # --------------------------------------------------------------------
 @implement_base(BaseTurbineCostModel)
@@ -84,6 +85,11 @@ class tcc_csm_assembly(Assembly):
     # Outputs
     turbine_cost = Float(0.0, iotype='out', desc='Overall wind turbine capial costs including transportation costs')
 
+    # inputs keying an evaluation memoized by set_memo
+    memo_inputs = ['rotor_diameter', 'machine_rating', 'hub_height', 'rotor_thrust', 'rotor_torque', 'year', 'month', \
+                   'blade_number', 'offshore', 'advanced_blade', 'drivetrain_design', 'crane', 'advanced_bedplate', \
+                   'advanced_tower']
+
     def configure(self):
 
         configure_base_tcc(self)
@@ -163,7 +169,23 @@ class tcc_csm_assembly(Assembly):
 
     def execute(self):
 
-        super(tcc_csm_assembly, self).execute()  # will actually run the workflow
+        # will actually run the workflow, unless the memo has its state
+        memoized_execute(self, super(tcc_csm_assembly, self).execute)
+
+    def jacobian(self):
+        """
+        Derivatives of turbine_mass and turbine_cost with respect to rotor_diameter,
+        machine_rating, hub_height, rotor_thrust and rotor_torque at the current inputs
+        (see tcc_csm_batch_jacobian), memoized like the outputs.
+        """
+
+        def compute():
+            return tcc_csm_batch_jacobian(self.rotor_diameter, self.machine_rating, self.hub_height, self.rotor_thrust, \
+                                          self.rotor_torque, self.year, self.month, self.blade_number, self.offshore, \
+                                          self.advanced_blade, self.drivetrain_design, self.crane, \
+                                          self.advanced_bedplate, self.advanced_tower, getattr(self, 'context', None))
+
+        return memoized(self, 'jacobian', compute).copy()
 
 #------------------------------------------------------------------
 @implement_base(BaseTCCAggregator)
@@ -227,35 +249,25 @@ class tcc_csm_component(Component):
         #controls what happens if derivatives are missing
         self.missing_deriv_policy = 'assume_zero'
 
+        # dense Jacobian buffer, filled from the nonzero entries by provideJ
+        self.J = np.zeros(tcc_csm_pattern.shape)
+
     def execute(self):
         """
         Execute Turbine Capital _costs Model of the NREL _cost and Scaling Model.
         """
 
 
+        args = (self.blade_mass, self.hub_system_mass, self.nacelle_mass, self.tower_mass, \
+                self.blade_cost, self.hub_system_cost, self.nacelle_cost, self.tower_cost, \
+                self.blade_number, self.offshore)
+
         # high level output assignment
-        self.turbine_mass = self.blade_mass * self.blade_number + self.hub_system_mass + self.nacelle_mass + self.tower_mass
-        self.turbine_cost = self.blade_cost * self.blade_number + self.hub_system_cost + self.nacelle_cost + self.tower_cost
-
-        if self.offshore:
-            self.turbine_cost *= 1.1
-   
-        # derivatives     
-        self.d_mass_d_blade_mass = self.blade_number
-        self.d_mass_d_hub_mass = 1.0
-        self.d_mass_d_nacelle_mass = 1.0
-        self.d_mass_d_tower_mass = 1.0
-        
-        if self.offshore:
-            self.d_cost_d_blade_cost = 1.1 * self.blade_number
-            self.d_cost_d_hub_cost = 1.1
-            self.d_cost_d_nacelle_cost = 1.1
-            self.d_cost_d_tower_cost = 1.1
-        else:
-            self.d_cost_d_blade_cost = self.blade_number
-            self.d_cost_d_hub_cost = 1.0
-            self.d_cost_d_nacelle_cost = 1.0
-            self.d_cost_d_tower_cost = 1.0
+        out = tcc_csm(*args)
+        self.turbine_mass = out['turbine_mass']
+        self.turbine_cost = out['turbine_cost']
+
+        defer_jacobian(self, component_jacobian(self, tcc_csm_jacobian_values), *args)
 
     def list_deriv_vars(self):
 
@@ -267,12 +279,16 @@ class tcc_csm_component(Component):
         return inputs, outputs
         
     def provideJ(self):
-        
-        self.J = np.array([[self.d_mass_d_blade_mass, self.d_mass_d_hub_mass, self.d_mass_d_nacelle_mass, self.d_mass_d_tower_mass, 0.0, 0.0, 0.0, 0.0],\
-                           [0.0, 0.0, 0.0, 0.0, self.d_cost_d_blade_cost, self.d_cost_d_hub_cost, self.d_cost_d_nacelle_cost, self.d_cost_d_tower_cost]])
-        
-        return self.J
-  
+
+        return tcc_csm_pattern.dense(deferred_jacobian(self), out=self.J)
+
+    def provideJ_sparse(self):
+        """
+        Jacobian as a scipy.sparse CSR matrix with the structure of tcc_csm_pattern.
+        """
+
+        return tcc_csm_pattern.csr(deferred_jacobian(self))
+
 #-----------------------------------------------------------------
 
 def example():
@@ -0,0 +1,184 @@
+"""
+nrel_csm_tcc_batch.py
+
+Vectorized evaluation of the NREL Cost and Scaling Model turbine capital cost chain for many designs at once.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from turbine_costsse.turbine_costsse.escalation import escalators
+from turbine_costsse.turbine_costsse.costsse_kernels import drivetrain_codes
+from turbine_costsse.turbine_costsse.dual import forward_jacobian
+from csm_kernels import blades_csm, hub_csm, rotor_mass, nacelle_csm, tower_csm, tcc_csm, blades_csm_jacobian, \
+     hub_csm_jacobian, rotor_mass_jacobian, nacelle_csm_jacobian, nacelle_csm_outputs, tower_csm_jacobian, \
+     tcc_csm_jacobian
+
+# -------------------------------------------------------
+def tcc_csm_chain(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, esc, \
+                  blade_number=3, offshore=True, advanced_blade=False, drivetrain_design='geared', \
+                  crane=True, advanced_bedplate=0, advanced_tower=False):
+    """
+    The component chain of tcc_csm_assembly for design variables already broadcast
+    against each other and their escalators.  The design variables may be Duals.
+    """
+
+    out = {}
+    out.update(blades_csm(rotor_diameter, esc, advanced_blade))
+    out.update(hub_csm(rotor_diameter, out['blade_mass'], esc, blade_number))
+    out['rotor_mass'] = rotor_mass(out['blade_mass'], out['hub_system_mass'], blade_number)
+    out.update(nacelle_csm(rotor_diameter, out['rotor_mass'], rotor_thrust, rotor_torque, machine_rating, esc, \
+                           drivetrain_design, crane, advanced_bedplate, offshore))
+    out.update(tower_csm(rotor_diameter, hub_height, esc, advanced_tower))
+
+    out.update(tcc_csm(out['blade_mass'], out['hub_system_mass'], out['nacelle_mass'], out['tower_mass'], \
+                       out['blade_cost'], out['hub_system_cost'], out['nacelle_cost'], out['tower_cost'], \
+                       blade_number, offshore))
+
+    return out
+
+def tcc_csm_designs(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, year, month, \
+                    drivetrain_design):
+    """
+    The design variables as float arrays and drivetrain_design as drivetrain codes, broadcast
+    against each other and the target dates.
+    """
+
+    designs = np.broadcast_arrays(np.empty(np.broadcast(year, month).shape), \
+                                  *[np.asarray(x, dtype=np.float64) for x in \
+                                    (rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque)])[1:]
+
+    return designs + [np.broadcast_to(drivetrain_codes(drivetrain_design), designs[0].shape)]
+
+def tcc_csm_batch(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, \
+                  year=2009, month=12, blade_number=3, offshore=True, advanced_blade=False, \
+                  drivetrain_design='geared', crane=True, advanced_bedplate=0, advanced_tower=False, \
+                  context=None):
+    """
+    Evaluate tcc_csm_assembly for N designs in a single vectorized pass.
+
+    The design variables and drivetrain_design may be scalars or arrays; they are
+    broadcast against each other while the remaining parameters are shared by
+    every design.  Returns a
+    dictionary of float arrays holding every mass and cost output of the blades,
+    hub, rotor, nacelle and tower components together with turbine_mass and turbine_cost.
+
+    All costs are escalated to year and month, which may also be arrays of dates
+    whose escalators are gathered from the shared escalation table.  context is an
+    optional EvaluationContext supplying the PPI reference date and escalator source.
+    """
+
+    rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, drivetrain_design = \
+        tcc_csm_designs(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, year, month, \
+                        drivetrain_design)
+
+    esc = escalators(year, month, context)
+
+    return tcc_csm_chain(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, esc, \
+                         blade_number, offshore, advanced_blade, drivetrain_design, crane, advanced_bedplate, \
+                         advanced_tower)
+
+# rows and columns of tcc_csm_batch_jacobian
+jacobian_outputs = ['turbine_mass', 'turbine_cost']
+jacobian_inputs = ['rotor_diameter', 'machine_rating', 'hub_height', 'rotor_thrust', 'rotor_torque']
+
+tcc_csm_chain_jacobian = forward_jacobian(tcc_csm_chain, range(len(jacobian_inputs)), jacobian_outputs)
+
+def tcc_csm_component_jacobian(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, esc, \
+                               blade_number=3, offshore=True, advanced_blade=False, drivetrain_design='geared', \
+                               crane=True, advanced_bedplate=0, advanced_tower=False):
+    """
+    The Jacobian of tcc_csm_chain with respect to jacobian_inputs, composed by the
+    chain rule from the component Jacobian kernels rather than from dual numbers.
+    """
+
+    out = tcc_csm_chain(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, esc, \
+                        blade_number, offshore, advanced_blade, drivetrain_design, crane, advanced_bedplate, \
+                        advanced_tower)
+
+    # derivatives of the tcc_csm inputs (blade, hub system, nacelle and tower masses, then costs)
+    J = np.zeros(np.shape(out['turbine_cost']) + (8, len(jacobian_inputs)))
+
+    # blades and hub (rotor_diameter directly and through blade_mass)
+    J_blades = blades_csm_jacobian(rotor_diameter, esc, advanced_blade)
+    J_hub = hub_csm_jacobian(rotor_diameter, out['blade_mass'], esc, blade_number)
+    J[..., 0, 0] = J_blades[..., 0, 0]
+    J[..., 4, 0] = J_blades[..., 1, 0]
+    J[..., 1, 0] = J_hub[..., 3, 0] + J_hub[..., 3, 1] * J_blades[..., 0, 0]
+    J[..., 5, 0] = J_hub[..., 7, 0] + J_hub[..., 7, 1] * J_blades[..., 0, 0]
+
+    # nacelle (rotor_diameter directly and through rotor_mass)
+    J_rotor = rotor_mass_jacobian(out['blade_mass'], out['hub_system_mass'], blade_number)
+    J_nacelle = nacelle_csm_jacobian(rotor_diameter, out['rotor_mass'], rotor_thrust, rotor_torque, machine_rating, \
+                                     esc, drivetrain_design, crane, advanced_bedplate, offshore)
+    rotor_mass_d = J_rotor[..., 0, 0] * J[..., 0, 0] + J_rotor[..., 0, 1] * J[..., 1, 0]
+    for row, name in [(2, 'nacelle_mass'), (6, 'nacelle_cost')]:
+        J_n = J_nacelle[..., nacelle_csm_outputs.index(name), :]
+        J[..., row, 0] = J_n[..., 0] + J_n[..., 1] * rotor_mass_d
+        J[..., row, 1] = J_n[..., 4]
+        J[..., row, 3] = J_n[..., 2]
+        J[..., row, 4] = J_n[..., 3]
+
+    # tower
+    J_tower = tower_csm_jacobian(rotor_diameter, hub_height, esc, advanced_tower)
+    J[..., 3, [0, 2]] = J_tower[..., 0, :]
+    J[..., 7, [0, 2]] = J_tower[..., 1, :]
+
+    J_tcc = tcc_csm_jacobian(out['blade_mass'], out['hub_system_mass'], out['nacelle_mass'], out['tower_mass'], \
+                             out['blade_cost'], out['hub_system_cost'], out['nacelle_cost'], out['tower_cost'], \
+                             blade_number, offshore)
+
+    return np.einsum('...ij,...jk->...ik', J_tcc, J)
+
+def tcc_csm_batch_jacobian(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, \
+                           year=2009, month=12, blade_number=3, offshore=True, advanced_blade=False, \
+                           drivetrain_design='geared', crane=True, advanced_bedplate=0, advanced_tower=False, \
+                           context=None):
+    """
+    Jacobian of tcc_csm_assembly for N designs in a single vectorized pass.
+
+    Takes the same arguments as tcc_csm_batch and returns an array of shape
+    (N, len(jacobian_outputs), len(jacobian_inputs)) holding the derivatives of
+    turbine_mass and turbine_cost with respect to the design variables, from one
+    dual-number evaluation of the component chain.
+    """
+
+    designs = tcc_csm_designs(rotor_diameter, machine_rating, hub_height, rotor_thrust, rotor_torque, year, month, \
+                              drivetrain_design)
+
+    esc = escalators(year, month, context)
+
+    return tcc_csm_chain_jacobian(*(designs[:5] + [esc, blade_number, offshore, advanced_blade, designs[5], crane, \
+                                  advanced_bedplate, advanced_tower]))
+
+#-----------------------------------------------------------------
+
+def example():
+
+    # rotor diameter sweep around the NREL 5 MW Reference Turbine
+    rotor_diameter = np.linspace(110.0, 140.0, 4)
+    machine_rating = 5000.0
+
+    # Rotor force calculations for nacelle inputs
+    maxTipSpd = 80.0
+    maxEfficiency = 0.90201
+    ratedWindSpd = 11.5064
+    thrustCoeff = 0.50
+    airDensity = 1.225
+
+    ratedHubPower  = machine_rating / maxEfficiency
+    rotorSpeed     = (maxTipSpd/(0.5*rotor_diameter)) * (60.0 / (2*np.pi))
+    rotor_thrust  = airDensity * thrustCoeff * np.pi * rotor_diameter**2 * (ratedWindSpd**2) / 8
+    rotor_torque = ratedHubPower/(rotorSpeed*(np.pi/30))*1000
+
+    trb = tcc_csm_batch(rotor_diameter, machine_rating, 90.0, rotor_thrust, rotor_torque, \
+                        year=2009, month=12, advanced_blade=True, offshore=True)
+
+    for i in range(len(rotor_diameter)):
+        print "Rotor diameter {0:.1f} m: turbine mass {1:.2f} kg, turbine cost ${2:.2f} USD".format( \
+              rotor_diameter[i], trb['turbine_mass'][i], trb['turbine_cost'][i])
+
+if __name__ == "__main__":
+
+    example()
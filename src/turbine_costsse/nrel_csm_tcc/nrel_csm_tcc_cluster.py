@@ -0,0 +1,377 @@
+"""
+nrel_csm_tcc_cluster.py
+
+Design sweeps of tcc_csm_assembly sharded by a coordinator across worker processes
+on any number of machines, reached over TCP.
+
+The coordinator listens on an address and hands out chunks of the design table to
+the workers that connect to it, each chunk being evaluated with tcc_csm_batch.
+Messages are pickled and the connections are authenticated with a shared key,
+through multiprocessing.connection; since unpickling runs code, only run workers and
+coordinators on trusted networks.  A coordinator of the design table of an NPZ
+archive is started with
+
+    python -m turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_cluster coordinator HOST PORT designs.npz costs.npz
+
+and prints its address and key; a worker on another machine is then started with
+
+    TCC_CSM_AUTHKEY=KEY python -m turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_cluster worker HOST PORT
+
+the key being written in hexadecimal.  The coordinator takes its key from
+TCC_CSM_AUTHKEY as well when it is set.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+from multiprocessing.connection import Listener, Client, AuthenticationError, deliver_challenge, answer_challenge
+import argparse
+import binascii
+import importlib
+import multiprocessing
+import os
+import Queue
+import sys
+import threading
+import time
+import traceback
+import numpy as np
+
+from nrel_csm_tcc_sweep import design_columns, sweep_outputs, evaluate_chunk, print_progress
+
+# -------------------------------------------------------
+class SweepCoordinator(object):
+    """
+    Coordinator of a sweep of tcc_csm_batch over a design table (see tcc_csm_sweep).
+
+    The table is split into chunks of chunk_size rows that are sent, as compact column
+    slices, to the workers connected to address; the results are written into arrays
+    preallocated in row order.  A chunk whose worker disconnects, fails or gives no
+    result within chunk_timeout seconds is queued again for the next worker, up to
+    max_attempts times.  authkey is the key shared with the workers, random when None.
+    done, retries and workers count the designs evaluated, the chunks queued again and
+    the workers connected.
+    """
+
+    def __init__(self, designs, chunk_size=10000, address=('localhost', 0), authkey=None, chunk_timeout=600.0, \
+                 max_attempts=3, **params):
+
+        self.columns = design_columns(designs)
+        self.n = len(self.columns['rotor_diameter'])
+        self.out = sweep_outputs(self.columns, params)
+        self.params = params
+        self.chunk_size = chunk_size
+        self.chunk_timeout = chunk_timeout
+        self.max_attempts = max_attempts
+        self.authkey = authkey or os.urandom(16)
+
+        self.done = 0
+        self.retries = 0
+        self.workers = 0
+        self.error = None
+
+        self._pending = Queue.Queue()
+        self._attempts = {}
+        for start in range(0, self.n, chunk_size):
+            self._pending.put(start)
+            self._attempts[start] = 0
+        self._remaining = len(self._attempts)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._progress = None
+        self._progress_lock = threading.Lock()
+        self._t0 = None
+
+        # the key is checked by the thread serving each connection, so that a peer that
+        # never answers holds up neither the other workers nor close
+        self.listener = Listener(address)
+        self.address = self.listener.address
+        self._accept_thread = None
+
+    def run(self, progress=None, timeout=None, alive=None):
+        """
+        Serve the workers until every chunk is evaluated and return the outputs.
+        progress is called after each chunk as by tcc_csm_sweep, with the number of
+        workers connected and of retries added, one call at a time.  alive, when given,
+        returns whether any worker may still take chunks, such as the worker processes
+        started for the sweep.  Raises RuntimeError when a chunk fails max_attempts
+        times, when alive turns false with chunks pending or when the sweep is not over
+        after timeout seconds.
+        """
+
+        self._progress = progress
+        self._t0 = time.time()
+        if self._remaining == 0:
+            self._finished.set()
+
+        self._accept_thread = threading.Thread(target=self._accept, name='SweepCoordinator-accept')
+        self._accept_thread.daemon = True
+        self._accept_thread.start()
+
+        try:
+            while not self._finished.wait(0.1):
+                if timeout is not None and time.time() - self._t0 > timeout:
+                    raise RuntimeError('sweep not finished after {0} s, {1}/{2} designs done'.format( \
+                                       timeout, self.done, self.n))
+                if alive is not None and not alive() and not self._finished.is_set():
+                    raise RuntimeError('every worker exited with {0}/{1} designs done'.format(self.done, self.n))
+        finally:
+            self.close()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.out
+
+    def status(self):
+        """
+        Designs done, total, elapsed time, aggregate throughput in designs per second,
+        retries and workers connected.
+        """
+
+        with self._lock:
+            elapsed = time.time() - self._t0 if self._t0 is not None else 0.0
+            return {'done' : self.done, 'total' : self.n, 'elapsed' : elapsed, \
+                    'throughput' : self.done / elapsed if elapsed > 0 else float('inf'), \
+                    'retries' : self.retries, 'workers' : self.workers}
+
+    def close(self):
+        """
+        Stop accepting workers and close the listener; the workers connected are told to stop.
+        """
+
+        self._finished.set()
+        if self._accept_thread is not None and self._accept_thread.is_alive():
+            # a connection of our own wakes the accepting thread
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except (IOError, EOFError, AuthenticationError):
+                pass
+            self._accept_thread.join()
+        self.listener.close()
+
+    def _accept(self):
+
+        while not self._finished.is_set():
+            try:
+                connection = self.listener.accept()
+            except (IOError, EOFError, AuthenticationError):
+                continue
+
+            if self._finished.is_set():
+                connection.close()
+                break
+
+            thread = threading.Thread(target=self._serve, args=(connection,), name='SweepCoordinator-worker')
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+
+        try:
+            deliver_challenge(connection, self.authkey)
+            answer_challenge(connection, self.authkey)
+        except (IOError, EOFError, AuthenticationError):
+            connection.close()
+            return
+
+        with self._lock:
+            self.workers += 1
+
+        try:
+            while not self._finished.is_set():
+                try:
+                    start = self._pending.get(timeout=0.1)
+                except Queue.Empty:
+                    continue
+
+                stop = min(start + self.chunk_size, self.n)
+                columns = dict((name, column[start:stop]) for name, column in self.columns.items())
+                try:
+                    connection.send(('chunk', start, columns, self.params))
+                    if not connection.poll(self.chunk_timeout):
+                        raise IOError('no result within {0} s'.format(self.chunk_timeout))
+                    reply = connection.recv()
+                except (IOError, EOFError) as e:
+                    # lost worker: its chunk goes back to the queue
+                    self._retry(start, 'worker lost: {0!r}'.format(e))
+                    break
+
+                if reply[0] == 'error':
+                    self._retry(start, reply[2])
+                else:
+                    self._store(start, stop, reply[2])
+        finally:
+            try:
+                connection.send(('stop',))
+            except (IOError, EOFError):
+                pass
+            connection.close()
+            with self._lock:
+                self.workers -= 1
+
+    def _retry(self, start, reason):
+
+        with self._lock:
+            self._attempts[start] += 1
+            if self._attempts[start] >= self.max_attempts:
+                self.error = RuntimeError('chunk at row {0} failed {1} times, last with {2}'.format( \
+                                          start, self._attempts[start], reason))
+                self._finished.set()
+                return
+            self.retries += 1
+
+        self._pending.put(start)
+
+    def _store(self, start, stop, chunk):
+
+        for name, values in chunk.items():
+            self.out[name][start:stop] = values
+
+        with self._lock:
+            self.done += stop - start
+            self._remaining -= 1
+            finished = self._remaining == 0
+
+        if self._progress is not None:
+            # chunks are stored from one thread per worker
+            with self._progress_lock:
+                self._progress(self.status())
+        if finished:
+            self._finished.set()
+
+def sweep_worker(address, authkey):
+    """
+    Evaluate the chunks sent by the coordinator at address until it stops or goes away.
+    Returns the number of chunks evaluated.
+    """
+
+    connection = Client(address, authkey=authkey)
+    chunks = 0
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == 'stop':
+                break
+
+            tag, start, columns, params = message
+            try:
+                start, out = evaluate_chunk((start, columns, params))
+            except Exception:
+                connection.send(('error', start, traceback.format_exc()))
+                continue
+
+            connection.send(('result', start, out))
+            chunks += 1
+    except (IOError, EOFError):
+        pass
+    finally:
+        connection.close()
+
+    return chunks
+
+def tcc_csm_cluster_sweep(designs, workers=2, chunk_size=10000, progress=None, timeout=None, **params):
+    """
+    tcc_csm_sweep through a SweepCoordinator on localhost and workers local worker
+    processes connected to it over TCP.  Raises RuntimeError if every worker process
+    exits before the sweep is over.
+    """
+
+    coordinator = SweepCoordinator(designs, chunk_size=chunk_size, **params)
+    processes = [multiprocessing.Process(target=sweep_worker, args=(coordinator.address, coordinator.authkey)) \
+                 for i in range(workers)]
+    for process in processes:
+        process.daemon = True
+        process.start()
+
+    try:
+        return coordinator.run(progress, timeout, alive=lambda: any(process.is_alive() for process in processes))
+    finally:
+        for process in processes:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+
+def coordinate(address, table, output, stream=sys.stdout, authkey=None, **params):
+    """
+    Run a SweepCoordinator at address over the design table of the NPZ archive table
+    and save its outputs to the NPZ archive output, writing to stream the address and
+    the hexadecimal key the workers connect with.  Returns the outputs.
+    """
+
+    with np.load(table) as archive:
+        designs = dict((name, archive[name]) for name in archive.files)
+
+    coordinator = SweepCoordinator(designs, address=address, authkey=authkey, **params)
+    stream.write('coordinator listening on {0}:{1}\n'.format(*coordinator.address))
+    stream.write('TCC_CSM_AUTHKEY={0}\n'.format(binascii.hexlify(coordinator.authkey)))
+    stream.flush()
+
+    out = coordinator.run(print_progress(stream))
+    np.savez(output, **out)
+
+    return out
+
+def environment_authkey():
+    """
+    Key of the TCC_CSM_AUTHKEY environment variable, decoded from hexadecimal; None when unset.
+    """
+
+    key = os.environ.get('TCC_CSM_AUTHKEY')
+
+    return binascii.unhexlify(key) if key else None
+
+#-----------------------------------------------------------------
+
+def example():
+
+    # rotor diameter and rating sweep around the NREL 5 MW Reference Turbine
+    rotor_diameter, machine_rating = [x.ravel() for x in np.meshgrid(np.linspace(100.0, 160.0, 601), \
+                                                                     np.linspace(3000.0, 8000.0, 501))]
+    designs = {'rotor_diameter' : rotor_diameter, 'machine_rating' : machine_rating, \
+               'hub_height' : 90.0 * np.ones_like(rotor_diameter), \
+               'rotor_thrust' : 505575.481173 * (rotor_diameter / 126.0)**2, \
+               'rotor_torque' : 4365250.93957 * (rotor_diameter / 126.0) * (machine_rating / 5000.0)}
+
+    trb = tcc_csm_cluster_sweep(designs, workers=4, chunk_size=20000, progress=print_progress(), \
+                                advanced_blade=True, offshore=True)
+
+    i = np.argmin(trb['turbine_cost'] / machine_rating)
+    print "Lowest cost per kW: rotor diameter {0:.1f} m, rating {1:.0f} kW, ${2:.2f} USD".format( \
+          rotor_diameter[i], machine_rating[i], trb['turbine_cost'][i])
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Sweep tcc_csm_assembly over a design table with workers '
+                                                 'connected over TCP.')
+    modes = parser.add_subparsers(dest='mode')
+    worker = modes.add_parser('worker', help='evaluate chunks for a coordinator; key in TCC_CSM_AUTHKEY')
+    worker.add_argument('host')
+    worker.add_argument('port', type=int)
+    coordinator = modes.add_parser('coordinator', help='hand out the chunks of an NPZ design table')
+    coordinator.add_argument('host')
+    coordinator.add_argument('port', type=int, help='0 for any free port')
+    coordinator.add_argument('table', help='NPZ archive of the design table columns')
+    coordinator.add_argument('output', help='NPZ archive of the outputs')
+    coordinator.add_argument('--chunk-size', type=int, default=10000, help='designs per chunk (default 10000)')
+    coordinator.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', \
+                             help='parameter shared by every design, e.g. offshore=True')
+    modes.add_parser('example', help='sweep around the NREL 5 MW Reference Turbine with local workers')
+    args = parser.parse_args()
+
+    if args.mode == 'worker':
+        authkey = environment_authkey()
+        if authkey is None:
+            parser.error('the worker key is read from TCC_CSM_AUTHKEY')
+        sweep_worker((args.host, args.port), authkey)
+    elif args.mode == 'coordinator':
+        parameter = importlib.import_module('turbine_costsse.turbine_costsse.turbine_costsse_cli').parameter
+        params = {}
+        for assignment in args.set:
+            name, sep, value = assignment.partition('=')
+            if not sep:
+                parser.error('--set takes NAME=VALUE, not {0}'.format(assignment))
+            params[name.strip()] = parameter(value.strip())
+        coordinate((args.host, args.port), args.table, args.output, authkey=environment_authkey(), \
+                   chunk_size=args.chunk_size, **params)
+    else:
+        example()
@@ -0,0 +1,161 @@
+"""
+nrel_csm_tcc_sweep.py
+
+Design sweeps of tcc_csm_assembly split across a pool of worker processes.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import multiprocessing
+import sys
+import time
+import numpy as np
+
+from turbine_costsse.turbine_costsse.costsse_kernels import drivetrain_codes
+from nrel_csm_tcc_batch import tcc_csm_batch
+
+# design table columns; drivetrain_design, year and month may be columns or parameters shared by every design
+sweep_inputs = ['rotor_diameter', 'machine_rating', 'hub_height', 'rotor_thrust', 'rotor_torque']
+sweep_options = [('drivetrain_design', np.int8), ('year', np.int32), ('month', np.int32)]
+
+# -------------------------------------------------------
+def design_columns(designs):
+    """
+    Compact input arrays of a design table, a dictionary of columns or a structured
+    array: float64 design variables, int8 drivetrain codes and int32 dates.
+    """
+
+    names = designs.dtype.names if hasattr(designs, 'dtype') else designs.keys()
+
+    columns = dict((name, np.ascontiguousarray(designs[name], dtype=np.float64)) for name in sweep_inputs)
+    for name, dtype in sweep_options:
+        if name in names:
+            values = drivetrain_codes(designs[name]) if name == 'drivetrain_design' else designs[name]
+            columns[name] = np.ascontiguousarray(values, dtype=dtype)
+
+    if len(set(column.shape for column in columns.values())) != 1 or columns['rotor_diameter'].ndim != 1:
+        raise ValueError('design table columns must be one-dimensional and of equal length')
+
+    return columns
+
+def sweep_outputs(columns, params):
+    """
+    Preallocated output arrays of a sweep of the design table columns, named and typed
+    from the outputs of its first design.
+    """
+
+    for name in columns:
+        if name in params:
+            raise ValueError('{0} is both a design table column and a parameter'.format(name))
+
+    n = len(columns['rotor_diameter'])
+    first = evaluate_chunk((0, dict((name, column[:1]) for name, column in columns.items()), params))[1]
+
+    return dict((name, np.empty(n, dtype=np.asarray(value).dtype)) for name, value in first.items())
+
+def evaluate_chunk(task):
+    """
+    tcc_csm_batch of one chunk of a sweep; task is (start, columns, params).
+    """
+
+    start, columns, params = task
+    out = tcc_csm_batch(**dict(params, **columns))
+
+    return start, out
+
+def tcc_csm_sweep(designs, chunk_size=10000, processes=None, progress=None, **params):
+    """
+    Evaluate tcc_csm_assembly for every row of a design table with tcc_csm_batch, in
+    chunks of chunk_size rows spread over a pool of processes worker processes (the
+    number of CPUs when None, this process alone when 1).
+
+    designs maps each name in sweep_inputs, and optionally drivetrain_design, year and
+    month, to a column with one row per design; the remaining keyword arguments of
+    tcc_csm_batch are passed as params and shared by every design.  Workers receive
+    only the compact column slices of their chunk.  Returns a dictionary holding every
+    output of tcc_csm_batch as an array in row order, whatever order the chunks finish
+    in.  progress, when given, is called after each chunk with a dictionary of the
+    designs done, the total, the elapsed time in seconds and the throughput in designs
+    per second (see print_progress).
+    """
+
+    columns = design_columns(designs)
+    n = len(columns['rotor_diameter'])
+    out = sweep_outputs(columns, params)
+
+    tasks = ((start, dict((name, column[start:start + chunk_size]) for name, column in columns.items()), params) \
+             for start in range(0, n, chunk_size))
+
+    pool = None
+    if processes == 1:
+        results = (evaluate_chunk(task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(evaluate_chunk, tasks)
+
+    t0 = time.time()
+    done = 0
+    try:
+        for start, chunk in results:
+            stop = min(start + chunk_size, n)
+            for name, values in chunk.items():
+                out[name][start:stop] = values
+
+            done += stop - start
+            if progress is not None:
+                elapsed = time.time() - t0
+                progress({'done' : done, 'total' : n, 'elapsed' : elapsed, \
+                          'throughput' : done / elapsed if elapsed > 0 else float('inf')})
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return out
+
+def print_progress(stream=sys.stderr):
+    """
+    progress function of tcc_csm_sweep writing the designs done and the throughput to stream.
+    """
+
+    def report(status):
+        stream.write('\r{done}/{total} designs, {throughput:.0f} designs/s'.format(**status))
+        if status['done'] == status['total']:
+            stream.write('\n')
+        stream.flush()
+
+    return report
+
+#-----------------------------------------------------------------
+
+def example():
+
+    # full-factorial sweep around the NREL 5 MW Reference Turbine
+    rotor_diameter, machine_rating, hub_height, drivetrain_design = [x.ravel() for x in \
+        np.meshgrid(np.linspace(100.0, 160.0, 61), np.linspace(3000.0, 8000.0, 51), np.linspace(70.0, 130.0, 31), \
+                    [1, 2, 3, 4])]
+
+    # Rotor force calculations for nacelle inputs
+    maxTipSpd = 80.0
+    maxEfficiency = 0.90201
+    ratedWindSpd = 11.5064
+    thrustCoeff = 0.50
+    airDensity = 1.225
+
+    ratedHubPower  = machine_rating / maxEfficiency
+    rotorSpeed     = (maxTipSpd/(0.5*rotor_diameter)) * (60.0 / (2*np.pi))
+    rotor_thrust  = airDensity * thrustCoeff * np.pi * rotor_diameter**2 * (ratedWindSpd**2) / 8
+    rotor_torque = ratedHubPower/(rotorSpeed*(np.pi/30))*1000
+
+    designs = {'rotor_diameter' : rotor_diameter, 'machine_rating' : machine_rating, 'hub_height' : hub_height, \
+               'rotor_thrust' : rotor_thrust, 'rotor_torque' : rotor_torque, 'drivetrain_design' : drivetrain_design}
+    trb = tcc_csm_sweep(designs, chunk_size=20000, progress=print_progress(), year=2009, month=12, \
+                        advanced_blade=True, offshore=True)
+
+    i = np.argmin(trb['turbine_cost'] / machine_rating)
+    print "Lowest cost per kW: rotor diameter {0:.1f} m, rating {1:.0f} kW, hub height {2:.1f} m, ${3:.2f} USD".format( \
+          rotor_diameter[i], machine_rating[i], hub_height[i], trb['turbine_cost'][i])
+
+if __name__ == "__main__":
+
+    example()
@@ -8,7 +8,9 @@ Copyright (c) NREL. All rights reserved.
 from openmdao.main.api import Component, Assembly, set_as_top, VariableTree
 from openmdao.main.datatypes.api import Int, Bool, Float, Array, VarTree
 
-from commonse.config import *
+from turbine_costsse.turbine_costsse.escalation import component_escalators
+from csm_kernels import tower_csm, tower_csm_jacobian, tower_csm_hessian
+from turbine_costsse.turbine_costsse.dual import component_jacobian, defer_jacobian, deferred_jacobian
 import numpy as np
 
 class tower_csm_component(Component):
@@ -44,31 +46,14 @@ class tower_csm_component(Component):
         Executes the tower model of the NREL _cost and Scaling Model.
         """
 
-        windpactMassSlope = 0.397251147546925
-        windpactMassInt   = -1414.381881
-        
-        if self.advanced_tower:
-           windpactMassSlope = 0.269380169
-           windpactMassInt = 1779.328183
-
-        self.tower_mass = windpactMassSlope * np.pi * (self.rotor_diameter/2.)**2 * self.hub_height + windpactMassInt
+        esc = component_escalators(self)
 
-        ppi.curr_yr = curr_yr
-        ppi.curr_mon = curr_mon
+        out = tower_csm(self.rotor_diameter, self.hub_height, esc, self.advanced_tower)
+        self.tower_mass = out['tower_mass']
+        self.tower_cost = out['tower_cost']
 
-        twrCostEscalator  = 1.5944
-        twrCostEscalator  = ppi.compute('IPPI_TWR')
-        twrCostCoeff      = 1.5 # $/kg    
+        defer_jacobian(self, component_jacobian(self, tower_csm_jacobian), self.rotor_diameter, self.hub_height, esc, self.advanced_tower)
 
-        self.towerCost2002 = self.tower_mass * twrCostCoeff               
-        self.tower_cost = self.towerCost2002 * twrCostEscalator
-        
-        # derivatives
-        self.d_mass_d_diameter = 2 * windpactMassSlope * np.pi * (self.rotor_diameter/2.) * (1/2.) * self.hub_height
-        self.d_mass_d_hheight = windpactMassSlope * np.pi * (self.rotor_diameter/2.)**2
-        self.d_cost_d_diameter = twrCostCoeff * twrCostEscalator * self.d_mass_d_diameter
-        self.d_cost_d_hheight = twrCostCoeff * twrCostEscalator * self.d_mass_d_hheight
-    
     def list_deriv_vars(self):
 
         inputs = ['rotor_diameter', 'hub_height']
@@ -78,10 +63,17 @@ class tower_csm_component(Component):
     
     def provideJ(self):
 
-        self.J = np.array([[self.d_mass_d_diameter, self.d_mass_d_hheight], [self.d_cost_d_diameter, self.d_cost_d_hheight]])
-        
-        return self.J        
-          
+        return deferred_jacobian(self)
+
+    def provideH(self):
+        """
+        Second derivatives of the outputs with respect to the inputs of list_deriv_vars at the
+        current inputs, shaped (n_outputs, n_inputs, n_inputs).
+        """
+
+        return tower_csm_hessian(self.rotor_diameter, self.hub_height, component_escalators(self), \
+                                 self.advanced_tower)
+
 #-----------------------------------------------------------------
 
 def example():
@@ -0,0 +1,14 @@
+"""
+Turbine_CostsSE mass-based cost model.
+
+costsse_kernels, escalation and turbine_costsse_batch only need NumPy.  The OpenMDAO
+components below are imported from their modules, together with OpenMDAO and
+fusedwind, on first access.
+"""
+
+from lazy_import import lazy_module
+
+lazy_module(__name__, {'Turbine_CostsSE' : 'turbine_costsse', 'TurbineCostAdder' : 'turbine_costsse', \
+                       'Turbine_CostsSE_Flat' : 'turbine_costsse', \
+                       'Rotor_CostsSE' : 'rotor_costsse', 'Nacelle_CostsSE' : 'nacelle_costsse', \
+                       'Tower_CostsSE' : 'tower_costsse'})
@@ -0,0 +1,177 @@
+"""
+benchmarks.py
+
+Per-call latency benchmarks of the Turbine_CostsSE evaluation paths.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import timeit
+
+# NREL 5 MW Reference Turbine inputs of Turbine_CostsSE
+reference_inputs = {'blade_mass' : 17650.67, 'hub_mass' : 31644.5, 'pitch_system_mass' : 17004.0, \
+                    'spinner_mass' : 1810.5, 'low_speed_shaft_mass' : 31257.3, \
+                    'main_bearing_mass' : 9731.41 / 2, 'second_bearing_mass' : 9731.41 / 2, \
+                    'gearbox_mass' : 30237.60, 'high_speed_side_mass' : 1492.45, \
+                    'generator_mass' : 16699.85, 'bedplate_mass' : 93090.6, \
+                    'yaw_system_mass' : 11878.24, 'tower_mass' : 434559.0, 'machine_rating' : 5000.0, \
+                    'blade_number' : 3, 'advanced_blade' : True, 'drivetrain_design' : 'geared', \
+                    'crane' : True, 'offshore' : True, 'year' : 2010, 'month' : 12}
+
+def reference_turbine(turbine):
+    '''
+    Set the reference inputs on a Turbine_CostsSE or Turbine_CostsSE_Flat instance.
+    '''
+
+    for name, value in reference_inputs.items():
+        setattr(turbine, name, value)
+
+    return turbine
+
+def time_per_call(func, number=100, repeat=5):
+    '''
+    Best wall-clock time of one call of func, in seconds, over repeat rounds of number calls.
+    '''
+
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def perturbed_run(turbine):
+    '''
+    Function running turbine after a small change of tower_mass, so that every call
+    re-executes the model rather than finding its outputs valid.
+    '''
+
+    state = {'step' : 0}
+
+    def run():
+        state['step'] = 1 - state['step']
+        turbine.tower_mass = reference_inputs['tower_mass'] + state['step']
+        turbine.run()
+
+    return run
+
+def benchmark_flat(number=100, repeat=5):
+    '''
+    Per-call latency in seconds of the Turbine_CostsSE assembly and of the flattened
+    Turbine_CostsSE_Flat component for the reference turbine, with the Jacobian of the
+    flat component included.
+    '''
+
+    from turbine_costsse import Turbine_CostsSE, Turbine_CostsSE_Flat
+
+    results = {}
+    for cls in [Turbine_CostsSE, Turbine_CostsSE_Flat]:
+        results[cls.__name__] = time_per_call(perturbed_run(reference_turbine(cls())), number, repeat)
+
+    return results
+
+def leaf_components(assembly):
+    '''
+    Components of assembly, descending into its sub-assemblies.
+    '''
+
+    components = []
+    for name in assembly.list_components():
+        component = getattr(assembly, name)
+        if hasattr(component, 'list_components'):
+            components += leaf_components(component)
+        else:
+            components.append(component)
+
+    return components
+
+def benchmark_lazy_derivatives(number=1000, repeat=5):
+    '''
+    Per-call latency in seconds of the execute of every component of Turbine_CostsSE
+    and tcc_csm_assembly at the reference turbine, as a dictionary from component
+    class name to (values, values_and_jacobian): an execute alone, which defers the
+    Jacobian, and an execute followed by provideJ, which is what every execute cost
+    when the Jacobian was evaluated eagerly.
+    '''
+
+    from turbine_costsse import Turbine_CostsSE
+
+    # the absolute name, as the sibling module turbine_costsse shadows the package here
+    tcc_csm_assembly = importlib.import_module('turbine_costsse.nrel_csm_tcc').tcc_csm_assembly
+
+    turbine = reference_turbine(Turbine_CostsSE())
+    turbine.run()
+
+    tcc = tcc_csm_assembly()
+    for name, value in [('rotor_diameter', 126.0), ('hub_height', 90.0), ('machine_rating', 5000.0), \
+                        ('rotor_thrust', 500930.1), ('rotor_torque', 4365249.), ('year', 2009), ('month', 12)]:
+        setattr(tcc, name, value)
+    tcc.run()
+
+    def values_and_jacobian(component):
+
+        def run():
+            component.execute()
+            component.provideJ()
+
+        return run
+
+    results = {}
+    for component in leaf_components(turbine) + leaf_components(tcc):
+        results[type(component).__name__] = (time_per_call(component.execute, number, repeat), \
+                                             time_per_call(values_and_jacobian(component), number, repeat))
+
+    return results
+
+# import-time target of the kernel-only modules, in seconds once NumPy is loaded
+import_time_target = 0.1
+
+def benchmark_kernel_import(repeat=5):
+    '''
+    Best time in seconds, over repeat fresh interpreters, to import the kernel-only
+    turbine_costsse_batch and nrel_csm_tcc_batch modules once NumPy is loaded, and the
+    sorted names of the frameworks among openmdao, fusedwind and commonse that the
+    import loaded.
+    '''
+
+    script = '\n'.join(['import sys, time', 'import numpy', 't0 = time.time()', \
+                         'import turbine_costsse.turbine_costsse.turbine_costsse_batch', \
+                         'import turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_batch', \
+                         'print time.time() - t0', \
+                         'print " ".join(sorted(set(m.split(".")[0] for m in sys.modules) & ' \
+                         'set(["openmdao", "fusedwind", "commonse"])))'])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    times = []
+    for i in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', script], env=env).splitlines()
+        times.append(float(output[0]))
+
+    return min(times), output[1].split()
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    results = benchmark_flat()
+
+    print "Turbine_CostsSE per-call latency"
+    for name in ['Turbine_CostsSE', 'Turbine_CostsSE_Flat']:
+        print "{0:24s} {1:10.1f} us".format(name, 1e6 * results[name])
+    print "speed-up {0:.1f}x".format(results['Turbine_CostsSE'] / results['Turbine_CostsSE_Flat'])
+
+    results = benchmark_lazy_derivatives()
+
+    print "Component execute latency, values only and with the Jacobian"
+    for name in sorted(results):
+        values, jacobian = results[name]
+        print "{0:24s} {1:10.1f} us {2:10.1f} us  saving {3:5.1f}%".format(name, 1e6 * values, 1e6 * jacobian, \
+                                                                          100 * (1 - values / jacobian))
+
+    import_time, frameworks = benchmark_kernel_import()
+
+    print "Kernel-only import {0:.1f} ms, target {1:.1f} ms, frameworks loaded: {2}".format( \
+          1e3 * import_time, 1e3 * import_time_target, ', '.join(frameworks) or 'none')
+
+if __name__ == "__main__":
+
+    example()
@@ -0,0 +1,654 @@
+"""
+costsse_kernels.py
+
+Framework-free cost kernels of the Turbine_CostsSE components.
+
+Each component has a value kernel returning its outputs and a Jacobian kernel
+returning the derivatives the component provides, with rows and columns in the
+order of its list_deriv_vars.  Inputs may be floats or NumPy arrays; esc is any
+mapping from PPI index to escalator (an EscalatorSnapshot or a dictionary of
+escalator arrays).
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from dual import forward_jacobian, forward_jacobians
+
+# drivetrain_design string to the coefficient index used by the components
+drivetrain_index = {'geared' : 1, 'single_stage' : 2, 'multi_drive' : 3, 'multi-drive' : 3, 'pm_direct_drive' : 4}
+
+# coefficients of the component cost equations, in 2002 USD; every kernel takes an
+# optional coefficients mapping with these keys, whose values may be arrays, in their place
+cost_coefficients = {
+    # BladeCost, advanced (slope 14.0 in the model) and standard blades
+    'advanced_blade_slope' : 13.0, 'advanced_blade_intercept' : 5813.9,
+    'blade_slope' : 8.0, 'blade_intercept' : 21465.0,
+    # HubCost, PitchSystemCost and SpinnerCost
+    'hub_coeff' : 4.25,
+    'pitch_system_factor' : 2.28, 'pitch_system_coeff' : 0.0808, 'pitch_system_exponent' : 1.4985,
+    'spinner_coeff' : 5.57,
+    # LowSpeedShaftCost, BearingsCost and HighSpeedSideCost
+    'lss_slope' : 3.3602, 'lss_intercept' : 13587.0,
+    'bearings_coeff' : 17.6,
+    'hss_coeff' : 10.0,
+    # GearboxCost: mass based for the geared drivetrain, rating based for the others
+    'gearbox_slope' : 16.9, 'gearbox_intercept' : 25066.0,
+    'single_stage_gearbox_coeff' : 74.101, 'multi_drive_gearbox_coeff' : 15.25697015,
+    'pm_direct_drive_gearbox_coeff' : 0.0,
+    # GeneratorCost: mass based for the geared drivetrain, $/kW for the others
+    'generator_slope' : 19.697, 'generator_intercept' : 9277.3,
+    'single_stage_generator_coeff' : 54.73, 'multi_drive_generator_coeff' : 48.03,
+    'pm_direct_drive_generator_coeff' : 219.33,
+    # BedplateCost and YawSystemCost
+    'bedplate_slope' : 0.9461, 'bedplate_intercept' : 17799.0,
+    'yaw_slope' : 8.3221, 'yaw_intercept' : 2708.5,
+    # NacelleSystemCostAdder
+    'platforms_coeff' : 8.7, 'crane_cost' : 12000.0, 'base_hardware_fraction' : 0.7,
+    'econnections_coeff' : 40.0, 'vspd_etronics_coeff' : 79.32, 'hydr_cooling_coeff' : 12.0,
+    'controls_cost' : 35000.0, 'offshore_controls_cost' : 55900.0,
+    'nacelle_cover_slope' : 11.537, 'nacelle_cover_intercept' : 3849.7,
+    # TowerCost and TurbineCostAdder
+    'tower_coeff' : 1.5,
+    'offshore_factor' : 1.1}
+
+# drivetrain code to the prefix of its rating based gearbox and generator coefficients
+drivetrain_prefixes = [None, None, 'single_stage', 'multi_drive', 'pm_direct_drive']
+
+def drivetrain_codes(drivetrain_design):
+    '''
+    Convert a drivetrain_design name, integer code or array of either into integer codes (1-4).
+    '''
+
+    dt = np.asarray(drivetrain_design)
+    if dt.dtype.kind in ('S', 'U', 'O'):
+        codes = np.zeros(dt.shape, dtype=int)
+        for name in np.unique(dt):
+            codes[dt == name] = drivetrain_index[name]
+        dt = codes
+    dt = dt.astype(int)
+
+    if np.any((dt < 1) | (dt > 4)):
+        raise ValueError('drivetrain_design codes must be between 1 and 4')
+
+    return dt
+
+def drivetrain_code(drivetrain_design):
+    '''
+    Integer code (1-4) of a single drivetrain_design name or code.
+    '''
+
+    if isinstance(drivetrain_design, basestring):
+        return drivetrain_index[drivetrain_design]
+
+    return int(drivetrain_codes(drivetrain_design))
+
+def zero_jacobian(n_outputs, n_inputs, *args):
+    '''
+    Zero Jacobian of shape broadcast(args) + (n_outputs, n_inputs).
+    '''
+
+    return np.zeros(np.broadcast(*args).shape + (n_outputs, n_inputs))
+
+class JacobianPattern(object):
+    '''
+    Fixed sparsity pattern of a component Jacobian of shape (n_outputs, n_inputs),
+    declared once from the (row, column) pairs of its structurally nonzero entries.
+    Jacobian values kernels return only these entries, in row-major order, with
+    index giving the position of each pair.
+    '''
+
+    def __init__(self, n_outputs, n_inputs, entries):
+
+        entries = sorted(set(entries))
+
+        self.shape = (n_outputs, n_inputs)
+        self.rows = np.array([r for r, c in entries], dtype=int)
+        self.cols = np.array([c for r, c in entries], dtype=int)
+        self.nnz = len(entries)
+        self.index = dict((entry, k) for k, entry in enumerate(entries))
+        self.indptr = np.searchsorted(self.rows, np.arange(n_outputs + 1))
+
+    def dense(self, values, out=None):
+        '''
+        Dense Jacobian(s) of shape values.shape[:-1] + shape, written into out when given.
+        '''
+
+        values = np.asarray(values)
+        if out is None:
+            out = np.zeros(values.shape[:-1] + self.shape)
+        out[..., self.rows, self.cols] = values
+
+        return out
+
+    def coo(self, values):
+        '''
+        (values, rows, cols) triplets of the block diagonal Jacobian of every design in values.
+        '''
+
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.nnz)
+        block = np.arange(values.shape[0])[:, np.newaxis]
+
+        return values.ravel(), (self.rows + self.shape[0] * block).ravel(), (self.cols + self.shape[1] * block).ravel()
+
+    def csr(self, values):
+        '''
+        scipy.sparse CSR matrix of the block diagonal Jacobian of every design in values.
+        '''
+
+        from scipy.sparse import csr_matrix
+
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.nnz)
+        n = values.shape[0]
+        block = np.arange(n)[:, np.newaxis]
+
+        indices = (self.cols + self.shape[1] * block).ravel()
+        indptr = np.append((self.indptr[:-1] + self.nnz * block).ravel(), n * self.nnz)
+
+        return csr_matrix((values.ravel(), indices, indptr), shape=(n * self.shape[0], n * self.shape[1]))
+
+def cost_multiplier(assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0):
+    '''
+    Derivative of the sub-system and turbine cost adders with respect to their parts cost.
+    '''
+
+    return (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
+
+#-------------------------------------------------------------------------------
+# Rotor components
+
+def coefficient_table(coefficients=None):
+    '''
+    Cost coefficients of the kernels: coefficients when given, else cost_coefficients.
+    '''
+
+    return cost_coefficients if coefficients is None else coefficients
+
+def blade_cost(blade_mass, esc, advanced=True, coefficients=None):
+    '''
+    BladeCost: cost of a single blade.
+    '''
+
+    c = coefficient_table(coefficients)
+    if advanced:
+        ppi_mat   = esc['IPPI_BLA']
+        slope   = c['advanced_blade_slope']
+        intercept     = c['advanced_blade_intercept']
+    else:
+        ppi_mat   = esc['IPPI_BLD']
+        slope   = c['blade_slope']
+        intercept     = c['blade_intercept']
+
+    return ((slope*blade_mass + intercept)*ppi_mat)
+
+def blade_cost_jacobian(blade_mass, esc, advanced=True, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    if advanced:
+        ppi_mat = esc['IPPI_BLA']
+        slope = c['advanced_blade_slope']
+    else:
+        ppi_mat = esc['IPPI_BLD']
+        slope = c['blade_slope']
+
+    J = zero_jacobian(1, 1, blade_mass, ppi_mat, slope)
+    J[..., 0, 0] = slope * ppi_mat
+
+    return J
+
+def hub_cost(hub_mass, esc, coefficients=None):
+    '''
+    HubCost: hub cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    hubCost2002      = (hub_mass * c['hub_coeff']) # $/kg
+
+    return (hubCost2002 * esc['IPPI_HUB'])
+
+def hub_cost_jacobian(hub_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, hub_mass, esc['IPPI_HUB'], c['hub_coeff'])
+    J[..., 0, 0] = esc['IPPI_HUB'] * c['hub_coeff']
+
+    return J
+
+def pitch_system_cost(pitch_system_mass, esc, coefficients=None):
+    '''
+    PitchSystemCost: pitch system cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    pitchSysCost2002     = c['pitch_system_factor'] * (c['pitch_system_coeff'] * (pitch_system_mass ** c['pitch_system_exponent']))            # new cost based on mass - x1.328 for housing proportion
+
+    return (esc['IPPI_PMB'] * pitchSysCost2002)
+
+def pitch_system_cost_jacobian(pitch_system_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    exponent = c['pitch_system_exponent']
+    J = zero_jacobian(1, 1, pitch_system_mass, esc['IPPI_PMB'], c['pitch_system_factor'], c['pitch_system_coeff'], exponent)
+    J[..., 0, 0] = esc['IPPI_PMB'] * c['pitch_system_factor'] * (c['pitch_system_coeff'] * exponent * (pitch_system_mass ** (exponent - 1)))
+
+    return J
+
+def spinner_cost(spinner_mass, esc, coefficients=None):
+    '''
+    SpinnerCost: spinner cost.
+    '''
+
+    c = coefficient_table(coefficients)
+
+    return (esc['IPPI_NAC'] * (c['spinner_coeff']*spinner_mass))
+
+def spinner_cost_jacobian(spinner_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, spinner_mass, esc['IPPI_NAC'], c['spinner_coeff'])
+    J[..., 0, 0] = esc['IPPI_NAC'] * c['spinner_coeff']
+
+    return J
+
+def hub_system_cost(hub_cost, pitch_system_cost, spinner_cost, \
+                    assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0):
+    '''
+    HubSystemCostAdder: hub system cost.
+    '''
+
+    partsCost = hub_cost + pitch_system_cost + spinner_cost
+
+    return (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
+
+def hub_system_cost_jacobian(hub_cost, pitch_system_cost, spinner_cost, \
+                             assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0):
+
+    J = zero_jacobian(1, 3, hub_cost, pitch_system_cost, spinner_cost)
+    J[..., 0, :] = cost_multiplier(assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+
+    return J
+
+def rotor_cost(blade_cost, hub_system_cost, blade_number=3):
+    '''
+    RotorCostAdder: rotor cost.
+    '''
+
+    return blade_cost * blade_number + hub_system_cost
+
+def rotor_cost_jacobian(blade_cost, hub_system_cost, blade_number=3):
+
+    J = zero_jacobian(1, 2, blade_cost, hub_system_cost)
+    J[..., 0, 0] = blade_number
+    J[..., 0, 1] = 1
+
+    return J
+
+#-------------------------------------------------------------------------------
+# Nacelle components
+
+def low_speed_shaft_cost(low_speed_shaft_mass, esc, coefficients=None):
+    '''
+    LowSpeedShaftCost: low speed shaft cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    LowSpeedShaftCost2002 = c['lss_slope'] * low_speed_shaft_mass + c['lss_intercept']      # equation adjusted to be based on mass rather than rotor diameter using data from CSM
+
+    return (LowSpeedShaftCost2002 * esc['IPPI_LSS'] )
+
+def low_speed_shaft_cost_jacobian(low_speed_shaft_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, low_speed_shaft_mass, esc['IPPI_LSS'], c['lss_slope'])
+    J[..., 0, 0] = esc['IPPI_LSS'] * c['lss_slope']
+
+    return J
+
+def bearings_cost(main_bearing_mass, second_bearing_mass, esc, coefficients=None):
+    '''
+    BearingsCost: main and second bearing cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    bearingsMass = main_bearing_mass + second_bearing_mass
+
+    brngSysCostFactor = c['bearings_coeff'] # $/kg                  # cost / unit mass from CSM
+    Bearings2002 = (bearingsMass) * brngSysCostFactor
+
+    return (( Bearings2002 ) * esc['IPPI_BRN'] ) / 4   # div 4 to account for bearing cost mass differences CSM to Sunderland
+
+def bearings_cost_jacobian(main_bearing_mass, second_bearing_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 2, main_bearing_mass, second_bearing_mass, esc['IPPI_BRN'], c['bearings_coeff'])
+    J[..., 0, 0] = esc['IPPI_BRN'] * c['bearings_coeff'] / 4
+    J[..., 0, 1] = esc['IPPI_BRN'] * c['bearings_coeff'] / 4
+
+    return J
+
+def gearbox_cost(gearbox_mass, machine_rating, esc, drivetrain_design='geared', coefficients=None):
+    '''
+    GearboxCost: gearbox cost.  For drivetrains other than geared the component
+    uses its cost coefficient as the exponent as well, which is kept here.
+    '''
+
+    c = coefficient_table(coefficients)
+
+    dt = drivetrain_code(drivetrain_design)
+    if dt == 1:
+        Gearbox2002 = c['gearbox_slope'] * gearbox_mass - c['gearbox_intercept']          # for traditional 3-stage gearbox, use mass based cost equation from NREL CSM
+    else:
+        costCoeff = c[drivetrain_prefixes[dt] + '_gearbox_coeff']
+        Gearbox2002 = costCoeff * (machine_rating ** costCoeff)        # for other drivetrain configurations, use NREL CSM equation based on machine rating
+
+    return Gearbox2002 * esc['IPPI_GRB']
+
+def gearbox_cost_jacobian(gearbox_mass, machine_rating, esc, drivetrain_design='geared', coefficients=None):
+
+    c = coefficient_table(coefficients)
+
+    dt = drivetrain_code(drivetrain_design)
+    if dt == 1:
+        J = zero_jacobian(1, 2, gearbox_mass, machine_rating, esc['IPPI_GRB'], c['gearbox_slope'])
+        J[..., 0, 0] = esc['IPPI_GRB'] * c['gearbox_slope']
+    else:
+        costCoeff = c[drivetrain_prefixes[dt] + '_gearbox_coeff']
+        J = zero_jacobian(1, 2, gearbox_mass, machine_rating, esc['IPPI_GRB'], costCoeff)
+        J[..., 0, 1] = esc['IPPI_GRB'] * costCoeff * (costCoeff * (machine_rating ** (costCoeff-1)))
+
+    return J
+
+def high_speed_side_cost(high_speed_side_mass, esc, coefficients=None):
+    '''
+    HighSpeedSideCost: high speed side and mechanical brake cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    mechBrakeCost2002    = c['hss_coeff'] * high_speed_side_mass                  # mechanical brake system cost based on $10 / kg multiplier from CSM model (inverse relationship)
+
+    return esc['IPPI_BRK'] * mechBrakeCost2002
+
+def high_speed_side_cost_jacobian(high_speed_side_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, high_speed_side_mass, esc['IPPI_BRK'], c['hss_coeff'])
+    J[..., 0, 0] = esc['IPPI_BRK'] * c['hss_coeff']
+
+    return J
+
+def generator_cost(generator_mass, machine_rating, esc, drivetrain_design='geared', coefficients=None):
+    '''
+    GeneratorCost: generator cost.
+    '''
+
+    c = coefficient_table(coefficients)
+
+    dt = drivetrain_code(drivetrain_design)
+    if dt == 1:
+        GeneratorCost2002 = c['generator_slope'] * generator_mass + c['generator_intercept']
+    else:
+        GeneratorCost2002 = c[drivetrain_prefixes[dt] + '_generator_coeff'] * machine_rating # $/kW - from 'Generators' worksheet
+
+    return GeneratorCost2002 * esc['IPPI_GEN']
+
+def generator_cost_jacobian(generator_mass, machine_rating, esc, drivetrain_design='geared', coefficients=None):
+
+    c = coefficient_table(coefficients)
+
+    dt = drivetrain_code(drivetrain_design)
+    if dt == 1:
+        J = zero_jacobian(1, 2, generator_mass, machine_rating, esc['IPPI_GEN'], c['generator_slope'])
+        J[..., 0, 0] = esc['IPPI_GEN'] * c['generator_slope']
+    else:
+        costCoeff = c[drivetrain_prefixes[dt] + '_generator_coeff']
+        J = zero_jacobian(1, 2, generator_mass, machine_rating, esc['IPPI_GEN'], costCoeff)
+        J[..., 0, 1] = costCoeff * esc['IPPI_GEN']
+
+    return J
+
+def bedplate_cost2002(bedplate_mass, coefficients=None):
+    '''
+    BedplateCost: bedplate cost in 2002 USD.
+    '''
+
+    c = coefficient_table(coefficients)
+
+    return c['bedplate_slope'] * bedplate_mass + c['bedplate_intercept']                   # equation adjusted based on mass / cost relationships for components documented in NREL CSM
+
+def bedplate_cost(bedplate_mass, esc, coefficients=None):
+    '''
+    BedplateCost: bedplate cost.
+    '''
+
+    return bedplate_cost2002(bedplate_mass, coefficients) * esc['IPPI_MFM']
+
+def bedplate_cost_jacobian(bedplate_mass, esc, coefficients=None):
+    '''
+    Rows are cost and cost2002.
+    '''
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(2, 1, bedplate_mass, esc['IPPI_MFM'], c['bedplate_slope'])
+    J[..., 0, 0] = esc['IPPI_MFM'] * c['bedplate_slope']
+    J[..., 1, 0] = c['bedplate_slope']
+
+    return J
+
+def yaw_system_cost(yaw_system_mass, esc, coefficients=None):
+    '''
+    YawSystemCost: yaw drive and bearing cost.
+    '''
+
+    c = coefficient_table(coefficients)
+    YawDrvBearing2002 = c['yaw_slope'] * yaw_system_mass + c['yaw_intercept']          # cost / mass relationship derived from NREL CSM data
+
+    return YawDrvBearing2002 * esc['IPPI_YAW']
+
+def yaw_system_cost_jacobian(yaw_system_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, yaw_system_mass, esc['IPPI_YAW'], c['yaw_slope'])
+    J[..., 0, 0] = esc['IPPI_YAW'] * c['yaw_slope']
+
+    return J
+
+def nacelle_system_cost(lss_cost, bearings_cost, gearbox_cost, hss_cost, generator_cost, bedplate_cost, \
+                        bedplateCost2002, yaw_system_cost, bedplate_mass, machine_rating, esc, \
+                        crane=False, offshore=False, assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                        profitMultiplier=0.0, transportMultiplier=0.0, coefficients=None):
+    '''
+    NacelleSystemCostAdder: returns a dictionary with the nacelle cost and the
+    mainframe, electrical connection, variable speed electronics, hydraulics and
+    cooling, controls and nacelle cover costs it adds to the component costs.
+    '''
+
+    c = coefficient_table(coefficients)
+    BedplateCostEsc      = esc['IPPI_MFM']
+
+    # mainframe system including bedplate, platforms, crane and miscellaneous hardware
+    nacellePlatformsMass = 0.125 * bedplate_mass
+    NacellePlatforms2002 = c['platforms_coeff'] * nacellePlatformsMass
+
+    if (crane):
+        craneCost2002  = c['crane_cost']
+    else:
+        craneCost2002  = 0.0
+
+    out = {}
+
+    # aggregation of mainframe components: bedplate, crane and platforms into single mass and cost
+    BaseHardwareCost2002  = bedplateCost2002 * c['base_hardware_fraction']
+    MainFrameCost2002   = (NacellePlatforms2002 + craneCost2002  + \
+                      BaseHardwareCost2002 )
+    out['mainframe_cost']  = MainFrameCost2002 * BedplateCostEsc + bedplate_cost
+
+    # electronic systems, hydraulics and controls
+    econnectionsCost2002  = c['econnections_coeff'] * machine_rating  # 2002
+    out['econnections_cost'] = econnectionsCost2002 * esc['IPPI_ELC']
+
+    VspdEtronics2002      = c['vspd_etronics_coeff'] * machine_rating
+    out['vspd_etronics_cost'] = VspdEtronics2002 * esc['IPPI_VSE']
+
+    hydrCoolingCost2002  = c['hydr_cooling_coeff'] * machine_rating # 2002
+    out['hydr_cooling_cost'] = hydrCoolingCost2002 * esc['IPPI_HYD']
+
+    if (not offshore):
+        ControlsCost2002  = c['controls_cost'] # initial approximation 2002
+    else:
+        ControlsCost2002  = c['offshore_controls_cost'] # initial approximation 2002
+    out['controls_cost'] = ControlsCost2002 * esc['IPPI_CTL']
+
+    nacelleCovCost2002  = c['nacelle_cover_slope'] * machine_rating + (c['nacelle_cover_intercept'])
+    out['nacelle_cover_cost'] = nacelleCovCost2002 * esc['IPPI_NAC']
+
+    # aggregation of nacelle costs
+    partsCost = lss_cost + \
+                bearings_cost + \
+                gearbox_cost + \
+                hss_cost + \
+                generator_cost + \
+                out['mainframe_cost'] + \
+                yaw_system_cost + \
+                out['econnections_cost'] + \
+                out['vspd_etronics_cost'] + \
+                out['hydr_cooling_cost'] + \
+                out['controls_cost'] + \
+                out['nacelle_cover_cost']
+
+    out['cost'] = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
+
+    return out
+
+def nacelle_system_cost_jacobian(lss_cost, bearings_cost, gearbox_cost, hss_cost, generator_cost, bedplate_cost, \
+                                 bedplateCost2002, yaw_system_cost, bedplate_mass, machine_rating, esc, \
+                                 crane=False, offshore=False, assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                                 profitMultiplier=0.0, transportMultiplier=0.0, coefficients=None):
+    '''
+    Columns are bedplate_mass, bedplateCost2002, bedplate_cost, lss_cost, bearings_cost,
+    gearbox_cost, hss_cost, generator_cost, yaw_system_cost and machine_rating.
+    '''
+
+    c = coefficient_table(coefficients)
+    k = cost_multiplier(assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+
+    d_cost_d_bedplate_mass = k * esc['IPPI_MFM'] * c['platforms_coeff'] * 0.125
+    d_cost_d_bedplate2002 = k * esc['IPPI_MFM'] * c['base_hardware_fraction']
+    d_cost_d_rating = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier) * \
+                       (esc['IPPI_ELC'] * c['econnections_coeff'] + esc['IPPI_VSE'] * c['vspd_etronics_coeff'] + \
+                        esc['IPPI_HYD'] * c['hydr_cooling_coeff'] + esc['IPPI_NAC'] * c['nacelle_cover_slope']))
+
+    J = zero_jacobian(1, 10, bedplate_mass, machine_rating, d_cost_d_bedplate_mass, d_cost_d_bedplate2002, d_cost_d_rating)
+    J[..., 0, 0] = d_cost_d_bedplate_mass
+    J[..., 0, 1] = d_cost_d_bedplate2002
+    J[..., 0, 2:9] = k
+    J[..., 0, 9] = d_cost_d_rating
+
+    return J
+
+#-------------------------------------------------------------------------------
+# Tower components
+
+def tower_cost2002(tower_mass, coefficients=None):
+    '''
+    TowerCost: tower cost in 2002 USD.
+    '''
+
+    twrCostCoeff      = coefficient_table(coefficients)['tower_coeff'] # $/kg
+
+    return tower_mass * twrCostCoeff
+
+def tower_cost(tower_mass, esc, coefficients=None):
+    '''
+    TowerCost: tower cost.
+    '''
+
+    return tower_cost2002(tower_mass, coefficients) * esc['IPPI_TWR']
+
+def tower_cost_jacobian(tower_mass, esc, coefficients=None):
+
+    c = coefficient_table(coefficients)
+    J = zero_jacobian(1, 1, tower_mass, esc['IPPI_TWR'], c['tower_coeff'])
+    J[..., 0, 0] = esc['IPPI_TWR'] * c['tower_coeff']
+
+    return J
+
+def tower_system_cost(tower_cost, \
+                      assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0):
+    '''
+    TowerCostAdder: tower system cost.
+    '''
+
+    partsCost = tower_cost
+
+    return (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
+
+def tower_system_cost_jacobian(tower_cost, \
+                               assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0):
+
+    J = zero_jacobian(1, 1, tower_cost, 0.0)
+    J[..., 0, 0] = cost_multiplier(assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+
+    return J
+
+#-------------------------------------------------------------------------------
+# Turbine
+
+def turbine_cost(rotor_cost, nacelle_cost, tower_cost, offshore=False, \
+                 assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0, \
+                 coefficients=None):
+    '''
+    TurbineCostAdder: turbine capital cost.
+    '''
+
+    partsCost = rotor_cost + nacelle_cost + tower_cost
+
+    cost = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
+    if offshore:
+        cost = cost * coefficient_table(coefficients)['offshore_factor']
+
+    return cost
+
+def turbine_cost_jacobian(rotor_cost, nacelle_cost, tower_cost, offshore=False, \
+                          assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, profitMultiplier=0.0, transportMultiplier=0.0, \
+                          coefficients=None):
+
+    d_cost_d_parts = cost_multiplier(assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+    if offshore:
+        d_cost_d_parts = d_cost_d_parts * coefficient_table(coefficients)['offshore_factor']
+
+    J = zero_jacobian(1, 3, rotor_cost, nacelle_cost, tower_cost, d_cost_d_parts)
+    J[..., 0, :] = d_cost_d_parts
+
+    return J
+
+#-------------------------------------------------------------------------------
+# Forward-mode counterparts of the Jacobian kernels (see dual.component_jacobian)
+
+def bedplate_costs(bedplate_mass, esc, coefficients=None):
+    '''
+    BedplateCost: cost and cost2002, the rows of bedplate_cost_jacobian.
+    '''
+
+    return {'cost' : bedplate_cost(bedplate_mass, esc, coefficients), \
+            'cost2002' : bedplate_cost2002(bedplate_mass, coefficients)}
+
+forward_jacobians.update({
+    blade_cost_jacobian : forward_jacobian(blade_cost, [0]),
+    hub_cost_jacobian : forward_jacobian(hub_cost, [0]),
+    pitch_system_cost_jacobian : forward_jacobian(pitch_system_cost, [0]),
+    spinner_cost_jacobian : forward_jacobian(spinner_cost, [0]),
+    hub_system_cost_jacobian : forward_jacobian(hub_system_cost, [0, 1, 2]),
+    rotor_cost_jacobian : forward_jacobian(rotor_cost, [0, 1]),
+    low_speed_shaft_cost_jacobian : forward_jacobian(low_speed_shaft_cost, [0]),
+    bearings_cost_jacobian : forward_jacobian(bearings_cost, [0, 1]),
+    gearbox_cost_jacobian : forward_jacobian(gearbox_cost, [0, 1]),
+    high_speed_side_cost_jacobian : forward_jacobian(high_speed_side_cost, [0]),
+    generator_cost_jacobian : forward_jacobian(generator_cost, [0, 1]),
+    bedplate_cost_jacobian : forward_jacobian(bedplate_costs, [0], ['cost', 'cost2002']),
+    yaw_system_cost_jacobian : forward_jacobian(yaw_system_cost, [0]),
+    nacelle_system_cost_jacobian : forward_jacobian(nacelle_system_cost, [8, 6, 5, 0, 1, 2, 3, 4, 7, 9], ['cost']),
+    tower_cost_jacobian : forward_jacobian(tower_cost, [0]),
+    tower_system_cost_jacobian : forward_jacobian(tower_system_cost, [0]),
+    turbine_cost_jacobian : forward_jacobian(turbine_cost, [0, 1, 2]),
+})
@@ -0,0 +1,443 @@
+"""
+dual.py
+
+Forward-mode derivatives of the cost kernels by dual-number evaluation.
+
+A Dual holds a value and its derivatives along n directions.  The value kernels
+of costsse_kernels and csm_kernels only use arithmetic, powers and the where and
+zeros_like helpers below, so passing Duals for their inputs returns Duals holding
+both the outputs and their directional derivatives.  Values may be NumPy arrays,
+in which case the derivatives carry one extra trailing axis of directions, so
+batches of designs are differentiated together.  A Dual2 also carries the second
+derivatives, giving Hessians of the kernels in the same way.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+#-------------------------------------------------------------------------------
+
+class Dual(object):
+    '''
+    Value with derivatives along n directions; deriv has shape value.shape + (n,).
+    '''
+
+    __slots__ = ('value', 'deriv')
+
+    # make NumPy arrays and scalars defer their arithmetic operators to Dual: NumPy 1.13
+    # and later honor __array_ufunc__, earlier versions only __array_priority__
+    __array_ufunc__ = None
+    __array_priority__ = 1000
+
+    def __init__(self, value, deriv):
+
+        self.value = np.asarray(value, dtype=np.float64)
+        self.deriv = np.asarray(deriv, dtype=np.float64)
+
+    @property
+    def shape(self):
+
+        return self.value.shape
+
+    def _constant(self, value):
+        '''
+        Dual of value, this Dual shifted by a constant, carrying its derivatives.
+        '''
+
+        return Dual(value, np.broadcast_to(self.deriv, np.shape(value) + self.deriv.shape[-1:]))
+
+    def __add__(self, other):
+
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.deriv + other.deriv)
+
+        return self._constant(self.value + other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.deriv - other.deriv)
+
+        return self._constant(self.value - other)
+
+    def __rsub__(self, other):
+
+        return (-self) + other
+
+    def __mul__(self, other):
+
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value, self.deriv * other.value[..., np.newaxis] + \
+                                                  other.deriv * self.value[..., np.newaxis])
+
+        other = np.asarray(other)
+        return Dual(self.value * other, self.deriv * other[..., np.newaxis])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+
+        if isinstance(other, Dual):
+            return Dual(self.value / other.value, (self.deriv * other.value[..., np.newaxis] - \
+                        other.deriv * self.value[..., np.newaxis]) / (other.value**2)[..., np.newaxis])
+
+        other = np.asarray(other, dtype=np.float64)
+        return Dual(self.value / other, self.deriv / other[..., np.newaxis])
+
+    def __rtruediv__(self, other):
+
+        value = other / self.value
+        return Dual(value, self.deriv * (-value / self.value)[..., np.newaxis])
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, other):
+
+        if isinstance(other, Dual):
+            value = self.value ** other.value
+            return Dual(value, self.deriv * (other.value * self.value ** (other.value - 1))[..., np.newaxis] + \
+                               other.deriv * (value * np.log(self.value))[..., np.newaxis])
+
+        other = np.asarray(other, dtype=np.float64)
+        return Dual(self.value ** other, self.deriv * (other * self.value ** (other - 1))[..., np.newaxis])
+
+    def __rpow__(self, other):
+
+        value = np.asarray(other, dtype=np.float64) ** self.value
+        return Dual(value, self.deriv * (value * np.log(other))[..., np.newaxis])
+
+    def __neg__(self):
+
+        return Dual(-self.value, -self.deriv)
+
+    def __pos__(self):
+
+        return self
+
+    def __repr__(self):
+
+        return 'Dual({0!r}, {1!r})'.format(self.value, self.deriv)
+
+class Dual2(Dual):
+    '''
+    Dual that also carries second derivatives; hess has shape value.shape + (n, n).
+    '''
+
+    __slots__ = ('hess',)
+
+    def __init__(self, value, deriv, hess):
+
+        super(Dual2, self).__init__(value, deriv)
+        self.hess = np.asarray(hess, dtype=np.float64)
+
+    def _constant(self, value):
+
+        n = self.deriv.shape[-1]
+        return Dual2(value, np.broadcast_to(self.deriv, np.shape(value) + (n,)), \
+                     np.broadcast_to(self.hess, np.shape(value) + (n, n)))
+
+    def _chain(self, value, d1, d2):
+        '''
+        Dual2 of phi(self) given value = phi, d1 = phi' and d2 = phi'' at self.value.
+        '''
+
+        d1 = np.asarray(d1)[..., np.newaxis]
+        d2 = np.asarray(d2)[..., np.newaxis, np.newaxis]
+        g = self.deriv
+
+        return Dual2(value, g * d1, self.hess * d1[..., np.newaxis] + \
+                                    d2 * g[..., :, np.newaxis] * g[..., np.newaxis, :])
+
+    def _reciprocal(self):
+
+        value = 1.0 / self.value
+        return self._chain(value, -value**2, 2 * value**3)
+
+    def _log(self):
+
+        value = 1.0 / self.value
+        return self._chain(np.log(self.value), value, -value**2)
+
+    def _exp(self):
+
+        value = np.exp(self.value)
+        return self._chain(value, value, value)
+
+    def __add__(self, other):
+
+        if isinstance(other, Dual2):
+            return Dual2(self.value + other.value, self.deriv + other.deriv, self.hess + other.hess)
+
+        return self._constant(self.value + other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+
+        return self + (-other)
+
+    def __rsub__(self, other):
+
+        return (-self) + other
+
+    def __mul__(self, other):
+
+        if isinstance(other, Dual2):
+            a = self.value[..., np.newaxis]
+            b = other.value[..., np.newaxis]
+            cross = self.deriv[..., :, np.newaxis] * other.deriv[..., np.newaxis, :]
+            return Dual2(self.value * other.value, self.deriv * b + other.deriv * a, \
+                         self.hess * b[..., np.newaxis] + other.hess * a[..., np.newaxis] + \
+                         cross + np.swapaxes(cross, -1, -2))
+
+        other = np.asarray(other)
+        return Dual2(self.value * other, self.deriv * other[..., np.newaxis], \
+                     self.hess * other[..., np.newaxis, np.newaxis])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+
+        if isinstance(other, Dual2):
+            return self * other._reciprocal()
+
+        return self * (1.0 / np.asarray(other, dtype=np.float64))
+
+    def __rtruediv__(self, other):
+
+        return self._reciprocal() * other
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, other):
+
+        if isinstance(other, Dual2):
+            return (other * self._log())._exp()
+
+        p = np.asarray(other, dtype=np.float64)
+        return self._chain(self.value ** p, p * self.value ** (p - 1), p * (p - 1) * self.value ** (p - 2))
+
+    def __rpow__(self, other):
+
+        value = np.asarray(other, dtype=np.float64) ** self.value
+        log = np.log(other)
+        return self._chain(value, value * log, value * log**2)
+
+    def __neg__(self):
+
+        return Dual2(-self.value, -self.deriv, -self.hess)
+
+    def __repr__(self):
+
+        return 'Dual2({0!r}, {1!r}, {2!r})'.format(self.value, self.deriv, self.hess)
+
+def seed(value, index, n, order=1):
+    '''
+    Dual of value with unit derivative along direction index of n, or a Dual2 with
+    zero second derivatives for order=2.
+    '''
+
+    value = np.asarray(value, dtype=np.float64)
+    deriv = np.zeros(value.shape + (n,))
+    deriv[..., index] = 1.0
+
+    if order == 2:
+        return Dual2(value, deriv, np.zeros(value.shape + (n, n)))
+
+    return Dual(value, deriv)
+
+def where(condition, x, y):
+    '''
+    np.where for values that may be Duals.
+    '''
+
+    if not isinstance(x, Dual) and not isinstance(y, Dual):
+        return np.where(condition, x, y)
+
+    n = (x if isinstance(x, Dual) else y).deriv.shape[-1]
+    condition = np.asarray(condition)
+    value = np.where(condition, getattr(x, 'value', x), getattr(y, 'value', y))
+    deriv = np.where(condition[..., np.newaxis], derivative(x, n), derivative(y, n))
+
+    if isinstance(x, Dual2) or isinstance(y, Dual2):
+        return Dual2(value, deriv, np.where(condition[..., np.newaxis, np.newaxis], hessian(x, n), hessian(y, n)))
+
+    return Dual(value, deriv)
+
+def zeros_like(x):
+    '''
+    np.zeros_like for values that may be Duals; the zeros carry no derivatives.
+    '''
+
+    if isinstance(x, Dual):
+        x = x.value
+
+    return np.zeros_like(x, dtype=np.float64)
+
+def derivative(x, n):
+    '''
+    Derivatives of x along n directions, zero when x does not depend on the seeded inputs.
+    '''
+
+    if isinstance(x, Dual):
+        return x.deriv
+
+    return np.zeros(np.shape(x) + (n,))
+
+def hessian(x, n):
+    '''
+    Second derivatives of x along n directions, zero when x is not a Dual2.
+    '''
+
+    if isinstance(x, Dual2):
+        return x.hess
+
+    return np.zeros(np.shape(x) + (n, n))
+
+#-------------------------------------------------------------------------------
+
+def forward_mode(kernel, inputs, outputs=None):
+    '''
+    Function with the signature of kernel returning its outputs and their Jacobian
+    with respect to the positional arguments listed in inputs, in a single
+    dual-number evaluation.  outputs names the entries of the dictionary returned
+    by kernel giving the Jacobian rows, or is None for kernels returning one value.
+    The Jacobian has shape (..., n_outputs, len(inputs)).
+    '''
+
+    def evaluate(*args, **kwargs):
+
+        args = list(args)
+        for k, i in enumerate(inputs):
+            args[i] = seed(args[i], k, len(inputs))
+
+        out = kernel(*args, **kwargs)
+        if outputs is None:
+            rows = [out]
+            value = out.value if isinstance(out, Dual) else out
+        else:
+            rows = [out[name] for name in outputs]
+            value = dict((name, x.value if isinstance(x, Dual) else x) for name, x in out.items())
+
+        derivs = [derivative(row, len(inputs)) for row in rows]
+        J = np.zeros(np.broadcast(*[d[..., 0] for d in derivs]).shape + (len(rows), len(inputs)))
+        for r, d in enumerate(derivs):
+            J[..., r, :] = d
+
+        return value, J
+
+    return evaluate
+
+def forward_jacobian(kernel, inputs, outputs=None, pattern=None):
+    '''
+    Forward-mode counterpart of a hand-written Jacobian kernel: a function with the
+    signature of kernel returning only the Jacobian of forward_mode, or its entries
+    in a JacobianPattern when pattern is given.
+    '''
+
+    evaluate = forward_mode(kernel, inputs, outputs)
+
+    def jacobian(*args, **kwargs):
+
+        J = evaluate(*args, **kwargs)[1]
+        if pattern is not None:
+            return J[..., pattern.rows, pattern.cols]
+
+        return J
+
+    jacobian.__name__ = kernel.__name__ + '_forward_jacobian'
+
+    return jacobian
+
+def second_order_mode(kernel, inputs, outputs=None):
+    '''
+    forward_mode that also returns the Hessian of every output: a function with the
+    signature of kernel returning (value, J, H), with H of shape
+    (..., n_outputs, len(inputs), len(inputs)), from a single Dual2 evaluation.
+    '''
+
+    def evaluate(*args, **kwargs):
+
+        n = len(inputs)
+        args = list(args)
+        for k, i in enumerate(inputs):
+            args[i] = seed(args[i], k, n, order=2)
+
+        out = kernel(*args, **kwargs)
+        if outputs is None:
+            rows = [out]
+            value = out.value if isinstance(out, Dual) else out
+        else:
+            rows = [out[name] for name in outputs]
+            value = dict((name, x.value if isinstance(x, Dual) else x) for name, x in out.items())
+
+        shape = np.broadcast(*[derivative(row, n)[..., 0] for row in rows]).shape
+        J = np.zeros(shape + (len(rows), n))
+        H = np.zeros(shape + (len(rows), n, n))
+        for r, row in enumerate(rows):
+            J[..., r, :] = derivative(row, n)
+            H[..., r, :, :] = hessian(row, n)
+
+        return value, J, H
+
+    return evaluate
+
+def forward_hessian(kernel, inputs, outputs=None):
+    '''
+    Function with the signature of kernel returning only the Hessian of second_order_mode.
+    '''
+
+    evaluate = second_order_mode(kernel, inputs, outputs)
+
+    def hessian(*args, **kwargs):
+
+        return evaluate(*args, **kwargs)[2]
+
+    hessian.__name__ = kernel.__name__ + '_hessian'
+
+    return hessian
+
+#-------------------------------------------------------------------------------
+
+# forward-mode counterpart of each hand-written Jacobian kernel, filled in by the kernel modules
+forward_jacobians = {}
+
+def component_jacobian(component, jacobian):
+    '''
+    Jacobian kernel a component uses: the hand-written jacobian, or its forward-mode
+    counterpart when the component's EvaluationContext asks for derivatives='dual'.
+    '''
+
+    context = getattr(component, 'context', None)
+    if context is not None and context.derivatives == 'dual':
+        return forward_jacobians[jacobian]
+
+    return jacobian
+
+def defer_jacobian(component, jacobian, *args):
+    '''
+    Record the Jacobian kernel of a component and its arguments at the current inputs
+    instead of evaluating it, so that an execute only pays for the outputs.  Components
+    call it at the end of execute; the derivatives are evaluated by deferred_jacobian
+    when provideJ asks for them.
+    '''
+
+    component._jacobian_call = (jacobian, args)
+    component._jacobian = None
+
+def deferred_jacobian(component):
+    '''
+    Result of the Jacobian kernel recorded by defer_jacobian in the component's last
+    execute, evaluated on the first request and reused until the next execute.
+    '''
+
+    if component._jacobian is None:
+        jacobian, args = component._jacobian_call
+        component._jacobian = jacobian(*args)
+
+    return component._jacobian
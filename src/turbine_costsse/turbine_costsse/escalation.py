@@ -0,0 +1,380 @@
+"""
+escalation.py
+
+Evaluation contexts and cached PPI escalators shared by the Turbine_CostsSE and NREL CSM
+cost components.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+from collections import OrderedDict
+import copy
+import threading
+import numpy as np
+
+# PPI indices used by the cost components in this package
+escalator_codes = ['IPPI_BLL', 'IPPI_BLD', 'IPPI_BLA', 'IPPI_HUB', 'IPPI_PMB', 'IPPI_NAC', 'IPPI_LSS', 'IPPI_BRN', \
+                   'IPPI_GRB', 'IPPI_BRK', 'IPPI_GEN', 'IPPI_MFM', 'IPPI_YAW', 'IPPI_VSE', 'IPPI_HYD', 'IPPI_ELC', \
+                   'IPPI_CTL', 'IPPI_TWR']
+
+# indices escalated from a different reference year (advanced blade materials, see BladeCost)
+ref_yr_overrides = {'IPPI_BLA' : 2003}
+
+def commonse_config():
+    '''
+    The commonse.config module.  Importing it parses the PPI tables, so it is only
+    loaded once escalators are first needed rather than when this module is imported.
+    '''
+
+    import commonse.config
+    return commonse.config
+
+def config_dates():
+    '''
+    commonse.config reference and target dates; read, never written.
+    '''
+
+    config = commonse_config()
+    return {'ref_yr' : config.ref_yr, 'ref_mon' : config.ref_mon, 'curr_yr' : config.curr_yr, 'curr_mon' : config.curr_mon}
+
+#-------------------------------------------------------------------------------
+class EscalatorSnapshot(object):
+    '''
+    Immutable set of PPI escalators for one (ref_yr, ref_mon, curr_yr, curr_mon) date pair.
+
+    Every index in escalator_codes is resolved once on construction from a private copy of
+    the PPI tables; lookups afterwards are plain dictionary reads.
+    '''
+
+    __slots__ = ('key', '_values')
+
+    def __init__(self, ref_yr, ref_mon, curr_yr, curr_mon, source=None):
+
+        if source is None:
+            source = commonse_config().ppi
+
+        calc = copy.copy(source)
+        calc.ref_mon = ref_mon
+        calc.curr_yr = curr_yr
+        calc.curr_mon = curr_mon
+
+        values = {}
+        for code in escalator_codes:
+            calc.ref_yr = ref_yr_overrides.get(code, ref_yr)
+            values[code] = calc.compute(code)
+
+        object.__setattr__(self, 'key', (ref_yr, ref_mon, curr_yr, curr_mon))
+        object.__setattr__(self, '_values', values)
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError('EscalatorSnapshot is immutable')
+
+    def __getstate__(self):
+
+        return (self.key, self._values)
+
+    def __setstate__(self, state):
+
+        object.__setattr__(self, 'key', state[0])
+        object.__setattr__(self, '_values', state[1])
+
+    def __getitem__(self, code):
+
+        return self._values[code]
+
+    def compute(self, code):
+        '''
+        Escalator for a PPI index, mirroring ppi.compute.
+        '''
+
+        return self._values[code]
+
+    def as_dict(self):
+
+        return dict(self._values)
+
+#-------------------------------------------------------------------------------
+class EscalatorCache(object):
+    '''
+    Bounded least-recently-used cache of EscalatorSnapshot objects, keyed by date pair
+    and escalator source.
+    '''
+
+    def __init__(self, maxsize=128):
+
+        self.maxsize = maxsize
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ref_yr, ref_mon, curr_yr, curr_mon, source=None):
+
+        key = (ref_yr, ref_mon, curr_yr, curr_mon, source)
+
+        with self._lock:
+            snapshot = self._snapshots.pop(key, None)
+            if snapshot is not None:
+                self._snapshots[key] = snapshot
+                return snapshot
+
+        snapshot = EscalatorSnapshot(ref_yr, ref_mon, curr_yr, curr_mon, source)
+
+        with self._lock:
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
+
+        return snapshot
+
+    def clear(self):
+
+        with self._lock:
+            self._snapshots.clear()
+
+    def __len__(self):
+
+        return len(self._snapshots)
+
+#-------------------------------------------------------------------------------
+class EscalationTable(object):
+    '''
+    Dense table of PPI escalators for every index in escalator_codes and every month
+    from January of first_yr through December of last_yr, referenced to (ref_yr, ref_mon).
+
+    values is a read-only float64 array of shape (len(codes), 12 * (last_yr - first_yr + 1));
+    column k holds the escalators for month k counted from January of first_yr.
+    '''
+
+    def __init__(self, first_yr, last_yr, ref_yr, ref_mon, source=None):
+
+        if last_yr < first_yr:
+            raise ValueError('last_yr must not precede first_yr')
+
+        self.codes = tuple(escalator_codes)
+        self.code_index = dict((code, i) for i, code in enumerate(self.codes))
+        self.first_yr = first_yr
+        self.last_yr = last_yr
+        self.ref_yr = ref_yr
+        self.ref_mon = ref_mon
+
+        n_months = 12 * (last_yr - first_yr + 1)
+        self.values = np.empty((len(self.codes), n_months), dtype=np.float64)
+        for k in xrange(n_months):
+            snapshot = EscalatorSnapshot(ref_yr, ref_mon, first_yr + k // 12, k % 12 + 1, source)
+            self.values[:, k] = [snapshot[code] for code in self.codes]
+        self.values.setflags(write=False)
+
+    def covers(self, yr_min, yr_max):
+
+        return self.first_yr <= yr_min and yr_max <= self.last_yr
+
+    def month_index(self, yr, mon):
+        '''
+        Column index for a year and month, or an integer array of them for date arrays.
+        '''
+
+        yr = np.asarray(yr)
+        mon = np.asarray(mon)
+        if np.any(mon < 1) or np.any(mon > 12):
+            raise ValueError('month must be between 1 and 12')
+        if np.any(yr < self.first_yr) or np.any(yr > self.last_yr):
+            raise ValueError('year outside escalation table range {0}-{1}'.format(self.first_yr, self.last_yr))
+
+        return (yr.astype(np.intp) - self.first_yr) * 12 + (mon.astype(np.intp) - 1)
+
+    def lookup(self, code, yr, mon):
+        '''
+        Escalator for one PPI index at one year and month.
+        '''
+
+        return self.values[self.code_index[code], self.month_index(yr, mon)]
+
+    def gather(self, yr, mon):
+        '''
+        Escalators for every index at an array of dates in one indexing operation.
+        Returns a dictionary mapping each PPI index to an array shaped like the
+        broadcast of yr and mon, so it can stand in for an EscalatorSnapshot.
+        '''
+
+        block = self.values[:, self.month_index(yr, mon)]
+
+        return dict((code, block[i]) for i, code in enumerate(self.codes))
+
+#-------------------------------------------------------------------------------
+class EvaluationContext(object):
+    '''
+    Immutable settings for one cost evaluation: the PPI reference date, the target date
+    and the escalator source (a commonse PPI object, commonse.config.ppi when None).
+    Dates not given default to those in commonse.config, which is read when they are
+    first used.
+
+    Components take their target date from their own year and month inputs and the
+    reference date and source from the context assigned to them with set_context, so
+    evaluations with different contexts can run side by side in separate threads.
+    derivatives selects the Jacobian kernels the components provide: the hand-written
+    ones ('analytic') or their forward-mode dual-number counterparts ('dual').
+    '''
+
+    __slots__ = ('_dates', 'source', 'derivatives')
+
+    date_names = ('ref_yr', 'ref_mon', 'curr_yr', 'curr_mon')
+
+    def __init__(self, ref_yr=None, ref_mon=None, curr_yr=None, curr_mon=None, source=None, derivatives='analytic'):
+
+        if derivatives not in ('analytic', 'dual'):
+            raise ValueError("derivatives must be 'analytic' or 'dual', not {0!r}".format(derivatives))
+
+        object.__setattr__(self, '_dates', (ref_yr, ref_mon, curr_yr, curr_mon))
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'derivatives', derivatives)
+
+    def _date(self, index):
+
+        value = self._dates[index]
+        if value is None:
+            value = config_dates()[self.date_names[index]]
+
+        return value
+
+    ref_yr = property(lambda self: self._date(0), doc='PPI reference year')
+    ref_mon = property(lambda self: self._date(1), doc='PPI reference month')
+    curr_yr = property(lambda self: self._date(2), doc='target year')
+    curr_mon = property(lambda self: self._date(3), doc='target month')
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError('EvaluationContext is immutable')
+
+    def __reduce__(self):
+
+        # dates left to commonse.config stay unresolved, so worker processes read their own
+        return (EvaluationContext, self._dates + (self.source, self.derivatives))
+
+    def __eq__(self, other):
+
+        return isinstance(other, EvaluationContext) and self.key() == other.key()
+
+    def __ne__(self, other):
+
+        return not self == other
+
+    def __hash__(self):
+
+        return hash(self.key())
+
+    def __repr__(self):
+
+        return 'EvaluationContext(ref_yr={0}, ref_mon={1}, curr_yr={2}, curr_mon={3}, derivatives={4!r})'.format( \
+                   self.ref_yr, self.ref_mon, self.curr_yr, self.curr_mon, self.derivatives)
+
+    def key(self):
+
+        return (self.ref_yr, self.ref_mon, self.curr_yr, self.curr_mon, self.source, self.derivatives)
+
+    def at(self, curr_yr, curr_mon):
+        '''
+        Copy of this context with a different target date.
+        '''
+
+        return EvaluationContext(self.ref_yr, self.ref_mon, curr_yr, curr_mon, self.source, self.derivatives)
+
+    def escalators(self, curr_yr=None, curr_mon=None):
+        '''
+        Shared EscalatorSnapshot for the target date, or for curr_yr and curr_mon when given.
+        '''
+
+        if curr_yr is None:
+            curr_yr = self.curr_yr
+        if curr_mon is None:
+            curr_mon = self.curr_mon
+
+        return escalator_cache.get(self.ref_yr, self.ref_mon, curr_yr, curr_mon, self.source)
+
+#-------------------------------------------------------------------------------
+
+# cache shared by every component and batch evaluation
+escalator_cache = EscalatorCache()
+
+# context used by components and batch evaluations that have none assigned
+default_context = EvaluationContext()
+
+# dense tables shared by the batch engines, one per reference date and source
+_escalation_tables = {}
+_escalation_tables_lock = threading.Lock()
+
+def escalator_snapshot(curr_yr, curr_mon, ref_yr=None, ref_mon=None):
+    '''
+    Shared EscalatorSnapshot for a target year and month.  The reference date defaults
+    to the one in commonse.config.
+    '''
+
+    return EvaluationContext(ref_yr, ref_mon).escalators(curr_yr, curr_mon)
+
+def escalation_table(first_yr=None, last_yr=None, context=None):
+    '''
+    Shared EscalationTable for the reference date and source of context covering at
+    least first_yr through last_yr.  The year range defaults to the context reference
+    year through its target year; the shared table is rebuilt over a wider range when
+    a request falls outside it.
+    '''
+
+    if context is None:
+        context = default_context
+    if first_yr is None:
+        first_yr = context.ref_yr
+    if last_yr is None:
+        last_yr = context.curr_yr
+
+    key = (context.ref_yr, context.ref_mon, context.source)
+
+    with _escalation_tables_lock:
+        table = _escalation_tables.get(key)
+        if table is None or not table.covers(first_yr, last_yr):
+            if table is not None:
+                first_yr = min(first_yr, table.first_yr)
+                last_yr = max(last_yr, table.last_yr)
+            table = EscalationTable(first_yr, last_yr, context.ref_yr, context.ref_mon, context.source)
+            _escalation_tables[key] = table
+
+    return table
+
+def escalators(curr_yr, curr_mon, context=None):
+    '''
+    Escalators for a target date or for arrays of target dates under context.  Scalar
+    dates return the shared EscalatorSnapshot; date arrays are gathered from the shared
+    EscalationTable and return a dictionary of escalator arrays shaped like the broadcast
+    of curr_yr and curr_mon.
+    '''
+
+    if context is None:
+        context = default_context
+
+    if np.ndim(curr_yr) == 0 and np.ndim(curr_mon) == 0:
+        return context.escalators(curr_yr, curr_mon)
+
+    yr = np.asarray(curr_yr)
+    years = [int(yr.min()), int(yr.max())] if yr.size else []
+    table = escalation_table(min(years + [context.ref_yr]), max(years + [context.curr_yr]), context)
+
+    return table.gather(curr_yr, curr_mon)
+
+def set_context(obj, context):
+    '''
+    Assign an EvaluationContext to a component, or to an assembly and every component in it.
+    '''
+
+    obj.context = context
+    if hasattr(obj, 'list_components'):
+        for name in obj.list_components():
+            set_context(getattr(obj, name), context)
+
+def component_escalators(component):
+    '''
+    Escalators for a component's year and month inputs under its assigned context.
+    '''
+
+    context = getattr(component, 'context', None)
+    if context is None:
+        context = default_context
+
+    return context.escalators(component.year, component.month)
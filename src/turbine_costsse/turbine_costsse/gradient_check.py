@@ -0,0 +1,276 @@
+"""
+gradient_check.py
+
+Vectorized verification of the analytic Jacobians of Turbine_CostsSE.
+
+Each GradientCase pairs a value kernel with the Jacobian kernel a component or
+assembly provides and a set of random design points.  The reference derivatives
+are taken at every point at once, by complex step where the value kernel accepts
+complex inputs and by central differences otherwise, and each Jacobian entry is
+reported with its worst-case relative error over the design points.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from escalation import escalators
+from costsse_kernels import blade_cost, blade_cost_jacobian, hub_cost, hub_cost_jacobian, pitch_system_cost, \
+     pitch_system_cost_jacobian, spinner_cost, spinner_cost_jacobian, hub_system_cost, hub_system_cost_jacobian, \
+     rotor_cost, rotor_cost_jacobian, low_speed_shaft_cost, low_speed_shaft_cost_jacobian, bearings_cost, \
+     bearings_cost_jacobian, gearbox_cost, gearbox_cost_jacobian, high_speed_side_cost, \
+     high_speed_side_cost_jacobian, generator_cost, generator_cost_jacobian, bedplate_costs, \
+     bedplate_cost_jacobian, yaw_system_cost, yaw_system_cost_jacobian, nacelle_system_cost, \
+     nacelle_system_cost_jacobian, tower_cost, tower_cost_jacobian, tower_system_cost, \
+     tower_system_cost_jacobian, turbine_cost, turbine_cost_jacobian
+from turbine_costsse_batch import turbine_costsse_batch, turbine_costsse_batch_jacobian, turbine_cost_gradient, \
+     jacobian_inputs, jacobian_outputs
+
+#-------------------------------------------------------------------------------
+
+class GradientCase(object):
+    '''
+    Jacobian kernel to verify against its value kernel.
+
+    value(*args, **kwargs) returns a single output, or a dictionary from which the
+    outputs rows are taken, and jacobian(*args, **kwargs) the derivatives of those
+    outputs with respect to the positional arguments listed in inputs, shaped
+    (..., len(outputs), len(inputs)).  method is 'complex' (complex step) or
+    'central' (central differences) for value kernels that only take real inputs.
+    '''
+
+    def __init__(self, name, value, jacobian, args, inputs, outputs=None, kwargs=None, method='complex', \
+                 input_names=None):
+
+        self.name = name
+        self.value = value
+        self.jacobian = jacobian
+        self.args = list(args)
+        self.inputs = list(inputs)
+        self.outputs = outputs
+        self.kwargs = kwargs or {}
+        self.method = method
+        self.input_names = input_names or ['arg{0}'.format(i) for i in self.inputs]
+
+    def rows(self, *args):
+        '''
+        Output rows of the value kernel at args.
+        '''
+
+        out = self.value(*args, **self.kwargs)
+        if self.outputs is None:
+            return [out]
+
+        return [out[name] for name in self.outputs]
+
+    def output_names(self):
+
+        return list(self.outputs) if self.outputs is not None else ['value']
+
+def complex_step_jacobian(case, step=1e-30):
+    '''
+    Complex-step derivatives of case at every design point, shaped (..., n_outputs, n_inputs).
+    '''
+
+    J = None
+    for j, i in enumerate(case.inputs):
+        args = list(case.args)
+        args[i] = np.asarray(args[i]) + 1j * step
+        rows = case.rows(*args)
+        if J is None:
+            J = np.zeros(np.broadcast(*rows).shape + (len(rows), len(case.inputs)))
+        for r, row in enumerate(rows):
+            J[..., r, j] = np.imag(row) / step
+
+    return J
+
+def central_difference_jacobian(case, relative_step=1e-6):
+    '''
+    Central-difference derivatives of case at every design point, with steps relative to each input.
+    '''
+
+    J = None
+    for j, i in enumerate(case.inputs):
+        x = np.asarray(case.args[i], dtype=np.float64)
+        step = relative_step * np.maximum(np.abs(x), 1.0)
+        args = list(case.args)
+        args[i] = x + step
+        plus = case.rows(*args)
+        args[i] = x - step
+        minus = case.rows(*args)
+        if J is None:
+            J = np.zeros(np.broadcast(*plus).shape + (len(plus), len(case.inputs)))
+        for r in range(len(plus)):
+            J[..., r, j] = (plus[r] - minus[r]) / (2 * step)
+
+    return J
+
+def relative_error(J, J_ref, atol=0.0):
+    '''
+    |J - J_ref| relative to the larger of |J| and |J_ref|; differences up to atol count as zero.
+    '''
+
+    difference = np.abs(J - J_ref)
+    scale = np.maximum(np.abs(J), np.abs(J_ref))
+
+    return np.where(difference <= atol, 0.0, difference / np.where(scale > 0, scale, 1.0))
+
+def check_gradient(case, atol=0.0):
+    '''
+    Verify case at all of its design points.  Returns a dictionary holding the
+    worst-case relative error of each Jacobian entry (max_error, shaped
+    (n_outputs, n_inputs)), the design point where it occurs (worst_point) and the
+    number of design points.
+    '''
+
+    J = np.asarray(case.jacobian(*case.args, **case.kwargs))
+    if case.method == 'complex':
+        J_ref = complex_step_jacobian(case)
+    else:
+        J_ref = central_difference_jacobian(case)
+
+    J, J_ref = np.broadcast_arrays(J, J_ref)
+    error = relative_error(J, J_ref, atol).reshape((-1,) + J.shape[-2:])
+
+    return {'name' : case.name, 'method' : case.method, 'outputs' : case.output_names(), \
+            'inputs' : case.input_names, 'max_error' : error.max(axis=0), 'worst_point' : error.argmax(axis=0), \
+            'points' : error.shape[0]}
+
+def check_gradients(cases, atol=0.0):
+    '''
+    check_gradient of every case.
+    '''
+
+    return [check_gradient(case, atol) for case in cases]
+
+def format_report(reports):
+    '''
+    One line per case with its worst Jacobian entry and error.
+    '''
+
+    lines = []
+    for report in reports:
+        r, c = np.unravel_index(np.argmax(report['max_error']), report['max_error'].shape)
+        lines.append('{0:36s} {1:8s} {2:6d} points  worst d({3})/d({4}) {5:.2e}'.format(report['name'], \
+                     report['method'], report['points'], report['outputs'][r], report['inputs'][c], \
+                     report['max_error'][r, c]))
+
+    return '\n'.join(lines)
+
+#-------------------------------------------------------------------------------
+
+# NREL 5 MW Reference Turbine masses in jacobian_inputs order
+reference_masses = np.array([17650.67, 31644.5, 17004.0, 1810.5, 31257.3, 9731.41 / 2, 9731.41 / 2, 30237.60, \
+                             1492.45, 16699.85, 93090.6, 11878.24, 434559.0, 5000.0])
+
+def random_designs(n=2000, seed=0, spread=0.5):
+    '''
+    n random designs as a dictionary of input arrays: every mass and machine_rating
+    scaled by independent factors within 1 +/- spread of the reference turbine and
+    target dates between 2003 and 2012.
+    '''
+
+    random = np.random.RandomState(seed)
+
+    designs = dict((name, reference_masses[i] * random.uniform(1 - spread, 1 + spread, n)) \
+                   for i, name in enumerate(jacobian_inputs))
+    designs['year'] = random.randint(2003, 2013, n)
+    designs['month'] = random.randint(1, 13, n)
+
+    return designs
+
+def turbine_cost_gradient_jacobian(*args, **kwargs):
+    '''
+    turbine_cost_gradient as the single-row Jacobian of turbine_cost.
+    '''
+
+    return turbine_cost_gradient(*args, **kwargs)[1][..., np.newaxis, :]
+
+def costsse_cases(n=2000, seed=0):
+    '''
+    GradientCases of every Turbine_CostsSE component and of the Turbine_CostsSE
+    assembly (turbine_costsse_batch_jacobian) at n random designs.
+    '''
+
+    d = random_designs(n, seed)
+    esc = escalators(d['year'], d['month'])
+    random = np.random.RandomState(seed + 1)
+    costs = dict((name, random.uniform(1e5, 5e6, n)) for name in ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7'])
+    multipliers = dict(assemblyCostMultiplier=0.3, overheadCostMultiplier=0.1, profitMultiplier=0.2, \
+                       transportMultiplier=0.05)
+
+    cases = []
+    for advanced in [True, False]:
+        cases.append(GradientCase('BladeCost(advanced={0})'.format(advanced), blade_cost, blade_cost_jacobian, \
+                                  [d['blade_mass'], esc, advanced], [0], input_names=['blade_mass']))
+    cases += [GradientCase('HubCost', hub_cost, hub_cost_jacobian, [d['hub_mass'], esc], [0], input_names=['hub_mass']),
+              GradientCase('PitchSystemCost', pitch_system_cost, pitch_system_cost_jacobian, \
+                           [d['pitch_system_mass'], esc], [0], input_names=['pitch_system_mass']),
+              GradientCase('SpinnerCost', spinner_cost, spinner_cost_jacobian, [d['spinner_mass'], esc], [0], \
+                           input_names=['spinner_mass']),
+              GradientCase('HubSystemCostAdder', hub_system_cost, hub_system_cost_jacobian, \
+                           [costs['c0'], costs['c1'], costs['c2']], [0, 1, 2], kwargs=multipliers, \
+                           input_names=['hub_cost', 'pitch_system_cost', 'spinner_cost']),
+              GradientCase('RotorCostAdder', rotor_cost, rotor_cost_jacobian, [costs['c0'], costs['c1'], 3], [0, 1], \
+                           input_names=['blade_cost', 'hub_system_cost']),
+              GradientCase('LowSpeedShaftCost', low_speed_shaft_cost, low_speed_shaft_cost_jacobian, \
+                           [d['low_speed_shaft_mass'], esc], [0], input_names=['low_speed_shaft_mass']),
+              GradientCase('BearingsCost', bearings_cost, bearings_cost_jacobian, \
+                           [d['main_bearing_mass'], d['second_bearing_mass'], esc], [0, 1], \
+                           input_names=['main_bearing_mass', 'second_bearing_mass'])]
+    for drivetrain_design in ['geared', 'single_stage', 'multi_drive', 'pm_direct_drive']:
+        cases += [GradientCase('GearboxCost({0})'.format(drivetrain_design), gearbox_cost, gearbox_cost_jacobian, \
+                               [d['gearbox_mass'], d['machine_rating'], esc, drivetrain_design], [0, 1], \
+                               input_names=['gearbox_mass', 'machine_rating']),
+                  GradientCase('GeneratorCost({0})'.format(drivetrain_design), generator_cost, \
+                               generator_cost_jacobian, [d['generator_mass'], d['machine_rating'], esc, \
+                               drivetrain_design], [0, 1], input_names=['generator_mass', 'machine_rating'])]
+    cases += [GradientCase('HighSpeedSideCost', high_speed_side_cost, high_speed_side_cost_jacobian, \
+                           [d['high_speed_side_mass'], esc], [0], input_names=['high_speed_side_mass']),
+              GradientCase('BedplateCost', bedplate_costs, bedplate_cost_jacobian, [d['bedplate_mass'], esc], [0], \
+                           outputs=['cost', 'cost2002'], input_names=['bedplate_mass']),
+              GradientCase('YawSystemCost', yaw_system_cost, yaw_system_cost_jacobian, [d['yaw_system_mass'], esc], \
+                           [0], input_names=['yaw_system_mass'])]
+    for crane in [True, False]:
+        cases.append(GradientCase('NacelleSystemCostAdder(crane={0})'.format(crane), nacelle_system_cost, \
+                                  nacelle_system_cost_jacobian, [costs['c0'], costs['c1'], costs['c2'], costs['c3'], \
+                                  costs['c4'], costs['c5'], costs['c6'], costs['c7'], d['bedplate_mass'], \
+                                  d['machine_rating'], esc, crane, not crane], [8, 6, 5, 0, 1, 2, 3, 4, 7, 9], \
+                                  outputs=['cost'], kwargs=multipliers, \
+                                  input_names=['bedplate_mass', 'bedplateCost2002', 'bedplate_cost', 'lss_cost', \
+                                               'bearings_cost', 'gearbox_cost', 'hss_cost', 'generator_cost', \
+                                               'yaw_system_cost', 'machine_rating']))
+    cases += [GradientCase('TowerCost', tower_cost, tower_cost_jacobian, [d['tower_mass'], esc], [0], \
+                           input_names=['tower_mass']),
+              GradientCase('TowerCostAdder', tower_system_cost, tower_system_cost_jacobian, [costs['c0']], [0], \
+                           kwargs=multipliers, input_names=['tower_cost'])]
+    for offshore in [True, False]:
+        cases.append(GradientCase('TurbineCostAdder(offshore={0})'.format(offshore), turbine_cost, \
+                                  turbine_cost_jacobian, [costs['c0'], costs['c1'], costs['c2'], offshore], [0, 1, 2], \
+                                  kwargs=multipliers, input_names=['rotor_cost', 'nacelle_cost', 'tower_cost']))
+
+    # the assembly and its adjoint gradient; turbine_costsse_batch casts its inputs to float,
+    # so use central differences
+    for drivetrain_design in ['geared', 'pm_direct_drive']:
+        options = dict(drivetrain_design=drivetrain_design, crane=True, offshore=True, year=d['year'], month=d['month'])
+        cases += [GradientCase('Turbine_CostsSE({0})'.format(drivetrain_design), turbine_costsse_batch, \
+                               turbine_costsse_batch_jacobian, [d[name] for name in jacobian_inputs], \
+                               range(len(jacobian_inputs)), outputs=jacobian_outputs, kwargs=options, \
+                               method='central', input_names=jacobian_inputs),
+                  GradientCase('turbine_cost_gradient({0})'.format(drivetrain_design), turbine_costsse_batch, \
+                               turbine_cost_gradient_jacobian, [d[name] for name in jacobian_inputs], \
+                               range(len(jacobian_inputs)), outputs=['turbine_cost'], \
+                               kwargs=dict(options, **multipliers), method='central', input_names=jacobian_inputs)]
+
+    return cases
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    reports = check_gradients(costsse_cases())
+    print format_report(reports)
+
+if __name__ == "__main__":
+
+    example()
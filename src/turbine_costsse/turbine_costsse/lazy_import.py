@@ -0,0 +1,54 @@
+"""
+lazy_import.py
+
+Deferred loading of the OpenMDAO component modules of a package, so that the cost
+kernels, escalation and batch engines can be imported without OpenMDAO or fusedwind.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+    '''
+    Package module whose listed attributes are imported from their submodules on first access.
+    '''
+
+    def __init__(self, module, attributes):
+
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+
+        # the original module must stay alive, Python 2 clears the globals of collected modules
+        self._module = module
+        self._lazy_attributes = attributes
+
+    def __getattr__(self, name):
+
+        try:
+            submodule = self.__dict__['_lazy_attributes'][name]
+        except KeyError:
+            raise AttributeError("module '{0}' has no attribute '{1}'".format(self.__name__, name))
+
+        value = getattr(importlib.import_module(self.__name__ + '.' + submodule), name)
+        setattr(self, name, value)
+
+        return value
+
+    def __dir__(self):
+
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+def lazy_module(name, attributes):
+    '''
+    Replace package module name in sys.modules by a LazyModule.  attributes maps each
+    lazily loaded name to the submodule defining it.
+    '''
+
+    module = sys.modules[name]
+    if not isinstance(module, LazyModule):
+        module = sys.modules[name] = LazyModule(module, attributes)
+
+    return module
@@ -0,0 +1,393 @@
+"""
+memo.py
+
+Opt-in memoization of Turbine_CostsSE and tcc_csm_assembly evaluations, in memory
+(EvaluationMemo) or in an SQLite file shared by processes and runs (DiskMemo), and
+the changed-input tracking that lets the Turbine_CostsSE sub-assemblies skip runs.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+from collections import OrderedDict
+import cPickle as pickle
+import hashlib
+import importlib
+import inspect
+import os
+import sqlite3
+import threading
+
+from escalation import default_context
+
+#-------------------------------------------------------------------------------
+class EvaluationMemo(object):
+    '''
+    Bounded least-recently-used memo of assembly evaluations.
+
+    Entries are keyed by (input_key, name), name being 'state' for the component state
+    left by an execute (see assembly_state) or 'jacobian' for the assembly Jacobian, so
+    a design whose outputs are cached may still miss on its Jacobian.  hits, misses and evictions count the
+    lookups and the entries dropped to stay within maxsize.
+    '''
+
+    def __init__(self, maxsize=1024):
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, assembly, name):
+        '''
+        Key of the entry name at the current inputs of assembly.
+        '''
+
+        return (input_key(assembly, assembly.memo_inputs), name)
+
+    def get(self, key, default=None):
+
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._entries[key] = value
+            self.hits += 1
+
+            return value
+
+    def put(self, key, value):
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        '''
+        Counters and current size as a dictionary.
+        '''
+
+        with self._lock:
+            return {'hits' : self.hits, 'misses' : self.misses, 'evictions' : self.evictions, \
+                    'size' : len(self._entries), 'maxsize' : self.maxsize}
+
+    def clear(self):
+        '''
+        Drop every entry and reset the counters.
+        '''
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+
+        return len(self._entries)
+
+#-------------------------------------------------------------------------------
+
+def canonical_value(value):
+    '''
+    Canonical text of an input value: numbers (flags and integers included) as the
+    repr of their float value, so that 2009 and 2009.0 or True and 1 key alike, and
+    anything else, such as drivetrain_design, as its repr.
+    '''
+
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return repr(value)
+
+def input_items(assembly, names):
+    '''
+    (name, canonical value) of the inputs names of assembly, sorted by name.
+    '''
+
+    return [(name, canonical_value(getattr(assembly, name))) for name in sorted(names)]
+
+def assembly_context(assembly):
+    '''
+    EvaluationContext of assembly, default_context when it has none assigned.
+    '''
+
+    context = getattr(assembly, 'context', None)
+    if context is None:
+        context = default_context
+
+    return context
+
+def input_key(assembly, names):
+    '''
+    Canonical hash of the inputs names of assembly together with its EvaluationContext.
+    '''
+
+    # the escalator source is keyed by identity, it is not compared by value
+    ref_yr, ref_mon, curr_yr, curr_mon, source, derivatives = assembly_context(assembly).key()
+    items = input_items(assembly, names)
+    items.append(('context', (ref_yr, ref_mon, curr_yr, curr_mon, None if source is None else id(source), derivatives)))
+
+    return hashlib.sha1(repr(items)).hexdigest()
+
+def set_memo(assembly, memo):
+    '''
+    Assign an EvaluationMemo or DiskMemo to an assembly, or remove it with None.
+    Assemblies may share a memo.
+    '''
+
+    assembly.memo = memo
+
+def memoized(assembly, name, compute):
+    '''
+    compute() at the current inputs of assembly, looked up in and added to its memo
+    when it has one.  The assembly lists its inputs in memo_inputs.
+    '''
+
+    memo = getattr(assembly, 'memo', None)
+    if memo is None:
+        return compute()
+
+    key = memo.key(assembly, name)
+    value = memo.get(key)
+    if value is None:
+        value = compute()
+        memo.put(key, value)
+
+    return value
+
+# attributes of a component recorded by assembly_state besides its outputs: the
+# deferred Jacobian (see dual.defer_jacobian) and the execute_if_changed state
+state_attributes = ['_jacobian_call', '_jacobian', '_tracked_state']
+
+def assembly_state(assembly):
+    '''
+    State left by an execute of assembly: for assembly and every component below it,
+    by dotted path ('' for assembly itself), its outputs without the framework
+    variables and the attributes in state_attributes it has.
+    '''
+
+    state = {}
+
+    def visit(path, component):
+        names = [name for name in component.list_outputs() if not component.get_metadata(name, 'framework_var')]
+        entry = {'outputs' : dict((name, getattr(component, name)) for name in names)}
+        for attribute in state_attributes:
+            if hasattr(component, attribute):
+                entry[attribute] = getattr(component, attribute)
+        state[path] = entry
+
+        if hasattr(component, 'list_components'):
+            for name in component.list_components():
+                if name != 'driver':
+                    visit(path + '.' + name if path else name, getattr(component, name))
+
+    visit('', assembly)
+
+    return state
+
+def restore_state(assembly, state):
+    '''
+    Set the outputs and attributes of assembly and its components recorded by assembly_state.
+    '''
+
+    for path, entry in state.items():
+        component = assembly
+        for name in path.split('.') if path else []:
+            component = getattr(component, name)
+
+        for name, value in entry['outputs'].items():
+            setattr(component, name, value)
+        for attribute in state_attributes:
+            if attribute in entry:
+                setattr(component, attribute, entry[attribute])
+
+def memoized_execute(assembly, execute):
+    '''
+    Execute assembly by running execute, its dataflow, unless its memo holds the state
+    of an execute at the current inputs, which is then restored without running the
+    components: every component gets the outputs and deferred Jacobian of that
+    execute, so that derivatives taken afterwards match the outputs.
+    '''
+
+    def run():
+
+        execute()
+        return assembly_state(assembly)
+
+    restore_state(assembly, memoized(assembly, 'state', run))
+
+def tracked_inputs(assembly):
+    '''
+    Names of the inputs of assembly compared by execute_if_changed: every input it
+    declares, without the framework variables OpenMDAO gives every component.
+    '''
+
+    names = getattr(assembly, '_tracked_inputs', None)
+    if names is None:
+        names = [name for name in assembly.list_inputs() if not assembly.get_metadata(name, 'framework_var')]
+        assembly._tracked_inputs = names
+
+    return names
+
+def execute_if_changed(assembly, execute):
+    '''
+    Execute assembly by running execute, its dataflow, only when one of its inputs
+    (see tracked_inputs) or its EvaluationContext changed since the last run.
+    Otherwise the outputs of that run stay and skipped_runs is incremented.
+    '''
+
+    state = (input_items(assembly, tracked_inputs(assembly)), assembly_context(assembly).key())
+    if state == getattr(assembly, '_tracked_state', None):
+        assembly.skipped_runs += 1
+        return
+
+    execute()
+    assembly._tracked_state = state
+
+#-------------------------------------------------------------------------------
+
+# modules holding the model coefficients, fingerprinted by DiskMemo
+kernel_modules = ['turbine_costsse.turbine_costsse.costsse_kernels', 'turbine_costsse.nrel_csm_tcc.csm_kernels']
+
+def model_fingerprint(modules=None):
+    '''
+    Hash of the source of the kernel modules, which changes with any model coefficient.
+    '''
+
+    digest = hashlib.sha1()
+    for name in modules or kernel_modules:
+        digest.update(inspect.getsource(importlib.import_module(name)))
+
+    return digest.hexdigest()
+
+class DiskMemo(object):
+    '''
+    Memo of assembly evaluations in an SQLite file that several processes may read and
+    write at once, with the get, put, stats and clear methods of EvaluationMemo.
+
+    Entries are keyed by the canonical inputs of the assembly together with the PPI
+    escalators of its target date and the model_fingerprint of the kernel modules, so
+    entries computed from other PPI tables or model coefficients are never returned;
+    prune deletes those of other model fingerprints.  Values that cannot be pickled are
+    not stored.  The file has no size bound, and evictions stays zero.
+    '''
+
+    def __init__(self, path, timeout=30.0):
+
+        self.path = path
+        self.timeout = timeout
+        self.fingerprint = model_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        '''
+        Connection of this process, reopened after a fork; the caller holds the lock.
+        '''
+
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS evaluations (key TEXT, name TEXT, model TEXT, value BLOB, '
+                                   'PRIMARY KEY (key, name))')
+            self._connection = connection
+            self._pid = os.getpid()
+
+        return self._connection
+
+    def key(self, assembly, name):
+        '''
+        Key of the entry name at the current inputs of assembly.
+        '''
+
+        context = assembly_context(assembly)
+        ref_yr, ref_mon, curr_yr, curr_mon, source, derivatives = context.key()
+        esc = context.escalators(assembly.year, assembly.month).as_dict()
+
+        items = input_items(assembly, assembly.memo_inputs)
+        items.append(('context', (ref_yr, ref_mon, derivatives)))
+        items.append(('escalators', sorted((code, repr(value)) for code, value in esc.items())))
+        items.append(('model', self.fingerprint))
+
+        return (hashlib.sha1(repr(items)).hexdigest(), name)
+
+    def get(self, key, default=None):
+
+        with self._lock:
+            row = self._connect().execute('SELECT value FROM evaluations WHERE key = ? AND name = ?', key).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+
+        return pickle.loads(str(row[0]))
+
+    def put(self, key, value):
+
+        try:
+            data = sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError):
+            # e.g. the forward-mode Jacobian kernels of derivatives='dual': not stored,
+            # the design runs its dataflow again
+            return
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?)', \
+                                   (key[0], key[1], self.fingerprint, data))
+
+    def prune(self):
+        '''
+        Delete the entries of other model fingerprints and return their number.
+        '''
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                return connection.execute('DELETE FROM evaluations WHERE model != ?', (self.fingerprint,)).rowcount
+
+    def stats(self):
+
+        with self._lock:
+            size = self._connect().execute('SELECT COUNT(*) FROM evaluations').fetchone()[0]
+            return {'hits' : self.hits, 'misses' : self.misses, 'evictions' : self.evictions, \
+                    'size' : size, 'maxsize' : None}
+
+    def clear(self):
+        '''
+        Delete every entry, including those of other processes, and reset the counters.
+        '''
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('DELETE FROM evaluations')
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self):
+
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._pid = None
+
+    def __len__(self):
+
+        return self.stats()['size']
@@ -0,0 +1,184 @@
+"""
+monte_carlo.py
+
+Vectorized Monte Carlo propagation of the uncertainty of the Turbine_CostsSE cost
+coefficients, and optionally of the PPI escalators, to the component and turbine costs.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from escalation import escalators
+from costsse_kernels import cost_coefficients, blade_cost, hub_cost, pitch_system_cost, spinner_cost, \
+     hub_system_cost, rotor_cost, low_speed_shaft_cost, bearings_cost, gearbox_cost, high_speed_side_cost, \
+     generator_cost, bedplate_cost2002, bedplate_cost, yaw_system_cost, nacelle_system_cost, tower_cost, \
+     tower_system_cost, turbine_cost
+
+# design inputs of turbine_cost_samples and turbine_cost_distribution
+design_inputs = ['blade_mass', 'hub_mass', 'pitch_system_mass', 'spinner_mass', 'low_speed_shaft_mass', \
+                 'main_bearing_mass', 'second_bearing_mass', 'gearbox_mass', 'high_speed_side_mass', \
+                 'generator_mass', 'bedplate_mass', 'yaw_system_mass', 'tower_mass', 'machine_rating']
+
+#-------------------------------------------------------------------------------
+
+def turbine_cost_samples(coefficients, blade_mass, hub_mass, pitch_system_mass, spinner_mass, \
+                         low_speed_shaft_mass, main_bearing_mass, second_bearing_mass, \
+                         gearbox_mass, high_speed_side_mass, generator_mass, bedplate_mass, \
+                         yaw_system_mass, tower_mass, machine_rating, esc, \
+                         blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                         crane=False, offshore=False, \
+                         assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                         profitMultiplier=0.0, transportMultiplier=0.0):
+    '''
+    Component and turbine costs of turbine_costsse_batch evaluated by the cost kernels
+    with coefficients, a mapping with the keys of costsse_kernels.cost_coefficients
+    whose values may be arrays of samples.  They broadcast against the masses and
+    against the escalators of esc, which may be samples as well.
+    '''
+
+    c = coefficients
+    out = {}
+
+    # rotor
+    out['blade_cost'] = blade_cost(blade_mass, esc, advanced_blade, coefficients=c)
+    out['hub_cost'] = hub_cost(hub_mass, esc, coefficients=c)
+    out['pitch_system_cost'] = pitch_system_cost(pitch_system_mass, esc, coefficients=c)
+    out['spinner_cost'] = spinner_cost(spinner_mass, esc, coefficients=c)
+    out['hub_system_cost'] = hub_system_cost(out['hub_cost'], out['pitch_system_cost'], out['spinner_cost'])
+    out['rotor_cost'] = rotor_cost(out['blade_cost'], out['hub_system_cost'], blade_number)
+
+    # nacelle
+    out['lss_cost'] = low_speed_shaft_cost(low_speed_shaft_mass, esc, coefficients=c)
+    out['bearings_cost'] = bearings_cost(main_bearing_mass, second_bearing_mass, esc, coefficients=c)
+    out['gearbox_cost'] = gearbox_cost(gearbox_mass, machine_rating, esc, drivetrain_design, coefficients=c)
+    out['hss_cost'] = high_speed_side_cost(high_speed_side_mass, esc, coefficients=c)
+    out['generator_cost'] = generator_cost(generator_mass, machine_rating, esc, drivetrain_design, coefficients=c)
+    bedplateCost2002 = bedplate_cost2002(bedplate_mass, coefficients=c)
+    out['bedplate_cost'] = bedplate_cost(bedplate_mass, esc, coefficients=c)
+    out['yaw_system_cost'] = yaw_system_cost(yaw_system_mass, esc, coefficients=c)
+
+    nacelle = nacelle_system_cost(out['lss_cost'], out['bearings_cost'], out['gearbox_cost'], out['hss_cost'], \
+                                  out['generator_cost'], out['bedplate_cost'], bedplateCost2002, \
+                                  out['yaw_system_cost'], bedplate_mass, machine_rating, esc, crane, offshore, \
+                                  coefficients=c)
+    for name in ['mainframe_cost', 'econnections_cost', 'vspd_etronics_cost', 'hydr_cooling_cost', \
+                 'controls_cost', 'nacelle_cover_cost']:
+        out[name] = nacelle[name]
+    out['nacelle_cost'] = nacelle['cost']
+
+    # tower
+    out['tower_cost'] = tower_system_cost(tower_cost(tower_mass, esc, coefficients=c))
+
+    # turbine
+    out['turbine_cost'] = turbine_cost(out['rotor_cost'], out['nacelle_cost'], out['tower_cost'], offshore, \
+                                       assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, \
+                                       transportMultiplier, coefficients=c)
+
+    return out
+
+def draw(distribution, size, rng):
+    '''
+    size samples of distribution: a callable taking (rng, size), or a tuple of the name
+    of a numpy.random.RandomState method and its parameters, such as ('normal', 17.6, 1.0)
+    or ('triangular', 15.0, 17.6, 21.0).
+    '''
+
+    if callable(distribution):
+        return np.asarray(distribution(rng, size), dtype=np.float64)
+
+    return getattr(rng, distribution[0])(*distribution[1:], size=size)
+
+def sample_coefficients(distributions, n_samples, rng):
+    '''
+    Coefficients of turbine_cost_samples: n_samples draws of those in distributions,
+    the value in cost_coefficients of the others.
+    '''
+
+    unknown = sorted(set(distributions) - set(cost_coefficients))
+    if unknown:
+        raise ValueError('unknown cost coefficients: {0}'.format(', '.join(unknown)))
+
+    coefficients = dict(cost_coefficients)
+    for name in sorted(distributions):
+        coefficients[name] = draw(distributions[name], n_samples, rng)
+
+    return coefficients
+
+def turbine_cost_distribution(designs, distributions, n_samples=100000, escalator_distributions=None, \
+                              percentiles=(5.0, 50.0, 95.0), seed=None, year=2009, month=12, context=None, \
+                              **params):
+    '''
+    Monte Carlo distribution of the Turbine_CostsSE costs of each design.
+
+    designs maps the names in design_inputs to columns with one row per design.
+    distributions maps names of cost_coefficients to distributions (see draw), and
+    escalator_distributions maps PPI codes such as 'IPPI_TWR' to distributions of a
+    factor multiplying the escalator of year and month, a single date shared by every
+    design and sample (ValueError for arrays of dates).  The n_samples draws, from a
+    RandomState seeded with seed, are shared by every design, so that differences
+    between designs carry no sampling noise.  params are the remaining parameters of
+    turbine_costsse_batch, shared by every design.
+
+    Returns a dictionary with 'turbine_cost', the samples of every design as an array
+    of shape (N, n_samples), 'mean', a dictionary of the mean of each cost output as an
+    array of shape (N,), and 'percentiles', a dictionary of the percentiles of each cost
+    output as an array of shape (N, len(percentiles)).
+    '''
+
+    if np.ndim(year) or np.ndim(month):
+        raise ValueError('year and month must be a single date, not arrays of dates')
+
+    rng = np.random.RandomState(seed)
+    coefficients = sample_coefficients(distributions, n_samples, rng)
+
+    esc = escalators(year, month, context).as_dict()
+    for code in sorted(escalator_distributions or {}):
+        esc[code] = esc[code] * draw(escalator_distributions[code], n_samples, rng)
+
+    columns = [np.atleast_1d(np.asarray(designs[name], dtype=np.float64)) for name in design_inputs]
+    columns = np.broadcast_arrays(*columns)
+    n = columns[0].shape[0]
+
+    samples = np.empty((n, n_samples))
+    mean = {}
+    quantiles = {}
+    for i in range(n):
+        out = turbine_cost_samples(coefficients, *[column[i] for column in columns], esc=esc, **params)
+        samples[i] = out['turbine_cost']
+        for name, values in out.items():
+            if name not in mean:
+                mean[name] = np.empty(n)
+                quantiles[name] = np.empty((n, len(percentiles)))
+            mean[name][i] = np.mean(values)
+            quantiles[name][i] = np.percentile(values, percentiles)
+
+    return {'turbine_cost' : samples, 'mean' : mean, 'percentiles' : quantiles}
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    # NREL 5 MW Reference Turbine with +/- 10% triangular uncertainty on the main slopes
+    designs = {'blade_mass' : 17650.67, 'hub_mass' : 31644.5, 'pitch_system_mass' : 17004.0, 'spinner_mass' : 1810.5, \
+               'low_speed_shaft_mass' : 31257.3, 'main_bearing_mass' : 9731.41 / 2, \
+               'second_bearing_mass' : 9731.41 / 2, 'gearbox_mass' : 30237.60, 'high_speed_side_mass' : 1492.45, \
+               'generator_mass' : 16699.85, 'bedplate_mass' : 93090.6, 'yaw_system_mass' : 11878.24, \
+               'tower_mass' : [400000.0, 434559.0, 470000.0], 'machine_rating' : 5000.0}
+    distributions = dict((name, ('triangular', 0.9 * cost_coefficients[name], cost_coefficients[name], \
+                                 1.1 * cost_coefficients[name])) \
+                         for name in ['bearings_coeff', 'gearbox_slope', 'generator_slope', 'tower_coeff', \
+                                      'hub_coeff', 'advanced_blade_slope'])
+
+    mc = turbine_cost_distribution(designs, distributions, n_samples=1000000, \
+                                   escalator_distributions={'IPPI_TWR' : ('normal', 1.0, 0.05)}, seed=0, \
+                                   year=2010, month=12, crane=True, offshore=True)
+
+    for i, tower_mass in enumerate(designs['tower_mass']):
+        print "Tower mass {0:.0f} kg: turbine cost 5-50-95% ${1:.0f} ${2:.0f} ${3:.0f} USD".format( \
+              tower_mass, *mc['percentiles']['turbine_cost'][i])
+    print "Tower cost 5-50-95% of the reference: ${0:.0f} ${1:.0f} ${2:.0f} USD".format(*mc['percentiles']['tower_cost'][1])
+
+if __name__ == "__main__":
+
+    example()
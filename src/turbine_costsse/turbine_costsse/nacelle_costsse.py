@@ -5,7 +5,13 @@ Created by Katherine Dykes 2012.
 Copyright (c) NREL. All rights reserved.
 """
 
-from commonse.config import *
+from escalation import component_escalators, set_context, EvaluationContext
+from costsse_kernels import low_speed_shaft_cost, low_speed_shaft_cost_jacobian, bearings_cost, bearings_cost_jacobian, \
+     gearbox_cost, gearbox_cost_jacobian, high_speed_side_cost, high_speed_side_cost_jacobian, generator_cost, \
+     generator_cost_jacobian, bedplate_cost2002, bedplate_cost, bedplate_cost_jacobian, yaw_system_cost, \
+     yaw_system_cost_jacobian, nacelle_system_cost, nacelle_system_cost_jacobian
+from dual import component_jacobian, defer_jacobian, deferred_jacobian
+from memo import execute_if_changed
 from openmdao.main.api import Component, Assembly
 from openmdao.main.datatypes.api import Array, Float, Bool, Int, Enum
 from math import pi
@@ -41,17 +47,12 @@ class LowSpeedShaftCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        # calculate component cost
-        LowSpeedShaftCost2002 = 3.3602 * self.low_speed_shaft_mass + 13587      # equation adjusted to be based on mass rather than rotor diameter using data from CSM
-        lowSpeedShaftCostEsc            = ppi.compute('IPPI_LSS')
-        self.cost = (LowSpeedShaftCost2002 * lowSpeedShaftCostEsc )
+        self.cost = low_speed_shaft_cost(self.low_speed_shaft_mass, esc)
 
-        # derivatives
-        self.d_cost_d_low_speed_shaft_mass = lowSpeedShaftCostEsc * 3.3602
+        defer_jacobian(self, component_jacobian(self, low_speed_shaft_cost_jacobian), self.low_speed_shaft_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -62,10 +63,7 @@ class LowSpeedShaftCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_low_speed_shaft_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -95,21 +93,12 @@ class BearingsCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-        bearingsMass = self.main_bearing_mass + self.second_bearing_mass
-
-        # calculate component cost
-        bearingCostEsc       = ppi.compute('IPPI_BRN')
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        brngSysCostFactor = 17.6 # $/kg                  # cost / unit mass from CSM
-        Bearings2002 = (bearingsMass) * brngSysCostFactor
-        self.cost    = (( Bearings2002 ) * bearingCostEsc ) / 4   # div 4 to account for bearing cost mass differences CSM to Sunderland
+        self.cost = bearings_cost(self.main_bearing_mass, self.second_bearing_mass, esc)
 
-        # derivatives
-        self.d_cost_d_main_bearing_mass = bearingCostEsc * brngSysCostFactor / 4
-        self.d_cost_d_second_bearing_mass = bearingCostEsc * brngSysCostFactor / 4
+        defer_jacobian(self, component_jacobian(self, bearings_cost_jacobian), self.main_bearing_mass, self.second_bearing_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -120,10 +109,7 @@ class BearingsCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_main_bearing_mass, self.d_cost_d_second_bearing_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -154,39 +140,12 @@ class GearboxCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        # calculate component cost
-        GearboxCostEsc     = ppi.compute('IPPI_GRB')
-
-        costCoeff = [None, 16.45  , 74.101     ,   15.25697015,  0 ]
-        costExp   = [None,  1.2491,  1.002     ,    1.2491    ,  0 ]
-
-        if self.drivetrain_design == 'geared':
-            drivetrain_design = 1
-        elif self.drivetrain_design == 'single_stage':
-            drivetrain_design = 2
-        elif self.drivetrain_design == 'multi-drive':
-            drivetrain_design = 3
-        elif self.drivetrain_design == 'pm_direct_drive':
-            drivetrain_design = 4
-
-        if drivetrain_design == 1:
-          Gearbox2002 = 16.9 * self.gearbox_mass - 25066          # for traditional 3-stage gearbox, use mass based cost equation from NREL CSM
-        else:
-          Gearbox2002 = costCoeff[drivetrain_design] * (self.machine_rating ** costCoeff[drivetrain_design])        # for other drivetrain configurations, use NREL CSM equation based on machine rating
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        self.cost   = Gearbox2002 * GearboxCostEsc
+        self.cost = gearbox_cost(self.gearbox_mass, self.machine_rating, esc, self.drivetrain_design)
 
-        # derivatives
-        if drivetrain_design == 1:
-          self.d_cost_d_gearbox_mass = GearboxCostEsc * 16.9
-          self.d_cost_d_machine_rating = 0.0
-        else:
-          self.d_cost_d_gearbox_mass = 0.0
-          self.d_cost_d_machine_rating =  GearboxCostEsc * costCoeff[drivetrain_design] * (costCoeff[drivetrain_design] * (self.machine_rating ** (costCoeff[drivetrain_design]-1)))
+        defer_jacobian(self, component_jacobian(self, gearbox_cost_jacobian), self.gearbox_mass, self.machine_rating, esc, self.drivetrain_design)
 
     def list_deriv_vars(self):
 
@@ -197,9 +156,7 @@ class GearboxCost(Component):
 
     def provideJ(self):
 
-        self.J = np.array([[self.d_cost_d_gearbox_mass, self.d_cost_d_machine_rating]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -228,16 +185,12 @@ class HighSpeedSideCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-        # calculate component cost
-        mechBrakeCostEsc     = ppi.compute('IPPI_BRK')
-        mechBrakeCost2002    = 10 * self.high_speed_side_mass                  # mechanical brake system cost based on $10 / kg multiplier from CSM model (inverse relationship)
-        self.cost            = mechBrakeCostEsc * mechBrakeCost2002
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
+
+        self.cost = high_speed_side_cost(self.high_speed_side_mass, esc)
 
-        # derivatives
-        self.d_cost_d_high_speed_side_mass = mechBrakeCostEsc * 10
+        defer_jacobian(self, component_jacobian(self, high_speed_side_cost_jacobian), self.high_speed_side_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -248,10 +201,7 @@ class HighSpeedSideCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_high_speed_side_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -282,37 +232,12 @@ class GeneratorCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        # calculate component cost                                      #TODO: only handles traditional drivetrain configuration at present
-        generatorCostEsc     = ppi.compute('IPPI_GEN')
-        costCoeff = [None, 65    , 54.73 ,  48.03 , 219.33 ] # $/kW - from 'Generators' worksheet
-
-        if self.drivetrain_design == 'geared':
-            drivetrain_design = 1
-        elif self.drivetrain_design == 'single_stage':
-            drivetrain_design = 2
-        elif self.drivetrain_design == 'multi-drive':
-            drivetrain_design = 3
-        elif self.drivetrain_design == 'pm_direct_drive':
-            drivetrain_design = 4
-
-        if drivetrain_design == 1:
-            GeneratorCost2002 = 19.697 * self.generator_mass + 9277.3
-        else:
-            GeneratorCost2002 = costCoeff[drivetrain_design] * self.machine_rating
-
-        self.cost         = GeneratorCost2002 * generatorCostEsc
-
-        # derivatives
-        if drivetrain_design == 1:
-            self.d_cost_d_generator_mass = generatorCostEsc * 19.697
-            self.d_cost_d_machine_rating = 0.0
-        else:
-            self.d_cost_d_generator_mass = 0.0
-            self.d_cost_d_machine_rating = costCoeff[drivetrain_design] * generatorCostEsc
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
+
+        self.cost = generator_cost(self.generator_mass, self.machine_rating, esc, self.drivetrain_design)
+
+        defer_jacobian(self, component_jacobian(self, generator_cost_jacobian), self.generator_mass, self.machine_rating, esc, self.drivetrain_design)
 
     def list_deriv_vars(self):
 
@@ -323,10 +248,7 @@ class GeneratorCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_generator_mass, self.d_cost_d_machine_rating]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -357,23 +279,13 @@ class BedplateCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        #calculate component cost                                    # TODO: cost needs to be adjusted based on look-up table or a materials, mass and manufacturing equation
-        BedplateCostEsc     = ppi.compute('IPPI_MFM')
+        self.cost2002 = bedplate_cost2002(self.bedplate_mass)
+        self.cost     = bedplate_cost(self.bedplate_mass, esc)
 
-        #TODO: handle different drivetrain types
-        costCoeff = [None, 9.48850 , 303.96000, 17.92300 , 627.280000 ]
-        costExp   = [None, 1.9525, 1.0669, 1.6716, 0.85]
-
-        self.cost2002 = 0.9461 * self.bedplate_mass + 17799                   # equation adjusted based on mass / cost relationships for components documented in NREL CSM
-        self.cost     = self.cost2002 * BedplateCostEsc
-
-        # derivatives
-        self.d_cost_d_bedplate_mass = BedplateCostEsc * 0.9461
-        self.d_cost2002_d_bedplate_mass = 0.9461
+        defer_jacobian(self, component_jacobian(self, bedplate_cost_jacobian), self.bedplate_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -384,10 +296,7 @@ class BedplateCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_bedplate_mass], [self.d_cost2002_d_bedplate_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #---------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -415,18 +324,12 @@ class YawSystemCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        # calculate component cost
-        yawDrvBearingCostEsc = ppi.compute('IPPI_YAW')
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        YawDrvBearing2002 = 8.3221 * self.yaw_system_mass + 2708.5          # cost / mass relationship derived from NREL CSM data
-        self.cost         = YawDrvBearing2002 * yawDrvBearingCostEsc
+        self.cost = yaw_system_cost(self.yaw_system_mass, esc)
 
-        # derivatives
-        self.d_cost_d_yaw_system_mass = yawDrvBearingCostEsc * 8.3221
+        defer_jacobian(self, component_jacobian(self, yaw_system_cost_jacobian), self.yaw_system_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -437,10 +340,7 @@ class YawSystemCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_yaw_system_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(FullNacelleCostAggregator)
@@ -480,90 +380,25 @@ class NacelleSystemCostAdder(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        BedplateCostEsc      = ppi.compute('IPPI_MFM')
-
-        # mainframe system including bedplate, platforms, crane and miscellaneous hardware
-        nacellePlatformsMass = 0.125 * self.bedplate_mass
-        NacellePlatforms2002 = 8.7 * nacellePlatformsMass
-
-        if (self.crane):
-            craneCost2002  = 12000.0
-        else:
-            craneCost2002  = 0.0
-
-        # aggregation of mainframe components: bedplate, crane and platforms into single mass and cost
-        BaseHardwareCost2002  = self.bedplateCost2002 * 0.7
-        MainFrameCost2002   = (NacellePlatforms2002 + craneCost2002  + \
-                          BaseHardwareCost2002 )
-        self.mainframe_cost  = MainFrameCost2002 * BedplateCostEsc + self.bedplate_cost
-
-        # calculations of mass and cost for other systems not included above as main drivetrain load-bearing components
-        # Cost Escalators - should be obtained from PPI tables
-        VspdEtronicsCostEsc  = ppi.compute('IPPI_VSE')
-        nacelleCovCostEsc    = ppi.compute('IPPI_NAC')
-        hydrCoolingCostEsc   = ppi.compute('IPPI_HYD')
-        econnectionsCostEsc  = ppi.compute('IPPI_ELC')
-        controlsCostEsc      = ppi.compute('IPPI_CTL')
-
-        # electronic systems, hydraulics and controls
-        econnectionsCost2002  = 40.0 * self.machine_rating  # 2002
-        self.econnectionsCost = econnectionsCost2002 * econnectionsCostEsc
-
-        VspdEtronics2002      = 79.32 * self.machine_rating
-        self.vspdEtronicsCost = VspdEtronics2002 * VspdEtronicsCostEsc
-
-        hydrCoolingCost2002  = 12.0 * self.machine_rating # 2002
-        self.hydrCoolingCost = hydrCoolingCost2002 * hydrCoolingCostEsc
-
-        if (not self.offshore):
-            ControlsCost2002  = 35000.0 # initial approximation 2002
-            self.controlsCost = ControlsCost2002 * controlsCostEsc
-        else:
-            ControlsCost2002  = 55900.0 # initial approximation 2002
-            self.controlsCost = ControlsCost2002 * controlsCostEsc
-
-        nacelleCovCost2002  = 11.537 * self.machine_rating + (3849.7)
-        self.nacelleCovCost = nacelleCovCost2002 * nacelleCovCostEsc
-
-        # aggregation of nacelle costs
-        partsCost = self.lss_cost + \
-                    self.bearings_cost + \
-                    self.gearbox_cost + \
-                    self.hss_cost + \
-                    self.generator_cost + \
-                    self.mainframe_cost + \
-                    self.yaw_system_cost + \
-                    self.econnectionsCost + \
-                    self.vspdEtronicsCost + \
-                    self.hydrCoolingCost + \
-                    self.controlsCost + \
-                    self.nacelleCovCost
-
-        # updated calculations below to account for assembly, transport, overhead and profits
-        assemblyCostMultiplier = 0.0 # (4/72)
-        overheadCostMultiplier = 0.0 # (24/72)
-        profitMultiplier = 0.0
-        transportMultiplier = 0.0
-
-        self.cost = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
-
-        # derivatives
-        # derivatives
-        self.d_cost_d_bedplate_mass = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier) * BedplateCostEsc * 8.7 * 0.125
-        self.d_cost_d_bedplateCost2002 = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier) * BedplateCostEsc * 0.7
-        self.d_cost_d_bedplateCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_lowSpeedShaftCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_bearingsCost= (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_gearboxCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_highSpeedSideCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_generatorCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_yawSystemCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_machine_rating = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier) * \
-                                 (econnectionsCostEsc * 40.0 + VspdEtronicsCostEsc * 79.32 + hydrCoolingCostEsc * 12.0 + nacelleCovCostEsc * 11.537))
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
+
+        out = nacelle_system_cost(self.lss_cost, self.bearings_cost, self.gearbox_cost, self.hss_cost, \
+                                  self.generator_cost, self.bedplate_cost, self.bedplateCost2002, \
+                                  self.yaw_system_cost, self.bedplate_mass, self.machine_rating, esc, \
+                                  self.crane, self.offshore)
+
+        self.mainframe_cost   = out['mainframe_cost']
+        self.econnectionsCost = out['econnections_cost']
+        self.vspdEtronicsCost = out['vspd_etronics_cost']
+        self.hydrCoolingCost  = out['hydr_cooling_cost']
+        self.controlsCost     = out['controls_cost']
+        self.nacelleCovCost   = out['nacelle_cover_cost']
+        self.cost = out['cost']
+
+        defer_jacobian(self, component_jacobian(self, nacelle_system_cost_jacobian), self.lss_cost, self.bearings_cost, \
+                       self.gearbox_cost, self.hss_cost, self.generator_cost, self.bedplate_cost, self.bedplateCost2002, \
+                       self.yaw_system_cost, self.bedplate_mass, self.machine_rating, esc, self.crane, self.offshore)
 
     def list_deriv_vars(self):
 
@@ -575,13 +410,7 @@ class NacelleSystemCostAdder(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_bedplate_mass, self.d_cost_d_bedplateCost2002, self.d_cost_d_bedplateCost, \
-                            self.d_cost_d_lowSpeedShaftCost, self.d_cost_d_bearingsCost, self.d_cost_d_gearboxCost, \
-                            self.d_cost_d_highSpeedSideCost, self.d_cost_d_generatorCost, \
-                            self.d_cost_d_yawSystemCost, self.d_cost_d_machine_rating]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #------------------------------------------------------------------
 
@@ -613,6 +442,9 @@ class Nacelle_CostsSE(FullNacelleCostModel):
     # outputs
     cost = Float(iotype='out', units='USD', desc='component cost')
 
+    # runs skipped by execute_if_changed
+    skipped_runs = 0
+
     def configure(self):
 
         configure_full_ncc(self)
@@ -645,6 +477,10 @@ class Nacelle_CostsSE(FullNacelleCostModel):
         
         self.connect('bedplateCC.cost2002','ncc.bedplateCost2002')
 
+    def execute(self):
+
+        execute_if_changed(self, super(Nacelle_CostsSE, self).execute)
+
 
 #==================================================================
 
@@ -654,8 +490,7 @@ def example():
 
     nacelle = Nacelle_CostsSE()
 
-    ppi.ref_yr   = 2002
-    ppi.ref_mon  = 9
+    set_context(nacelle, EvaluationContext(ref_yr=2002, ref_mon=9))
 
     nacelle.low_speed_shaft_mass = 31257.3
     #nacelle.bearingsMass = 9731.41
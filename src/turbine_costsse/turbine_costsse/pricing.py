@@ -0,0 +1,302 @@
+"""
+pricing.py
+
+Non-blocking pricing of single designs with Turbine_CostsSE and tcc_csm_assembly:
+concurrent requests are queued, coalesced into vectorized batch evaluations on worker
+threads and answered through futures.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import importlib
+import logging
+import Queue
+import threading
+import time
+import numpy as np
+
+from turbine_costsse_batch import turbine_costsse_batch
+
+# seconds between the attempts of a submit waiting on a full queue
+submit_poll = 0.001
+
+#-------------------------------------------------------------------------------
+class PricingFuture(object):
+    '''
+    Pending result of a PricingService request: a dictionary of the cost outputs of
+    one design, or the exception raised by its batch.
+
+    Callbacks added with add_done_callback run on the worker thread once the result
+    is set, or at once when it already is.  An event loop waits on the request
+    without blocking by scheduling its own completion from the callback, for instance
+    with loop.call_soon_threadsafe.
+    '''
+
+    def __init__(self):
+
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        self._exception = None
+
+    def done(self):
+
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        '''
+        Outputs of the design, waiting at most timeout seconds for them.
+        '''
+
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+
+        return self._result
+
+    def exception(self, timeout=None):
+        '''
+        Exception raised by the batch of the design, None if it succeeded.
+        '''
+
+        if not self._event.wait(timeout):
+            raise RuntimeError('pricing request still pending after {0} s'.format(timeout))
+
+        return self._exception
+
+    def add_done_callback(self, fn):
+        '''
+        Call fn(future) once the result is set.
+        '''
+
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+
+        run_callback(fn, self)
+
+    def _set(self, result=None, exception=None):
+
+        with self._lock:
+            self._result = result
+            self._exception = exception
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for fn in callbacks:
+            run_callback(fn, self)
+
+def run_callback(fn, future):
+    '''
+    Call fn(future), logging rather than raising its exceptions so the worker thread survives.
+    '''
+
+    try:
+        fn(future)
+    except Exception:
+        logging.getLogger(__name__).exception('PricingFuture callback %r raised', fn)
+
+def same_parameters(a, b):
+    '''
+    Whether the parameter dictionaries a and b are equal; parameters that do not compare
+    as a single truth value, such as arrays, make them differ.
+    '''
+
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+class PricingService(object):
+    '''
+    Prices designs submitted one at a time from any thread with a vectorized batch
+    function such as turbine_costsse_batch.
+
+    Requests wait in a queue bounded to max_pending entries.  Each of the workers
+    threads takes the requests queued, waiting up to max_wait seconds for more until
+    it holds max_batch of them, groups those sharing the same parameters and evaluates
+    each group with one call of batch, the columns names being stacked into arrays.
+    When the call fails, or its outputs are not one value or one per design, the
+    exception is set on the futures of that group alone and the worker carries on.
+    A full queue is the backpressure: submit then blocks, or raises Queue.Full when
+    block is False or the timeout passes.  requests and batches count the requests
+    answered and the batch calls that answered them.
+    '''
+
+    def __init__(self, batch, columns, defaults=None, max_batch=1024, max_pending=4096, max_wait=0.001, workers=1):
+
+        self.batch = batch
+        self.columns = list(columns)
+        self.defaults = dict(defaults or {})
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self._queue = Queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._closed = False
+
+        self._threads = [threading.Thread(target=self._run, name='PricingService-{0}'.format(i)) for i in range(workers)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def submit(self, block=True, timeout=None, **design):
+        '''
+        Queue the design given as keyword arguments of batch and return its PricingFuture.
+        Columns left out take their value from defaults.
+        '''
+
+        missing = [name for name in self.columns if name not in design and name not in self.defaults]
+        if missing:
+            raise ValueError('missing design inputs: {0}'.format(', '.join(missing)))
+
+        future = PricingFuture()
+        request = (dict(self.defaults, **design), future)
+        deadline = None if timeout is None else time.time() + timeout
+
+        # each attempt checks close and enqueues under the lock close takes, so no request
+        # follows the stop sentinels; a full queue is waited on outside the lock
+        while True:
+            with self._submit_lock:
+                if self._closed:
+                    raise RuntimeError('PricingService is closed')
+                try:
+                    self._queue.put_nowait(request)
+                    return future
+                except Queue.Full:
+                    if not block or (deadline is not None and time.time() >= deadline):
+                        raise
+            time.sleep(submit_poll if deadline is None else max(min(submit_poll, deadline - time.time()), 0.0))
+
+    def price(self, **design):
+        '''
+        Outputs of one design, blocking until they are available.
+        '''
+
+        return self.submit(**design).result()
+
+    def close(self):
+        '''
+        Answer the requests queued, then stop the workers.
+        '''
+
+        with self._submit_lock:
+            closing, self._closed = not self._closed, True
+        if closing:
+            for thread in self._threads:
+                self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+    def _run(self):
+
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            requests = [item]
+            deadline = time.time() + self.max_wait
+            while len(requests) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.time(), 0.0))
+                except Queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                requests.append(item)
+
+            self._evaluate(requests)
+
+    def _evaluate(self, requests):
+
+        # designs sharing every parameter outside columns are priced by one batch call
+        groups = []
+        for design, future in requests:
+            params = dict((name, value) for name, value in design.items() if name not in self.columns)
+            for group_params, group in groups:
+                if same_parameters(group_params, params):
+                    group.append((design, future))
+                    break
+            else:
+                groups.append((params, [(design, future)]))
+
+        for params, group in groups:
+            n = len(group)
+            try:
+                columns = dict((name, np.array([design[name] for design, future in group])) for name in self.columns)
+                out = self.batch(**dict(params, **columns))
+                out = dict((name, np.broadcast_to(values, (n,))) for name, values in out.items())
+                results = [dict((name, values[i].item()) for name, values in out.items()) for i in range(n)]
+            except Exception as e:
+                for design, future in group:
+                    future._set(exception=e)
+            else:
+                for result, (design, future) in zip(results, group):
+                    future._set(result)
+
+            with self._lock:
+                self.requests += n
+                self.batches += 1
+
+#-------------------------------------------------------------------------------
+
+# per-design inputs of the two models
+turbine_costsse_columns = ['blade_mass', 'hub_mass', 'pitch_system_mass', 'spinner_mass', 'low_speed_shaft_mass', \
+                           'main_bearing_mass', 'second_bearing_mass', 'gearbox_mass', 'high_speed_side_mass', \
+                           'generator_mass', 'bedplate_mass', 'yaw_system_mass', 'tower_mass', 'machine_rating', \
+                           'year', 'month']
+tcc_csm_columns = ['rotor_diameter', 'machine_rating', 'hub_height', 'rotor_thrust', 'rotor_torque', \
+                   'drivetrain_design', 'year', 'month']
+turbine_costsse_defaults = {'year' : 2009, 'month' : 12}
+tcc_csm_defaults = {'drivetrain_design' : 'geared', 'year' : 2009, 'month' : 12}
+
+def turbine_costsse_service(**kwargs):
+    '''
+    PricingService of Turbine_CostsSE; kwargs are passed to PricingService.
+    '''
+
+    return PricingService(turbine_costsse_batch, turbine_costsse_columns, turbine_costsse_defaults, **kwargs)
+
+def tcc_csm_service(**kwargs):
+    '''
+    PricingService of tcc_csm_assembly; kwargs are passed to PricingService.
+    '''
+
+    batch = importlib.import_module('turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_batch').tcc_csm_batch
+
+    return PricingService(batch, tcc_csm_columns, tcc_csm_defaults, **kwargs)
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    # 1000 concurrent requests for variants of the NREL 5 MW Reference Turbine
+    with tcc_csm_service(max_wait=0.01) as service:
+        futures = [service.submit(rotor_diameter=rotor_diameter, machine_rating=5000.0, hub_height=90.0, \
+                                  rotor_thrust=505575.481173 * (rotor_diameter / 126.0)**2, \
+                                  rotor_torque=4365250.93957 * (rotor_diameter / 126.0), \
+                                  advanced_blade=True, offshore=True) \
+                   for rotor_diameter in np.linspace(100.0, 160.0, 1000)]
+        costs = [future.result()['turbine_cost'] for future in futures]
+
+    print "{0} requests priced in {1} batches".format(service.requests, service.batches)
+    print "Turbine cost: ${0:.2f} to ${1:.2f} USD".format(min(costs), max(costs))
+
+if __name__ == "__main__":
+
+    example()
@@ -5,7 +5,12 @@ Created by Katherine Dykes 2012.
 Copyright (c) NREL. All rights reserved.
 """
 
-from commonse.config import *
+from escalation import component_escalators, set_context, EvaluationContext
+from costsse_kernels import blade_cost, blade_cost_jacobian, hub_cost, hub_cost_jacobian, pitch_system_cost, \
+     pitch_system_cost_jacobian, spinner_cost, spinner_cost_jacobian, hub_system_cost, hub_system_cost_jacobian, \
+     rotor_cost, rotor_cost_jacobian
+from dual import component_jacobian, defer_jacobian, deferred_jacobian
+from memo import execute_if_changed
 from openmdao.main.api import Component, Assembly
 from openmdao.main.datatypes.api import Array, Float, Bool, Int
 from math import pi
@@ -42,30 +47,12 @@ class BladeCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        ppi_labor  = ppi.compute('IPPI_BLL')
+        self.cost = blade_cost(self.blade_mass, esc, self.advanced)
 
-        if (self.advanced == True):
-            ppi.ref_yr = 2003
-            ppi_mat   = ppi.compute('IPPI_BLA')
-            slope   = 13.0 #14.0 from model
-            intercept     = 5813.9
-        else:
-            ppi_mat   = ppi.compute('IPPI_BLD')
-            slope   = 8.0
-            intercept     = 21465.0
-        ppi.ref_yr = 2002
-
-        laborCoeff    = 2.7445         # todo: ignoring labor impacts for now
-        laborExp      = 2.5025
-
-        self.cost = ((slope*self.blade_mass + intercept)*ppi_mat)
-
-        # derivatives
-        self.d_cost_d_blade_mass = slope * ppi_mat
+        defer_jacobian(self, component_jacobian(self, blade_cost_jacobian), self.blade_mass, esc, self.advanced)
 
     def list_deriv_vars(self):
 
@@ -76,10 +63,7 @@ class BladeCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_blade_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 
 # -----------------------------------------------------------------------------------------------
@@ -109,22 +93,12 @@ class HubCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        #calculate system costs
-        ppi_labor  = ppi.compute('IPPI_BLL')
-
-        laborCoeff    = 2.7445
-        laborExp      = 2.5025
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        hubCost2002      = (self.hub_mass * 4.25) # $/kg
-        hubCostEscalator = ppi.compute('IPPI_HUB')
-        self.cost = (hubCost2002 * hubCostEscalator )
+        self.cost = hub_cost(self.hub_mass, esc)
 
-        # derivatives
-        self.d_cost_d_hub_mass = hubCostEscalator * 4.25
+        defer_jacobian(self, component_jacobian(self, hub_cost_jacobian), self.hub_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -135,10 +109,7 @@ class HubCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_hub_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -167,22 +138,12 @@ class PitchSystemCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        #calculate system costs
-        ppi_labor  = ppi.compute('IPPI_BLL')
-
-        laborCoeff    = 2.7445
-        laborExp      = 2.5025
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        pitchSysCost2002     = 2.28 * (0.0808 * (self.pitch_system_mass ** 1.4985))            # new cost based on mass - x1.328 for housing proportion
-        bearingCostEscalator = ppi.compute('IPPI_PMB')
-        self.cost = (bearingCostEscalator * pitchSysCost2002)
+        self.cost = pitch_system_cost(self.pitch_system_mass, esc)
 
-        # derivatives
-        self.d_cost_d_pitch_system_mass = bearingCostEscalator * 2.28 * (0.0808 * 1.4985 * (self.pitch_system_mass ** 0.4985))
+        defer_jacobian(self, component_jacobian(self, pitch_system_cost_jacobian), self.pitch_system_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -193,10 +154,7 @@ class PitchSystemCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_pitch_system_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(BaseComponentCostModel)
@@ -225,21 +183,12 @@ class SpinnerCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
-
-        #calculate system costs
-        ppi_labor  = ppi.compute('IPPI_BLL')
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        laborCoeff    = 2.7445
-        laborExp      = 2.5025
+        self.cost = spinner_cost(self.spinner_mass, esc)
 
-        spinnerCostEscalator = ppi.compute('IPPI_NAC')
-        self.cost = (spinnerCostEscalator * (5.57*self.spinner_mass))
-
-        # derivatives
-        self.d_cost_d_spinner_mass = spinnerCostEscalator * 5.57
+        defer_jacobian(self, component_jacobian(self, spinner_cost_jacobian), self.spinner_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -250,10 +199,7 @@ class SpinnerCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_spinner_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(FullHubSystemCostAggregator)
@@ -280,20 +226,9 @@ class HubSystemCostAdder(Component):
 
     def execute(self):
 
-        partsCost = self.hub_cost + self.pitch_system_cost + self.spinner_cost
-
-        # updated calculations below to account for assembly, transport, overhead and profits
-        assemblyCostMultiplier = 0.0 # (4/72)
-        overheadCostMultiplier = 0.0 # (24/72)
-        profitMultiplier = 0.0
-        transportMultiplier = 0.0
+        self.cost = hub_system_cost(self.hub_cost, self.pitch_system_cost, self.spinner_cost)
 
-        self.cost = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
-
-        # derivatives
-        self.d_cost_d_hubCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_pitchSystemCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
-        self.d_cost_d_spinnerCost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
+        defer_jacobian(self, component_jacobian(self, hub_system_cost_jacobian), self.hub_cost, self.pitch_system_cost, self.spinner_cost)
 
     def list_deriv_vars(self):
 
@@ -304,10 +239,7 @@ class HubSystemCostAdder(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_hubCost, self.d_cost_d_pitchSystemCost, self.d_cost_d_spinnerCost]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(FullRotorCostAggregator)
@@ -339,11 +271,9 @@ class RotorCostAdder(Component):
 
     def execute(self):
 
-        self.cost = self.blade_cost * self.blade_number + self.hub_system_cost
+        self.cost = rotor_cost(self.blade_cost, self.hub_system_cost, self.blade_number)
 
-        # derivatives
-        self.d_cost_d_bladeCost = self.blade_number
-        self.d_cost_d_hubSystemCost = 1
+        defer_jacobian(self, component_jacobian(self, rotor_cost_jacobian), self.blade_cost, self.hub_system_cost, self.blade_number)
 
     def list_deriv_vars(self):
 
@@ -354,10 +284,7 @@ class RotorCostAdder(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_bladeCost, self.d_cost_d_hubSystemCost]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 #-------------------------------------------------------------------------------
 @implement_base(FullRotorCostModel)
@@ -383,6 +310,9 @@ class Rotor_CostsSE(FullRotorCostModel):
     # Outputs
     cost = Float(0.0, iotype='out', desc='Overall wind sub-assembly capial costs including transportation costs')
 
+    # runs skipped by execute_if_changed
+    skipped_runs = 0
+
     def configure(self):
 
         configure_full_rcc(self)
@@ -404,17 +334,18 @@ class Rotor_CostsSE(FullRotorCostModel):
         self.connect('month', ['hubCC.month', 'pitchSysCC.month', 'spinnerCC.month', 'bladeCC.month'])
         self.connect('advanced', 'bladeCC.advanced')
 
+    def execute(self):
+
+        execute_if_changed(self, super(Rotor_CostsSE, self).execute)
+
 #-------------------------------------------------------------------------------
 
 def example():
 
-    # simple test of module
-    ppi.ref_yr   = 2002
-    ppi.ref_mon  = 9
-
     # NREL 5 MW turbine
     print "NREL 5 MW turbine test"
     rotor = Rotor_CostsSE()
+    set_context(rotor, EvaluationContext(ref_yr=2002, ref_mon=9))
 
     # Blade Test 1
     rotor.blade_number = 3
@@ -5,7 +5,10 @@ Created by Katherine Dykes 2012.
 Copyright (c) NREL. All rights reserved.
 """
 
-from commonse.config import *
+from escalation import component_escalators, set_context, EvaluationContext
+from costsse_kernels import tower_cost2002, tower_cost, tower_cost_jacobian, tower_system_cost, tower_system_cost_jacobian
+from dual import component_jacobian, defer_jacobian, deferred_jacobian
+from memo import execute_if_changed
 from openmdao.main.api import Component, Assembly
 from openmdao.main.datatypes.api import Array, Float, Bool, Int
 import numpy as np
@@ -40,19 +43,13 @@ class TowerCost(Component):
 
     def execute(self):
 
-        # assign input variables
-        ppi.curr_yr   = self.year
-        ppi.curr_mon   = self.month
+        # cost escalators for this date under the evaluation context
+        esc = component_escalators(self)
 
-        twrCostEscalator  = ppi.compute('IPPI_TWR')
+        self.towerCost2002 = tower_cost2002(self.tower_mass)
+        self.cost = tower_cost(self.tower_mass, esc)
 
-        twrCostCoeff      = 1.5 # $/kg
-
-        self.towerCost2002 = self.tower_mass * twrCostCoeff
-        self.cost = self.towerCost2002 * twrCostEscalator
-
-        # derivatives
-        self.d_cost_d_tower_mass = twrCostEscalator * twrCostCoeff
+        defer_jacobian(self, component_jacobian(self, tower_cost_jacobian), self.tower_mass, esc)
 
     def list_deriv_vars(self):
 
@@ -63,10 +60,7 @@ class TowerCost(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_tower_mass]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 
 #-------------------------------------------------------------------------------
@@ -88,18 +82,9 @@ class TowerCostAdder(Component):
 
     def execute(self):
 
-        partsCost = self.tower_cost
-
-        # updated calculations below to account for assembly, transport, overhead and profits
-        assemblyCostMultiplier = 0.0 # (4/72)
-        overheadCostMultiplier = 0.0 # (24/72)
-        profitMultiplier = 0.0
-        transportMultiplier = 0.0
-
-        self.cost = (1 + transportMultiplier + profitMultiplier) * ((1+overheadCostMultiplier+assemblyCostMultiplier)*partsCost)
+        self.cost = tower_system_cost(self.tower_cost)
 
-        # derivatives
-        self.d_cost_d_tower_cost = (1 + transportMultiplier + profitMultiplier) * (1+overheadCostMultiplier+assemblyCostMultiplier)
+        defer_jacobian(self, component_jacobian(self, tower_system_cost_jacobian), self.tower_cost)
 
     def list_deriv_vars(self):
 
@@ -110,10 +95,7 @@ class TowerCostAdder(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_tower_cost]])
-
-        return self.J
+        return deferred_jacobian(self)
 
 @implement_base(FullTowerCostModel)
 class Tower_CostsSE(Assembly):
@@ -128,6 +110,9 @@ class Tower_CostsSE(Assembly):
     # returns
     cost = Float(iotype='out', units='USD', desc='component cost')
 
+    # runs skipped by execute_if_changed
+    skipped_runs = 0
+
     def configure(self):
 
         configure_full_twcc(self)
@@ -139,6 +124,10 @@ class Tower_CostsSE(Assembly):
         self.connect('year', 'towerCC.year')
         self.connect('month', 'towerCC.month')
 
+    def execute(self):
+
+        execute_if_changed(self, super(Tower_CostsSE, self).execute)
+
 
 #-------------------------------------------------------------------------------
 
@@ -147,8 +136,7 @@ def example():
     # simple test of module
     tower = Tower_CostsSE()
 
-    ppi.ref_yr   = 2002
-    ppi.ref_mon  = 9
+    set_context(tower, EvaluationContext(ref_yr=2002, ref_mon=9))
 
     tower.tower_mass = 434559.0
     tower.year = 2009
@@ -15,6 +15,11 @@ from fusedwind.interface import implement_base
 from rotor_costsse import Rotor_CostsSE
 from nacelle_costsse import Nacelle_CostsSE
 from tower_costsse import Tower_CostsSE
+from costsse_kernels import turbine_cost, turbine_cost_jacobian
+from dual import component_jacobian, defer_jacobian, deferred_jacobian
+from turbine_costsse_batch import jacobian_inputs, turbine_costsse_batch_jacobian, turbine_cost_gradient
+from memo import memoized, memoized_execute
+from turbine_costsse_linear import compile_turbine_costsse
 
 #-------------------------------------------------------------------------------
 @implement_base(FullTurbineCostModel)
@@ -52,6 +57,11 @@ class Turbine_CostsSE(Assembly):
     # Outputs
     turbine_cost = Float(0.0, iotype='out', desc='Overall wind turbine capial costs including transportation costs')
 
+    # inputs keying an evaluation memoized by set_memo
+    memo_inputs = jacobian_inputs + ['blade_number', 'advanced_blade', 'drivetrain_design', 'crane', 'offshore', 'year', \
+                                     'month', 'assemblyCostMultiplier', 'overheadCostMultiplier', 'profitMultiplier', \
+                                     'transportMultiplier']
+
     def configure(self):
 
         configure_full_tcc(self)
@@ -90,6 +100,62 @@ class Turbine_CostsSE(Assembly):
         self.connect('profitMultiplier','tcc.profitMultiplier')
         self.connect('transportMultiplier','tcc.transportMultiplier')
 
+    def execute(self):
+
+        memoized_execute(self, super(Turbine_CostsSE, self).execute)
+
+    def jacobian(self):
+        '''
+        Derivatives of turbine_cost and the rotor, nacelle and tower costs with respect
+        to every mass input and machine_rating at the current inputs (see
+        turbine_costsse_batch_jacobian), memoized like the outputs.
+        '''
+
+        def compute():
+            masses = [getattr(self, name) for name in jacobian_inputs]
+            return turbine_costsse_batch_jacobian(*masses, **turbine_costsse_options(self))
+
+        return memoized(self, 'jacobian', compute).copy()
+
+    def skipped_executions(self):
+        '''
+        Component executions skipped by the rotorCC, nacelleCC and towerCC sub-assemblies
+        because their inputs did not change since their last run (see execute_if_changed),
+        per sub-assembly and in total.
+        '''
+
+        counts = {}
+        for name in ['rotorCC', 'nacelleCC', 'towerCC']:
+            subsystem = getattr(self, name)
+            components = [c for c in subsystem.list_components() if c != 'driver']
+            counts[name] = subsystem.skipped_runs * len(components)
+        counts['total'] = sum(counts.values())
+
+        return counts
+
+    def gradient(self):
+        '''
+        turbine_cost and its gradient with respect to every mass input and machine_rating
+        (in jacobian_inputs order) at the current inputs, by one adjoint sweep through
+        the cost adders and component kernels (see turbine_cost_gradient).
+        '''
+
+        masses = [getattr(self, name) for name in jacobian_inputs]
+        cost, grad = turbine_cost_gradient(*masses, **turbine_costsse_options(self))
+
+        return float(cost), grad
+
+def turbine_costsse_options(turbine):
+    '''
+    Parameters of a Turbine_CostsSE or Turbine_CostsSE_Flat as keyword arguments of
+    the turbine_costsse_batch functions.
+    '''
+
+    return dict(blade_number=turbine.blade_number, advanced_blade=turbine.advanced_blade, \
+                drivetrain_design=turbine.drivetrain_design, crane=turbine.crane, offshore=turbine.offshore, \
+                year=turbine.year, month=turbine.month, assemblyCostMultiplier=turbine.assemblyCostMultiplier, \
+                overheadCostMultiplier=turbine.overheadCostMultiplier, profitMultiplier=turbine.profitMultiplier, \
+                transportMultiplier=turbine.transportMultiplier, context=getattr(turbine, 'context', None))
 
 #-------------------------------------------------------------------------------
 @implement_base(FullTCCAggregator)
@@ -119,22 +185,11 @@ class TurbineCostAdder(Component):
 
     def execute(self):
 
-        partsCost = self.rotor_cost + self.nacelle_cost + self.tower_cost
-
-        self.turbine_cost = (1 + self.transportMultiplier + self.profitMultiplier) * ((1+self.overheadCostMultiplier+self.assemblyCostMultiplier)*partsCost)
+        multipliers = (self.assemblyCostMultiplier, self.overheadCostMultiplier, self.profitMultiplier, self.transportMultiplier)
 
-        # derivatives
-        self.d_cost_d_rotor_cost = (1 + self.transportMultiplier + self.profitMultiplier) * (1+self.overheadCostMultiplier+self.assemblyCostMultiplier)
-        self.d_cost_d_nacelle_cost = (1 + self.transportMultiplier + self.profitMultiplier) * (1+self.overheadCostMultiplier+self.assemblyCostMultiplier)
-        self.d_cost_d_tower_cost = (1 + self.transportMultiplier + self.profitMultiplier) * (1+self.overheadCostMultiplier+self.assemblyCostMultiplier)
+        self.turbine_cost = turbine_cost(self.rotor_cost, self.nacelle_cost, self.tower_cost, self.offshore, *multipliers)
 
-        if self.offshore:
-            self.turbine_cost *= 1.1
-
-            # derivatives
-            self.d_cost_d_rotor_cost *= 1.1
-            self.d_cost_d_nacelle_cost *= 1.1
-            self.d_cost_d_tower_cost *= 1.1
+        defer_jacobian(self, component_jacobian(self, turbine_cost_jacobian), self.rotor_cost, self.nacelle_cost, self.tower_cost, self.offshore, *multipliers)
 
     def list_deriv_vars(self):
 
@@ -145,10 +200,84 @@ class TurbineCostAdder(Component):
 
     def provideJ(self):
 
-        # Jacobian
-        self.J = np.array([[self.d_cost_d_rotor_cost, self.d_cost_d_nacelle_cost, self.d_cost_d_tower_cost]])
+        return deferred_jacobian(self)
+
+#-------------------------------------------------------------------------------
+class Turbine_CostsSE_Flat(Component):
+    '''
+    Single component equivalent of Turbine_CostsSE.  It has the same inputs and
+    turbine_cost output but evaluates the rotor, nacelle and tower cost trees inline
+    through their compiled linear form (see compile_turbine_costsse), recompiled only
+    when a parameter changes, with the analytic Jacobian of turbine_cost with respect
+    to every mass input and machine_rating.
+    '''
+
+    # variables
+    blade_mass = Float(iotype='in', units='kg', desc='component mass [kg]')
+    hub_mass = Float(iotype='in', units='kg', desc='component mass [kg]')
+    pitch_system_mass = Float(iotype='in', units='kg', desc='component mass [kg]')
+    spinner_mass = Float(iotype='in', units='kg', desc='component mass [kg]')
+    low_speed_shaft_mass = Float(iotype='in', units='kg', desc='component mass')
+    main_bearing_mass = Float(iotype='in', units='kg', desc='component mass')
+    second_bearing_mass = Float(iotype='in', units='kg', desc='component mass')
+    gearbox_mass = Float(iotype='in', units='kg', desc='component mass')
+    high_speed_side_mass = Float(iotype='in', units='kg', desc='component mass')
+    generator_mass = Float(iotype='in', units='kg', desc='component mass')
+    bedplate_mass = Float(iotype='in', units='kg', desc='component mass')
+    yaw_system_mass = Float(iotype='in', units='kg', desc='component mass')
+    tower_mass = Float(iotype='in', units='kg', desc='tower mass [kg]')
+    machine_rating = Float(iotype='in', units='kW', desc='machine rating')
+
+    # parameters
+    blade_number = Int(iotype='in', desc='number of rotor blades')
+    advanced_blade = Bool(True, iotype='in', desc='advanced (True) or traditional (False) blade design')
+    drivetrain_design = Enum('geared', ('geared', 'single_stage', 'multi_drive', 'pm_direct_drive'), iotype='in')
+    crane = Bool(iotype='in', desc='flag for presence of onboard crane')
+    offshore = Bool(iotype='in', desc='flag for offshore site')
+    year = Int(iotype='in', desc='Current Year')
+    month = Int(iotype='in', desc='Current Month')
+    assemblyCostMultiplier = Float(0.0, iotype='in', desc='multiplier for assembly cost in manufacturing')
+    overheadCostMultiplier = Float(0.0, iotype='in', desc='multiplier for overhead')
+    profitMultiplier = Float(0.0, iotype='in', desc='multiplier for profit markup')
+    transportMultiplier = Float(0.0, iotype='in', desc='multiplier for transport costs')
+
+    # Outputs
+    turbine_cost = Float(0.0, iotype='out', desc='Overall wind turbine capial costs including transportation costs')
+
+    def __init__(self):
+
+        Component.__init__(self)
+
+        #controls what happens if derivatives are missing
+        self.missing_deriv_policy = 'assume_zero'
+
+        # compiled cost of the current parameters
+        self.linear_options = None
+        self.linear_model = None
+
+    def execute(self):
+
+        options = turbine_costsse_options(self)
+        if options != self.linear_options:
+            self.linear_model = compile_turbine_costsse(**options)
+            self.linear_options = options
+
+        masses = np.array([getattr(self, name) for name in jacobian_inputs])
+
+        self.turbine_cost = float(self.linear_model.evaluate(masses))
+
+        defer_jacobian(self, self.linear_model.jacobian, masses)
+
+    def list_deriv_vars(self):
+
+        inputs = list(jacobian_inputs)
+        outputs = ['turbine_cost']
+
+        return inputs, outputs
+
+    def provideJ(self):
 
-        return self.J
+        return deferred_jacobian(self)[np.newaxis, :]
 
 #-------------------------------------------------------------------------------
 
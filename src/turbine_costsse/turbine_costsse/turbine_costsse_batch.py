@@ -0,0 +1,261 @@
+"""
+turbine_costsse_batch.py
+
+Vectorized evaluation of the Turbine_CostsSE mass-to-cost model for many designs at once.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from escalation import escalators
+from costsse_kernels import blade_cost, blade_cost_jacobian, hub_cost, hub_cost_jacobian, pitch_system_cost, \
+     pitch_system_cost_jacobian, spinner_cost, spinner_cost_jacobian, \
+     hub_system_cost, hub_system_cost_jacobian, rotor_cost, rotor_cost_jacobian, low_speed_shaft_cost, \
+     low_speed_shaft_cost_jacobian, bearings_cost, bearings_cost_jacobian, gearbox_cost, gearbox_cost_jacobian, \
+     high_speed_side_cost, high_speed_side_cost_jacobian, generator_cost, generator_cost_jacobian, \
+     bedplate_cost2002, bedplate_cost, bedplate_cost_jacobian, yaw_system_cost, yaw_system_cost_jacobian, \
+     nacelle_system_cost, nacelle_system_cost_jacobian, tower_cost, tower_cost_jacobian, tower_system_cost, \
+     tower_system_cost_jacobian, turbine_cost, turbine_cost_jacobian
+
+#-------------------------------------------------------------------------------
+
+def turbine_costsse_designs(blade_mass, hub_mass, pitch_system_mass, spinner_mass, \
+                            low_speed_shaft_mass, main_bearing_mass, second_bearing_mass, \
+                            gearbox_mass, high_speed_side_mass, generator_mass, bedplate_mass, \
+                            yaw_system_mass, tower_mass, machine_rating, year, month):
+    '''
+    The masses and machine_rating as float arrays, broadcast against each other and the target dates.
+    '''
+
+    return np.broadcast_arrays(np.empty(np.broadcast(year, month).shape), \
+                               *[np.asarray(m, dtype=np.float64) for m in \
+              (blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+               main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+               generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating)])[1:]
+
+def turbine_costsse_batch(blade_mass, hub_mass, pitch_system_mass, spinner_mass, \
+                          low_speed_shaft_mass, main_bearing_mass, second_bearing_mass, \
+                          gearbox_mass, high_speed_side_mass, generator_mass, bedplate_mass, \
+                          yaw_system_mass, tower_mass, machine_rating, \
+                          blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                          crane=False, offshore=False, year=2009, month=12, \
+                          assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                          profitMultiplier=0.0, transportMultiplier=0.0, context=None):
+    '''
+    Evaluate Turbine_CostsSE for N designs in a single vectorized pass.
+
+    All mass inputs and machine_rating may be scalars or arrays; they are broadcast
+    against each other.  year and month may also be arrays of dates, whose escalators
+    are gathered from the shared escalation table.  The remaining parameters are
+    shared by every design; context is an optional EvaluationContext supplying the
+    PPI reference date and escalator source.
+    Returns a dictionary of float arrays holding each component cost, the rotor,
+    nacelle and tower costs and the overall turbine_cost.
+    '''
+
+    masses = turbine_costsse_designs(blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+                                     main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+                                     generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating, \
+                                     year, month)
+    blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+        main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+        generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating = masses
+
+    esc = escalators(year, month, context)
+
+    out = {}
+
+    # rotor
+    out['blade_cost'] = blade_cost(blade_mass, esc, advanced_blade)
+    out['hub_cost'] = hub_cost(hub_mass, esc)
+    out['pitch_system_cost'] = pitch_system_cost(pitch_system_mass, esc)
+    out['spinner_cost'] = spinner_cost(spinner_mass, esc)
+    out['hub_system_cost'] = hub_system_cost(out['hub_cost'], out['pitch_system_cost'], out['spinner_cost'])
+    out['rotor_cost'] = rotor_cost(out['blade_cost'], out['hub_system_cost'], blade_number)
+
+    # nacelle
+    out['lss_cost'] = low_speed_shaft_cost(low_speed_shaft_mass, esc)
+    out['bearings_cost'] = bearings_cost(main_bearing_mass, second_bearing_mass, esc)
+    out['gearbox_cost'] = gearbox_cost(gearbox_mass, machine_rating, esc, drivetrain_design)
+    out['hss_cost'] = high_speed_side_cost(high_speed_side_mass, esc)
+    out['generator_cost'] = generator_cost(generator_mass, machine_rating, esc, drivetrain_design)
+    bedplateCost2002 = bedplate_cost2002(bedplate_mass)
+    out['bedplate_cost'] = bedplate_cost(bedplate_mass, esc)
+    out['yaw_system_cost'] = yaw_system_cost(yaw_system_mass, esc)
+
+    nacelle = nacelle_system_cost(out['lss_cost'], out['bearings_cost'], out['gearbox_cost'], out['hss_cost'], \
+                                  out['generator_cost'], out['bedplate_cost'], bedplateCost2002, \
+                                  out['yaw_system_cost'], bedplate_mass, machine_rating, esc, crane, offshore)
+    for name in ['mainframe_cost', 'econnections_cost', 'vspd_etronics_cost', 'hydr_cooling_cost', \
+                 'controls_cost', 'nacelle_cover_cost']:
+        out[name] = np.zeros_like(machine_rating) + nacelle[name]
+    out['nacelle_cost'] = nacelle['cost']
+
+    # tower
+    out['tower_cost'] = tower_system_cost(tower_cost(tower_mass, esc))
+
+    # turbine
+    out['turbine_cost'] = turbine_cost(out['rotor_cost'], out['nacelle_cost'], out['tower_cost'], offshore, \
+                                       assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+
+    return out
+
+#-------------------------------------------------------------------------------
+
+# rows and columns of turbine_costsse_batch_jacobian
+jacobian_outputs = ['turbine_cost', 'rotor_cost', 'nacelle_cost', 'tower_cost']
+jacobian_inputs = ['blade_mass', 'hub_mass', 'pitch_system_mass', 'spinner_mass', 'low_speed_shaft_mass', \
+                   'main_bearing_mass', 'second_bearing_mass', 'gearbox_mass', 'high_speed_side_mass', \
+                   'generator_mass', 'bedplate_mass', 'yaw_system_mass', 'tower_mass', 'machine_rating']
+
+def subsystem_jacobian(masses, costs, esc, blade_number, advanced_blade, drivetrain_design, crane, offshore):
+    '''
+    Derivatives of the rotor, nacelle and tower costs with respect to the inputs in
+    jacobian_inputs, an array of shape (N, 3, len(jacobian_inputs)), from the broadcast
+    masses of turbine_costsse_designs and their costs from turbine_costsse_batch.  The
+    component Jacobian kernels are chained through the sub-system cost adders.
+    '''
+
+    blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+        main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+        generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating = masses
+
+    J = np.zeros(machine_rating.shape + (3, len(jacobian_inputs)))
+
+    # rotor cost (RotorCostAdder and HubSystemCostAdder)
+    J_rotor = rotor_cost_jacobian(costs['blade_cost'], costs['hub_system_cost'], blade_number)
+    J_hub = hub_system_cost_jacobian(costs['hub_cost'], costs['pitch_system_cost'], costs['spinner_cost'])
+    J[..., 0, 0] = J_rotor[..., 0, 0] * blade_cost_jacobian(blade_mass, esc, advanced_blade)[..., 0, 0]
+    J[..., 0, 1] = J_rotor[..., 0, 1] * J_hub[..., 0, 0] * hub_cost_jacobian(hub_mass, esc)[..., 0, 0]
+    J[..., 0, 2] = J_rotor[..., 0, 1] * J_hub[..., 0, 1] * pitch_system_cost_jacobian(pitch_system_mass, esc)[..., 0, 0]
+    J[..., 0, 3] = J_rotor[..., 0, 1] * J_hub[..., 0, 2] * spinner_cost_jacobian(spinner_mass, esc)[..., 0, 0]
+
+    # nacelle cost (NacelleSystemCostAdder); columns bedplate_mass, bedplateCost2002, bedplate_cost,
+    # lss_cost, bearings_cost, gearbox_cost, hss_cost, generator_cost, yaw_system_cost, machine_rating
+    J_ncc = nacelle_system_cost_jacobian(costs['lss_cost'], costs['bearings_cost'], costs['gearbox_cost'], \
+                                         costs['hss_cost'], costs['generator_cost'], costs['bedplate_cost'], \
+                                         bedplate_cost2002(bedplate_mass), costs['yaw_system_cost'], \
+                                         bedplate_mass, machine_rating, esc, crane, offshore)[..., 0, :]
+    J_bearings = bearings_cost_jacobian(main_bearing_mass, second_bearing_mass, esc)
+    J_gearbox = gearbox_cost_jacobian(gearbox_mass, machine_rating, esc, drivetrain_design)
+    J_generator = generator_cost_jacobian(generator_mass, machine_rating, esc, drivetrain_design)
+    J_bedplate = bedplate_cost_jacobian(bedplate_mass, esc)
+    J[..., 1, 4] = J_ncc[..., 3] * low_speed_shaft_cost_jacobian(low_speed_shaft_mass, esc)[..., 0, 0]
+    J[..., 1, 5] = J_ncc[..., 4] * J_bearings[..., 0, 0]
+    J[..., 1, 6] = J_ncc[..., 4] * J_bearings[..., 0, 1]
+    J[..., 1, 7] = J_ncc[..., 5] * J_gearbox[..., 0, 0]
+    J[..., 1, 8] = J_ncc[..., 6] * high_speed_side_cost_jacobian(high_speed_side_mass, esc)[..., 0, 0]
+    J[..., 1, 9] = J_ncc[..., 7] * J_generator[..., 0, 0]
+    J[..., 1, 10] = J_ncc[..., 0] + J_ncc[..., 1] * J_bedplate[..., 1, 0] + J_ncc[..., 2] * J_bedplate[..., 0, 0]
+    J[..., 1, 11] = J_ncc[..., 8] * yaw_system_cost_jacobian(yaw_system_mass, esc)[..., 0, 0]
+    J[..., 1, 13] = J_ncc[..., 5] * J_gearbox[..., 0, 1] + J_ncc[..., 7] * J_generator[..., 0, 1] + J_ncc[..., 9]
+
+    # tower cost (TowerCostAdder)
+    J[..., 2, 12] = tower_system_cost_jacobian(costs['tower_cost'])[..., 0, 0] * tower_cost_jacobian(tower_mass, esc)[..., 0, 0]
+
+    return J
+
+def turbine_costsse_batch_jacobian(blade_mass, hub_mass, pitch_system_mass, spinner_mass, \
+                                   low_speed_shaft_mass, main_bearing_mass, second_bearing_mass, \
+                                   gearbox_mass, high_speed_side_mass, generator_mass, bedplate_mass, \
+                                   yaw_system_mass, tower_mass, machine_rating, \
+                                   blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                                   crane=False, offshore=False, year=2009, month=12, \
+                                   assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                                   profitMultiplier=0.0, transportMultiplier=0.0, context=None):
+    '''
+    Jacobian of Turbine_CostsSE for N designs in a single vectorized pass.
+
+    Takes the same arguments as turbine_costsse_batch and returns an array of shape
+    (N, len(jacobian_outputs), len(jacobian_inputs)) holding the derivatives of
+    turbine_cost and the rotor, nacelle and tower costs with respect to every mass
+    input and machine_rating: the rows of subsystem_jacobian chained through the
+    turbine cost adder.
+    '''
+
+    masses = turbine_costsse_designs(blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+                                     main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+                                     generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating, \
+                                     year, month)
+    blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+        main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+        generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating = masses
+
+    esc = escalators(year, month, context)
+    costs = turbine_costsse_batch(*masses, blade_number=blade_number, advanced_blade=advanced_blade, \
+                                  drivetrain_design=drivetrain_design, crane=crane, offshore=offshore, \
+                                  year=year, month=month, context=context)
+
+    J = np.zeros(machine_rating.shape + (len(jacobian_outputs), len(jacobian_inputs)))
+    J[..., 1:, :] = subsystem_jacobian(masses, costs, esc, blade_number, advanced_blade, drivetrain_design, crane, offshore)
+
+    # turbine cost (TurbineCostAdder)
+    J_tcc = turbine_cost_jacobian(costs['rotor_cost'], costs['nacelle_cost'], costs['tower_cost'], offshore, \
+                                  assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+    J[..., 0, :] = J_tcc[..., 0, 0, np.newaxis] * J[..., 1, :] + J_tcc[..., 0, 1, np.newaxis] * J[..., 2, :] + \
+                   J_tcc[..., 0, 2, np.newaxis] * J[..., 3, :]
+
+    return J
+
+def turbine_cost_gradient(blade_mass, hub_mass, pitch_system_mass, spinner_mass, \
+                          low_speed_shaft_mass, main_bearing_mass, second_bearing_mass, \
+                          gearbox_mass, high_speed_side_mass, generator_mass, bedplate_mass, \
+                          yaw_system_mass, tower_mass, machine_rating, \
+                          blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                          crane=False, offshore=False, year=2009, month=12, \
+                          assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                          profitMultiplier=0.0, transportMultiplier=0.0, context=None):
+    '''
+    turbine_cost and its gradient for N designs by reverse (adjoint) differentiation.
+
+    Takes the same arguments as turbine_costsse_batch.  The derivative of turbine_cost
+    is seeded at TurbineCostAdder and its adjoints of the rotor, nacelle and tower
+    costs weight the rows of subsystem_jacobian, without forming the rest of
+    turbine_costsse_batch_jacobian.
+    Returns turbine_cost and an array of shape (N, len(jacobian_inputs)).
+    '''
+
+    masses = turbine_costsse_designs(blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+                                     main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+                                     generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating, \
+                                     year, month)
+    blade_mass, hub_mass, pitch_system_mass, spinner_mass, low_speed_shaft_mass, \
+        main_bearing_mass, second_bearing_mass, gearbox_mass, high_speed_side_mass, \
+        generator_mass, bedplate_mass, yaw_system_mass, tower_mass, machine_rating = masses
+
+    esc = escalators(year, month, context)
+    costs = turbine_costsse_batch(*masses, blade_number=blade_number, advanced_blade=advanced_blade, \
+                                  drivetrain_design=drivetrain_design, crane=crane, offshore=offshore, \
+                                  year=year, month=month, assemblyCostMultiplier=assemblyCostMultiplier, \
+                                  overheadCostMultiplier=overheadCostMultiplier, profitMultiplier=profitMultiplier, \
+                                  transportMultiplier=transportMultiplier, context=context)
+
+    # turbine cost (TurbineCostAdder): adjoints of the rotor, nacelle and tower costs
+    J_tcc = turbine_cost_jacobian(costs['rotor_cost'], costs['nacelle_cost'], costs['tower_cost'], offshore, \
+                                  assemblyCostMultiplier, overheadCostMultiplier, profitMultiplier, transportMultiplier)
+    J_subsystems = subsystem_jacobian(masses, costs, esc, blade_number, advanced_blade, drivetrain_design, crane, offshore)
+    grad = np.sum(J_tcc[..., 0, :, np.newaxis] * J_subsystems, axis=-2)
+
+    return costs['turbine_cost'], grad
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    # NREL 5 MW turbine and two scaled variants
+    scale = np.array([0.8, 1.0, 1.2])
+
+    costs = turbine_costsse_batch(17650.67 * scale, 31644.5 * scale, 17004.0 * scale, 1810.5 * scale, \
+                                  31257.3 * scale, 9731.41 / 2 * scale, 9731.41 / 2 * scale, \
+                                  30237.60 * scale, 1492.45 * scale, 16699.85 * scale, 93090.6 * scale, \
+                                  11878.24 * scale, 434559.0 * scale, 5000.0 * scale, \
+                                  blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                                  crane=True, offshore=True, year=2010, month=12)
+
+    for i in range(len(scale)):
+        print "Mass scale {0:.1f}: overall turbine cost is ${1:.2f} USD".format(scale[i], costs['turbine_cost'][i])
+
+if __name__ == "__main__":
+
+    example()
@@ -0,0 +1,225 @@
+"""
+turbine_costsse_cli.py
+
+Command-line pricing of design tables with Turbine_CostsSE or tcc_csm_assembly.  The
+table, a CSV file with a header row or an NPZ archive of one-dimensional arrays, is
+read and priced in chunks and the cost breakdown of every design is written out as
+CSV chunk by chunk, so that files of any length are priced in constant memory.
+
+    turbine_costsse turbine_costsse masses.csv costs.csv --set offshore=True
+    turbine_costsse tcc_csm designs.npz - --chunk-size 50000 --set advanced_blade=True
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import argparse
+import csv
+import importlib
+import inspect
+import sys
+import zipfile
+import numpy as np
+
+from pricing import turbine_costsse_columns, turbine_costsse_defaults, tcc_csm_columns, tcc_csm_defaults
+
+# model name: (module and name of its batch function, per-design columns, defaults of the optional columns)
+models = {'turbine_costsse' : ('turbine_costsse.turbine_costsse.turbine_costsse_batch', 'turbine_costsse_batch', \
+                               turbine_costsse_columns, turbine_costsse_defaults),
+          'tcc_csm' : ('turbine_costsse.nrel_csm_tcc.nrel_csm_tcc_batch', 'tcc_csm_batch', \
+                       tcc_csm_columns, tcc_csm_defaults)}
+
+#-------------------------------------------------------------------------------
+
+def csv_chunks(stream, chunk_size):
+    '''
+    (names, columns) of successive chunks of chunk_size rows of a CSV table with a
+    header row, the columns being arrays of the text of their fields.  A table
+    without rows yields a single chunk of empty columns.
+    '''
+
+    reader = csv.reader(stream)
+    names = [name.strip() for name in next(reader)]
+
+    rows = []
+    empty = True
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(names):
+            raise ValueError('CSV row {0} has {1} fields, the header {2}'.format(reader.line_num, len(row), len(names)))
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield names, [np.array(column) for column in zip(*rows)]
+            rows, empty = [], False
+
+    if rows:
+        yield names, [np.array(column) for column in zip(*rows)]
+    elif empty:
+        yield names, [np.array([]) for name in names]
+
+def npz_chunks(path, chunk_size):
+    '''
+    (names, columns) of successive chunks of chunk_size rows of the one-dimensional
+    arrays of equal length of an NPZ archive, each read from the archive as needed.
+    Arrays of length zero yield a single chunk of empty columns.
+    '''
+
+    # NPY format 3.0 only differs from 2.0 in encoding its header as utf8 rather than latin1,
+    # which matters for the field names of structured dtypes alone, and those are rejected
+    readers = {(1, 0) : np.lib.format.read_array_header_1_0, (2, 0) : np.lib.format.read_array_header_2_0, \
+               (3, 0) : np.lib.format.read_array_header_2_0}
+
+    with zipfile.ZipFile(path) as archive:
+        names, streams, dtypes, lengths = [], [], [], set()
+        for member in archive.namelist():
+            if not member.endswith('.npy'):
+                continue
+            stream = archive.open(member)
+            version = np.lib.format.read_magic(stream)
+            if version not in readers:
+                raise ValueError('{0} is in NPY format {1}.{2}, not one of {3}'.format(member, version[0], version[1], \
+                                 ', '.join('{0}.{1}'.format(*known) for known in sorted(readers))))
+            shape, fortran_order, dtype = readers[version](stream)
+            if len(shape) != 1 or dtype.hasobject or dtype.names is not None:
+                raise ValueError('{0} is not a one-dimensional array of numbers or strings'.format(member))
+            names.append(member[:-4])
+            streams.append(stream)
+            dtypes.append(dtype)
+            lengths.add(shape[0])
+
+        if len(lengths) > 1:
+            raise ValueError('the arrays of {0} are not of equal length'.format(path))
+
+        n = lengths.pop() if lengths else 0
+        if n == 0:
+            yield names, [np.empty(0, dtype=dtype) for dtype in dtypes]
+        for start in range(0, n, chunk_size):
+            rows = min(chunk_size, n - start)
+            yield names, [np.frombuffer(stream.read(rows * dtype.itemsize), dtype=dtype) \
+                          for stream, dtype in zip(streams, dtypes)]
+
+def model_column(name, values):
+    '''
+    Design table column name converted to the type the batch functions expect.
+    '''
+
+    if name == 'drivetrain_design':
+        try:
+            return values.astype(int)
+        except ValueError:
+            return values
+    if name in ('year', 'month'):
+        return values.astype(float).astype(int)
+
+    return values.astype(float)
+
+def text(values):
+    '''
+    CSV fields of an array: floats at full precision, anything else as its text.
+    '''
+
+    if values.dtype.kind == 'f':
+        return [repr(value) for value in values.tolist()]
+
+    return [str(value) for value in values.tolist()]
+
+def price_table(model, chunks, output, **params):
+    '''
+    Price the design table read as chunks (see csv_chunks and npz_chunks) with model,
+    a key of models, and write each chunk to the CSV stream output: the columns of the
+    table, model inputs or not, followed by every cost and mass output in sorted order.
+    params are the parameters of the batch function shared by every design.  A column
+    naming a parameter that is not a per-design input of the model, such as offshore,
+    raises ValueError.  A table without rows writes the header alone.  Returns the
+    number of designs priced.
+    '''
+
+    module, function, model_columns, defaults = models[model]
+    batch = getattr(importlib.import_module(module), function)
+
+    writer = csv.writer(output, lineterminator='\n')
+    header = None
+    n = 0
+    for names, columns in chunks:
+        table = dict(zip(names, columns))
+        design = dict((name, model_column(name, table[name])) for name in model_columns if name in table)
+
+        if header is None:
+            missing = [name for name in model_columns if name not in table and name not in defaults]
+            shared = [name for name in table if name in params]
+            if missing or shared:
+                raise ValueError('design table lacks {0} or repeats parameters {1}'.format(missing, shared))
+            # parameters of batch that the model takes only as shared values, which a column would not set
+            ignored = [name for name in names if name in inspect.getargspec(batch).args and name not in model_columns]
+            if ignored:
+                raise ValueError('design table columns {0} are not per-design inputs of {1}; '
+                                 'pass them as parameters'.format(ignored, model))
+            out = batch(**dict(params, **design))
+            outputs = sorted(out.keys())
+            header = names
+            writer.writerow(names + outputs)
+        else:
+            out = batch(**dict(params, **design))
+
+        fields = [text(column) for column in columns] + [text(np.broadcast_to(out[name], columns[0].shape)) \
+                                                         for name in outputs]
+        writer.writerows(zip(*fields))
+        output.flush()
+        n += len(columns[0])
+
+    return n
+
+def parameter(value):
+    '''
+    Value of a --set parameter: a bool, int or float when it reads as one, else the text.
+    '''
+
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+
+    return value
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Price a CSV or NPZ design table with Turbine_CostsSE or '
+                                                 'tcc_csm_assembly and write the cost breakdown as CSV.')
+    parser.add_argument('model', choices=sorted(models), help='mass-based or parametric cost model')
+    parser.add_argument('table', help='design table, a .csv file (- for standard input) or a .npz archive')
+    parser.add_argument('output', help='CSV file of the costs, - for standard output')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='designs priced at a time (default 10000)')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', \
+                        help='parameter shared by every design, e.g. offshore=True')
+    args = parser.parse_args(argv)
+
+    params = {}
+    for assignment in args.set:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            parser.error('--set takes NAME=VALUE, not {0}'.format(assignment))
+        params[name.strip()] = parameter(value.strip())
+
+    source = sys.stdin if args.table == '-' else None
+    output = sys.stdout if args.output == '-' else open(args.output, 'wb')
+    try:
+        if args.table.endswith('.npz'):
+            chunks = npz_chunks(args.table, args.chunk_size)
+        else:
+            source = source or open(args.table, 'rb')
+            chunks = csv_chunks(source, args.chunk_size)
+        price_table(args.model, chunks, output, **params)
+    finally:
+        if source not in (None, sys.stdin):
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    return 0
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+turbine_costsse_linear.py
+
+Turbine_CostsSE compiled to a linear form for a fixed configuration.
+
+Copyright (c) NREL. All rights reserved.
+"""
+
+import numpy as np
+
+from escalation import escalators
+from costsse_kernels import cost_coefficients, drivetrain_prefixes, drivetrain_code, pitch_system_cost, gearbox_cost, \
+     rotor_cost_jacobian, hub_system_cost_jacobian, nacelle_system_cost_jacobian, turbine_cost_jacobian
+from turbine_costsse_batch import turbine_costsse_batch, turbine_costsse_batch_jacobian, jacobian_inputs
+
+#-------------------------------------------------------------------------------
+
+class LinearTurbineCost(object):
+    '''
+    Turbine_CostsSE cost for one configuration in the form
+
+        turbine_cost = masses . w + c + sum(scale * masses[:, column] ** exponent)
+
+    where masses holds one design per row with columns in jacobian_inputs order and
+    the sum runs over the nonlinear terms, a list of (input, column, scale, exponent)
+    tuples.  A configuration without nonlinear terms is priced by the matrix product
+    alone.
+    '''
+
+    def __init__(self, w, c, nonlinear=()):
+
+        self.inputs = list(jacobian_inputs)
+        self.w = np.asarray(w, dtype=np.float64)
+        self.c = float(c)
+        self.nonlinear = list(nonlinear)
+
+    def is_linear(self):
+
+        return len(self.nonlinear) == 0
+
+    def evaluate(self, masses):
+        '''
+        turbine_cost of the designs in masses, an array of shape (..., len(inputs)).
+        '''
+
+        masses = np.asarray(masses, dtype=np.float64)
+
+        cost = masses.dot(self.w) + self.c
+        for name, column, scale, exponent in self.nonlinear:
+            cost += scale * masses[..., column] ** exponent
+
+        return cost
+
+    def jacobian(self, masses):
+        '''
+        Derivatives of turbine_cost with respect to each column of masses, shaped like masses.
+        '''
+
+        masses = np.asarray(masses, dtype=np.float64)
+
+        J = np.zeros(masses.shape) + self.w
+        for name, column, scale, exponent in self.nonlinear:
+            J[..., column] += scale * exponent * masses[..., column] ** (exponent - 1)
+
+        return J
+
+    def __repr__(self):
+
+        return 'LinearTurbineCost(c={0}, nonlinear={1})'.format(self.c, \
+                   [(name, exponent) for name, column, scale, exponent in self.nonlinear])
+
+def compile_turbine_costsse(blade_number=3, advanced_blade=True, drivetrain_design='geared', \
+                            crane=False, offshore=False, year=2009, month=12, \
+                            assemblyCostMultiplier=0.0, overheadCostMultiplier=0.0, \
+                            profitMultiplier=0.0, transportMultiplier=0.0, context=None):
+    '''
+    Compile the turbine_costsse_batch cost of one configuration into a LinearTurbineCost.
+
+    Every component cost is affine in its mass except the pitch system, which scales
+    with pitch_system_mass raised to pitch_system_exponent, and the gearbox of non-geared drivetrains, which
+    scales with machine_rating raised to its cost coefficient.  These are returned as
+    nonlinear terms; the weights w hold the remaining linear part and c the cost of a
+    design with all inputs zero, where every nonlinear term vanishes.
+    '''
+
+    options = dict(blade_number=blade_number, advanced_blade=advanced_blade, drivetrain_design=drivetrain_design, \
+                   crane=crane, offshore=offshore, year=year, month=month, \
+                   assemblyCostMultiplier=assemblyCostMultiplier, overheadCostMultiplier=overheadCostMultiplier, \
+                   profitMultiplier=profitMultiplier, transportMultiplier=transportMultiplier, context=context)
+
+    esc = escalators(year, month, context)
+    column = dict((name, i) for i, name in enumerate(jacobian_inputs))
+
+    # derivative of turbine_cost with respect to the pitch system and gearbox costs
+    d_turbine = turbine_cost_jacobian(0.0, 0.0, 0.0, offshore, assemblyCostMultiplier, overheadCostMultiplier, \
+                                      profitMultiplier, transportMultiplier)[0, 0]
+    d_pitch = d_turbine * rotor_cost_jacobian(0.0, 0.0, blade_number)[0, 1] * hub_system_cost_jacobian(0.0, 0.0, 0.0)[0, 1]
+    d_gearbox = d_turbine * nacelle_system_cost_jacobian(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, esc, \
+                                                         crane, offshore)[0, 5]
+
+    # pitch_system_cost and the rating-based gearbox cost are scale * x**exponent
+    nonlinear = [('pitch_system_mass', column['pitch_system_mass'], d_pitch * pitch_system_cost(1.0, esc), \
+                  cost_coefficients['pitch_system_exponent'])]
+    dt = drivetrain_code(drivetrain_design)
+    costCoeff = cost_coefficients[drivetrain_prefixes[dt] + '_gearbox_coeff'] if dt != 1 else 0
+    if costCoeff != 0:
+        nonlinear.append(('machine_rating', column['machine_rating'], \
+                          d_gearbox * gearbox_cost(0.0, 1.0, esc, drivetrain_design), costCoeff))
+
+    # the linear part has a constant Jacobian; at unit inputs each nonlinear term
+    # contributes scale * exponent to its column
+    ones = np.ones(len(jacobian_inputs))
+    w = turbine_costsse_batch_jacobian(*ones, **options)[0]
+    for name, i, scale, exponent in nonlinear:
+        w[i] -= scale * exponent
+    w[column['pitch_system_mass']] = 0.0
+
+    c = turbine_costsse_batch(*np.zeros(len(jacobian_inputs)), **options)['turbine_cost']
+
+    return LinearTurbineCost(w, c, nonlinear)
+
+#-------------------------------------------------------------------------------
+
+def example():
+
+    # NREL 5 MW Reference Turbine component masses
+    masses = np.array([17650.67, 31644.5, 17004.0, 1810.5, 31257.3, 9731.41, 9731.41, 30237.60, 1492.45, \
+                       16699.85, 93090.6, 11878.24, 434559.0, 5000.0])
+
+    model = compile_turbine_costsse(advanced_blade=True, drivetrain_design='geared', crane=True, offshore=True, \
+                                    year=2010, month=12)
+    print model
+    print "Turbine cost ${0:.2f} USD".format(model.evaluate(masses))
+
+if __name__ == "__main__":
+
+    example()